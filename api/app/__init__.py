@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Módulos compartilhados com as ferramentas de linha de comando (grafo.py e layout.py)
+# ficam em src/, como nos benchmarks: uma única implementação para a API e o consulta.py.
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'src')
+if SRC_DIR not in sys.path:
+    sys.path.append(SRC_DIR)
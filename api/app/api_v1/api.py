@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api_v1.endpoints import query, admin, raw_query
+from app.api_v1.endpoints import query, admin, raw_query, groups, centrality, beneficial_owners
 
 api_router = APIRouter()
 
@@ -9,5 +9,14 @@ api_router.include_router(admin.router, tags=["Admin"])
 # Endpoint para consulta da rede de relacionamentos (grafo)
 api_router.include_router(query.router, prefix="/network", tags=["Rede de Relacionamentos"])
 
+# Endpoint para consulta dos grupos econômicos (componentes conexos da rede de sócios)
+api_router.include_router(groups.router, prefix="/grupos", tags=["Grupos Econômicos"])
+
+# Endpoint para consulta da centralidade (grau, PageRank e k-core) na rede de sócios
+api_router.include_router(centrality.router, prefix="/centralidade", tags=["Centralidade"])
+
+# Endpoint para consulta dos beneficiários finais (topo das cadeias de sócios PJ)
+api_router.include_router(beneficial_owners.router, prefix="/beneficiarios", tags=["Beneficiários Finais"])
+
 # Endpoint para consultas SQL diretas
 api_router.include_router(raw_query.router, tags=["Consulta Direta"])
@@ -1,4 +1,11 @@
-from fastapi import APIRouter
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from app.core.config import get_settings
+from app.core.metrics import get_registry
+from app.db import session
+from app.models.response import DatabaseStatus, DatabaseSwitch
+from app.security.auth import get_current_user
 
 router = APIRouter()
 
@@ -8,3 +15,49 @@ def get_status():
     Endpoint para verificar se a API está operacional.
     """
     return {"status": "ok"}
+
+@router.get("/metrics", summary="Métricas da API no formato do Prometheus", tags=["Admin"],
+            response_class=PlainTextResponse)
+def get_metrics():
+    """
+    Latência por rota, respostas por status e estatísticas das redes montadas
+    (consultas SQL, linhas lidas, nós/arestas, tempo em SQL e na montagem do
+    grafo, acertos do cache de vínculos pré-calculados), no formato texto do Prometheus.
+    """
+    return PlainTextResponse(get_registry().render(), media_type="text/plain; version=0.0.4")
+
+@router.get("/admin/database", response_model=DatabaseStatus, summary="Banco de dados em uso", tags=["Admin"],
+            dependencies=[Depends(get_current_user)])
+def get_database():
+    """
+    Arquivo de banco em uso, requisições em andamento e o aquecimento feito na troca;
+    durante uma troca, também o banco anterior, ainda atendendo as requisições iniciadas nele.
+    """
+    return session.current_database()
+
+@router.post("/admin/database/switch", response_model=DatabaseSwitch, summary="Troca o banco de dados em uso",
+             tags=["Admin"], dependencies=[Depends(get_current_user)])
+def switch_database(
+    path: Optional[str] = Query(None, description="Arquivo .db a usar. Padrão: o indicado no DATABASE_POINTER_FILE."),
+    aquecer: bool = Query(True, description="Aquece o cache de páginas do novo banco antes da troca."),
+):
+    """
+    Troca o banco sem parar a API (blue/green), por exemplo após uma carga com
+    `cnpj.py --versionado`: o novo arquivo é validado e aquecido (índices e nós de
+    maior PageRank lidos para o cache do sistema operacional) enquanto o anterior
+    continua atendendo; então as novas requisições passam para ele de uma vez, e o
+    anterior é fechado quando as requisições em andamento nele terminam.
+    """
+    if path is None:
+        pointer = get_settings().DATABASE_POINTER_FILE
+        url = session.resolve_pointer(pointer) if pointer else None
+        if url is None:
+            raise HTTPException(status_code=400, detail="Informe path ou configure um DATABASE_POINTER_FILE existente.")
+    else:
+        url = 'sqlite:///' + path
+    try:
+        return session.switch_database(url, warm=aquecer)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from app.db.session import get_db
+from app.services.beneficial_owner_service import BeneficialOwnerService
+from app.models.response import BeneficialOwner, BeneficialOwners, ControlledCompany, ControlledCompanies
+from app.security.auth import get_current_user
+
+router = APIRouter()
+
+
+def _service(db: Session) -> BeneficialOwnerService:
+    service = BeneficialOwnerService(db)
+    if not service.available():
+        raise HTTPException(status_code=503, detail="Beneficiários finais não calculados nesta base (execute src/beneficiarios.py).")
+    return service
+
+@router.get("/", response_model=BeneficialOwners, summary="Beneficiários finais de uma empresa", dependencies=[Depends(get_current_user)])
+def get_beneficial_owners(
+    cnpj: str = Query(..., description="CNPJ (14 dígitos) ou cnpj_basico (8 dígitos).", min_length=8, max_length=14),
+    db: Session = Depends(get_db)
+):
+    """
+    Retorna as pessoas físicas e estrangeiros (ou empresas sem controladores
+    identificáveis) no topo das cadeias de sócios PJ da empresa, com a profundidade
+    de cada um (1 = sócio direto), com uma consulta indexada, sem montar a rede.
+    """
+    if not cnpj.isdigit():
+        raise HTTPException(status_code=400, detail="CNPJ inválido.")
+    df = _service(db).owners_of(cnpj)
+    if df.empty:
+        raise HTTPException(status_code=404, detail="Empresa sem sócios na base.")
+    return BeneficialOwners(
+        cnpj_basico=cnpj[:8], max_depth=int(df['profundidade'].max()), cycle=bool(df['ciclo'].any()),
+        owners=[BeneficialOwner(key=row.beneficiario, identificador_socio=row.identificador_socio, depth=row.profundidade)
+                for row in df.itertuples()],
+    )
+
+@router.get("/controladas", response_model=ControlledCompanies, summary="Empresas de que uma pessoa é beneficiária final", dependencies=[Depends(get_current_user)])
+def get_controlled_companies(
+    no: str = Query(..., description="CPF mascarado seguido do nome (como nos IDs da rede) ou CNPJ."),
+    db: Session = Depends(get_db)
+):
+    """Retorna as empresas controladas pela pessoa, direta ou indiretamente (por meio de sócias PJ)."""
+    df = _service(db).controlled_by(no)
+    return ControlledCompanies(node=no, companies=[ControlledCompany(cnpj_basico=row.cnpj_basico, depth=row.profundidade)
+                                                   for row in df.itertuples()])
@@ -0,0 +1,45 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from app.db.session import get_db
+from app.services.centrality_service import CentralityService, RANKING_METRICS
+from app.services.group_service import group_key
+from app.models.response import CentralityScores, CentralityRanking
+from app.security.auth import get_current_user
+
+router = APIRouter()
+
+
+def _service(db: Session) -> CentralityService:
+    service = CentralityService(db)
+    if not service.available():
+        raise HTTPException(status_code=503, detail="Centralidade não calculada nesta base (execute src/centralidade.py).")
+    return service
+
+@router.get("/", response_model=CentralityScores, summary="Centralidade de uma empresa ou pessoa", dependencies=[Depends(get_current_user)])
+def get_centrality(
+    no: str = Query(..., description="CNPJ (14 dígitos) ou, para pessoas, o CPF mascarado seguido do nome (como nos IDs da rede)."),
+    db: Session = Depends(get_db)
+):
+    """
+    Retorna grau, vínculos, PageRank e k-core de uma empresa ou pessoa na rede inteira
+    de sócios, calculados após a carga, com uma consulta indexada.
+    """
+    key = group_key(no)
+    scores = _service(db).scores(no)
+    if scores is None:
+        raise HTTPException(status_code=404, detail="Empresa/pessoa sem vínculos societários.")
+    return CentralityScores(key=key, tipo_pessoa=1 if key.isdigit() else 2, **scores)
+
+@router.get("/ranking", response_model=CentralityRanking, summary="Empresas e pessoas mais centrais", dependencies=[Depends(get_current_user)])
+def get_ranking(
+    metrica: str = Query("pagerank", description="Métrica da ordenação (decrescente).", enum=list(RANKING_METRICS)),
+    tipo_pessoa: Optional[int] = Query(None, ge=1, le=2, description="1 = só empresas, 2 = só pessoas (vazio = todas)."),
+    page: int = Query(1, ge=1, description="Número da página."),
+    page_size: int = Query(100, ge=1, le=1000, description="Número de itens por página."),
+    db: Session = Depends(get_db)
+):
+    """Retorna as empresas/pessoas em ordem decrescente da métrica, paginadas."""
+    df = _service(db).ranking(metrica, tipo_pessoa=tipo_pessoa, page=page, page_size=page_size)
+    return CentralityRanking(metric=metrica, page=page, page_size=page_size,
+                             items=[CentralityScores(key=row.pop('chave'), **row) for row in df.to_dict('records')])
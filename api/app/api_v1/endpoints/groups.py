@@ -0,0 +1,59 @@
+import math
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from app.db.session import get_db
+from app.services.group_service import GroupService
+from app.models.response import GroupInfo, SameGroup, GroupMember, GroupMembers
+from app.security.auth import get_current_user
+
+router = APIRouter()
+
+
+def _service(db: Session) -> GroupService:
+    service = GroupService(db)
+    if not service.available():
+        raise HTTPException(status_code=503, detail="Grupos econômicos não calculados nesta base (execute src/grupos.py).")
+    return service
+
+@router.get("/", response_model=GroupInfo, summary="Grupo econômico de uma empresa ou pessoa", dependencies=[Depends(get_current_user)])
+def get_group(
+    no: str = Query(..., description="CNPJ (14 dígitos) ou, para pessoas, o CPF mascarado seguido do nome (como nos IDs da rede)."),
+    db: Session = Depends(get_db)
+):
+    """
+    Retorna o grupo econômico (componente conexo da rede inteira de sócios) de uma
+    empresa ou pessoa e o tamanho do grupo, com uma consulta indexada, sem montar a rede.
+    """
+    service = _service(db)
+    group = service.group_of(no)
+    size, companies = service.group_size(group)
+    return GroupInfo(node=no, group=group, size=size, companies=companies)
+
+@router.get("/mesmo", response_model=SameGroup, summary="Verifica se duas empresas/pessoas estão no mesmo grupo", dependencies=[Depends(get_current_user)])
+def get_same_group(
+    a: str = Query(..., description="Primeiro ID (CNPJ ou CPF mascarado + nome)."),
+    b: str = Query(..., description="Segundo ID (CNPJ ou CPF mascarado + nome)."),
+    db: Session = Depends(get_db)
+):
+    """Indica se as duas empresas/pessoas estão ligadas por algum caminho de vínculos societários."""
+    service = _service(db)
+    return SameGroup(a=a, b=b, group_a=service.group_of(a), group_b=service.group_of(b),
+                     same_group=service.same_group(a, b))
+
+@router.get("/{grupo}/membros", response_model=GroupMembers, summary="Membros de um grupo econômico", dependencies=[Depends(get_current_user)])
+def get_group_members(
+    grupo: int,
+    page: int = Query(1, ge=1, description="Número da página."),
+    page_size: int = Query(100, ge=1, le=1000, description="Número de membros por página."),
+    db: Session = Depends(get_db)
+):
+    """Retorna os membros de um grupo econômico, paginados: empresas (cnpj_basico) primeiro e depois as pessoas."""
+    service = _service(db)
+    size, companies = service.group_size(grupo)
+    if not size:
+        raise HTTPException(status_code=404, detail="Grupo não encontrado.")
+    df = service.members(grupo, page=page, page_size=page_size)
+    return GroupMembers(
+        group=grupo, size=size, companies=companies, total_pages=math.ceil(size / page_size), page=page,
+        page_size=page_size, members=[GroupMember(key=row.chave, tipo_pessoa=row.tipo_pessoa) for row in df.itertuples()],
+    )
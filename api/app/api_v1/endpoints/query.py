@@ -1,19 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import List, Optional
 from app.db.session import get_db
-from app.services.network_service import NetworkBuilderService
-from app.models.response import Graph, Node, Edge
+from app.services.network_service import NetworkBuilderService, ALL_COLUMNS
+from app.services.centrality_service import CentralityService
+from app.models.response import Graph, Node, Edge, LevelStats, Neighborhood, NetworkEstimate
 from app.security.auth import get_current_user
-import networkx as nx
+from app.core.config import get_settings
+from app.core.metrics import get_registry
+import math
 
 router = APIRouter()
 
+def _parse_campos(campos: str) -> Optional[List[str]]:
+    """'*' = todos (None), vazio = nenhum, ou a lista separada por vírgulas."""
+    if campos.strip() == '*':
+        return None
+    return [c.strip() for c in campos.split(',') if c.strip()]
+
+def _parse_colunas(campos: str):
+    """Como _parse_campos, com '*' = todas as colunas da tabela (ALL_COLUMNS)."""
+    return ALL_COLUMNS if campos.strip() == '*' else _parse_campos(campos)
+
 @router.get("/", response_model=Graph, summary="Consulta a rede de relacionamentos", dependencies=[Depends(get_current_user)])
 def get_network(
+    request: Request,
     tipo_consulta: str = Query(..., description="Tipo de consulta a ser realizada.", enum=['cnpj', 'cpf', 'nome_socio']),
     valor: str = Query(..., description="O valor a ser consultado (um CNPJ, CPF ou nome de sócio)."),
     nivel_max: int = Query(1, description="Profundidade máxima da busca na rede de relacionamentos.", ge=0, le=3),
+    grau_hub: Optional[int] = Query(None, description="Não expande nós com mais vínculos que isso (0 = expande todos). Padrão: NETWORK_HUB_DEGREE.", ge=0),
+    campos_nos: str = Query("", description="Colunas de estabelecimentos incluídas nos nós PJ, separadas por vírgula ('*' = todas; vazio = nenhuma)."),
+    campos_arestas: str = Query("*", description="Colunas de socios incluídas nas arestas, separadas por vírgula ('*' = todas; vazio = só as colunas-chave)."),
+    layout_nos: bool = Query(False, alias="layout", description="Calcula o layout no servidor: coordenadas x, y (em pixels) nos atributos dos nós."),
+    compartilhados: str = Query("", description="Liga também empresas com o mesmo endereço, telefone ou e-mail: tipos separados por vírgula (endereco, telefone, email; vazio = só vínculos societários)."),
+    qualificacoes: str = Query("", description="Só segue sócios com estas qualificações: códigos de qualificacao_socio separados por vírgula (ex: 05,22,49; vazio = todas)."),
+    situacoes: str = Query("", description="Só segue empresas nestas situações cadastrais: códigos separados por vírgula (ex: 02 = ativas; vazio = todas)."),
     db: Session = Depends(get_db)
 ):
     """
@@ -24,19 +45,117 @@ def get_network(
     - **nome_socio**: Forneça o nome completo de um sócio para buscar suas participações.
     
     A profundidade da busca pode ser controlada pelo parâmetro `nivel_max` (0 a 3).
+
+    A montagem é limitada em nós, arestas, consultas SQL e tempo (NETWORK_MAX_* e
+    NETWORK_DEADLINE_SECONDS). Ao atingir um limite, a rede parcial é devolvida com
+    `truncated` = true; `levels` traz as estatísticas da montagem por nível.
+
+    `campos_nos` e `campos_arestas` escolhem os atributos devolvidos: a rede é montada
+    só com as colunas-chave e os atributos pedidos são lidos depois, em lote.
+
+    Com `layout` = true, as posições dos nós são calculadas no servidor (layout de forças
+    multinível); em redes grandes, `super_nodes` agrupa os nós próximos para a
+    visualização mostrar a rede de longe.
+
+    Com `compartilhados`, empresas com o mesmo endereço, telefone ou e-mail (índice
+    calculado pelo src/compartilhados.py, sem os genéricos, como os de escritórios de
+    contabilidade) entram na rede por arestas mesmo_endereco, mesmo_telefone e mesmo_email.
+
+    `qualificacoes` e `situacoes` filtram os vínculos seguidos nas próprias consultas da
+    montagem (ex: `situacoes=02` não lê nem expande empresas baixadas ou inaptas); o nó de
+    origem entra sempre.
     """
     if tipo_consulta == 'cnpj' and (not valor.isdigit() or len(valor) != 14):
         raise HTTPException(status_code=400, detail="CNPJ inválido. Forneça 14 dígitos numéricos.")
     if tipo_consulta == 'cpf' and (not valor.isdigit() or len(valor) != 11):
         raise HTTPException(status_code=400, detail="CPF inválido. Forneça 11 dígitos numéricos.")
 
-    service = NetworkBuilderService(db=db, nivel_max=nivel_max)
+    settings = get_settings()
+    try:
+        service = NetworkBuilderService(
+            db=db, nivel_max=nivel_max,
+            max_nodes=settings.NETWORK_MAX_NODES, max_edges=settings.NETWORK_MAX_EDGES,
+            max_queries=settings.NETWORK_MAX_QUERIES, deadline_seconds=settings.NETWORK_DEADLINE_SECONDS,
+            hub_degree=settings.NETWORK_HUB_DEGREE if grau_hub is None else grau_hub,
+            node_columns=_parse_colunas(campos_nos), edge_columns=_parse_colunas(campos_arestas),
+            shared_attributes=_parse_campos(compartilhados),
+            qualifications=_parse_campos(qualificacoes), situations=_parse_campos(situacoes),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     graph = service.build_network(tipo_consulta=tipo_consulta, valor=valor)
 
+    # Estatísticas da montagem para o /metrics e para o log de requisições lentas
+    get_registry().observe_network(tipo_consulta, nivel_max, service.stats)
+    request.state.network_stats = service.stats
+
     if not graph.nodes:
         raise HTTPException(status_code=404, detail="Nenhum resultado encontrado para a consulta.")
 
+    if layout_nos:
+        import layout
+        layout.aplica(graph)
+
     nodes = [Node(id=node, attributes=data) for node, data in graph.nodes(data=True)]
     edges = [Edge(source=u, target=v, attributes=data) for u, v, data in graph.edges(data=True)]
     
-    return Graph(nodes=nodes, edges=edges)
+    return Graph(nodes=nodes, edges=edges, truncated=service.truncated,
+                 truncation_reason=service.truncation_reason,
+                 levels=[LevelStats(**level) for level in service.level_stats()],
+                 super_nodes=graph.graph.get('super_nos'))
+
+@router.get("/vizinhos", response_model=Neighborhood, summary="Vizinhança paginada de um nó da rede", dependencies=[Depends(get_current_user)])
+def get_neighborhood(
+    request: Request,
+    no: str = Query(..., description="ID do nó: CNPJ (14 dígitos) ou, para pessoas físicas, o CPF mascarado seguido do nome (como nos IDs da rede)."),
+    page: int = Query(1, ge=1, description="Número da página de vínculos."),
+    page_size: int = Query(50, ge=1, le=500, description="Número de vínculos por página."),
+    campos_nos: str = Query("", description="Colunas de estabelecimentos incluídas nos nós PJ, separadas por vírgula ('*' = todas; vazio = nenhuma)."),
+    campos_arestas: str = Query("*", description="Colunas de socios incluídas nas arestas, separadas por vírgula ('*' = todas; vazio = só as colunas-chave)."),
+    ordem: str = Query("nome", description="Ordem dos vínculos: por nome ou pelo PageRank do vizinho (se a centralidade foi calculada).", enum=['nome', 'pagerank']),
+    qualificacoes: str = Query("", description="Só sócios e participações com estas qualificações: códigos de qualificacao_socio separados por vírgula (ex: 05,22,49; vazio = todas)."),
+    situacoes: str = Query("", description="Só empresas nestas situações cadastrais: códigos separados por vírgula (ex: 02 = ativas; vazio = todas)."),
+    db: Session = Depends(get_db)
+):
+    """
+    Retorna os vínculos a 1 salto de um nó (sócios e participações societárias),
+    paginados no banco. Usado pela visualização para expandir a rede sob demanda:
+    cada clique em um nó busca só a próxima página dos seus vizinhos.
+
+    `qualificacoes` e `situacoes` filtram os vínculos como em `/network/`, para a
+    expansão sob demanda mostrar a mesma rede que a consulta com esses filtros.
+    """
+    try:
+        service = NetworkBuilderService(db=db, node_columns=_parse_colunas(campos_nos),
+                                        edge_columns=_parse_colunas(campos_arestas),
+                                        qualifications=_parse_campos(qualificacoes),
+                                        situations=_parse_campos(situacoes))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    graph, total_count = service.build_neighborhood(no, page=page, page_size=page_size, order=ordem)
+    request.state.network_stats = service.stats
+
+    if not graph.nodes:
+        raise HTTPException(status_code=404, detail="Nenhum resultado encontrado para o nó.")
+
+    return Neighborhood(
+        node=no,
+        nodes=[Node(id=node, attributes=data) for node, data in graph.nodes(data=True)],
+        edges=[Edge(source=u, target=v, attributes=data) for u, v, data in graph.edges(data=True)],
+        total_count=total_count, total_pages=math.ceil(total_count / page_size), page=page, page_size=page_size,
+    )
+
+@router.get("/estimativa", response_model=NetworkEstimate, summary="Estima o tamanho da rede de um nó antes de montá-la", dependencies=[Depends(get_current_user)])
+def get_estimate(
+    no: str = Query(..., description="ID do nó: CNPJ (14 dígitos) ou, para pessoas físicas, o CPF mascarado seguido do nome (como nos IDs da rede)."),
+    db: Session = Depends(get_db)
+):
+    """
+    Retorna, pela centralidade pré-calculada, o número de vizinhos do nó, um teto
+    para o tamanho da rede com nivel_max = 1 e o tamanho do grupo econômico (teto
+    para qualquer nível), para avisar antes de uma consulta grande.
+    """
+    service = CentralityService(db)
+    if not service.available():
+        raise HTTPException(status_code=503, detail="Centralidade não calculada nesta base (execute src/centralidade.py).")
+    return NetworkEstimate(node=no, **service.estimate(no))
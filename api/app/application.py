@@ -0,0 +1,88 @@
+import time
+import logging
+import threading
+import importlib
+from contextlib import asynccontextmanager
+from colorama import just_fix_windows_console
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+
+from app.core.config import get_settings
+from app.api_v1.api import api_router
+from app.core.metrics import get_registry, route_template
+from app.db.session import start_pointer_watcher
+
+slow_request_logger = logging.getLogger("api.slow_requests")
+
+# Imported by the services only on the first request that needs them (they pull
+# pandas and numpy): preloaded in the background after startup.
+PRELOAD_MODULES = ("grafo", "layout")
+
+def _preload_modules():
+    for module in PRELOAD_MODULES:
+        importlib.import_module(module)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Watches DATABASE_POINTER_FILE (blue/green database swap) while the app is running,
+    and imports the heavy modules in the background once the server is accepting requests.
+    """
+    stop_watcher = start_pointer_watcher()
+    threading.Thread(target=_preload_modules, name="preload-modules", daemon=True).start()
+    yield
+    if stop_watcher is not None:
+        stop_watcher.set()
+
+# Create the FastAPI app instance globally.
+# Its configuration (title, description, etc.) does not depend on settings.
+app = FastAPI(
+    title="API de Consulta de Rede CNPJ",
+    description="API para explorar a rede de relacionamentos de empresas e sócios da base de dados da Receita Federal.",
+    version="1.0.0",
+    openapi_url="/api/v1/openapi.json",
+    lifespan=lifespan,
+)
+
+# Fix Windows console to render ANSI escape sequences correctly
+just_fix_windows_console()
+
+# Middlewares - these do not depend on settings
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    """Records per-route latency and logs requests slower than SLOW_REQUEST_MS."""
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        seconds = time.perf_counter() - start
+        # Route template (e.g. /api/v1/network/) keeps the label cardinality bounded
+        route = route_template(request) or "unmatched"
+        get_registry().observe_request(request.method, route, status_code, seconds)
+
+        if seconds * 1000 >= get_settings().SLOW_REQUEST_MS:
+            network_stats = getattr(request.state, "network_stats", None)
+            slow_request_logger.warning(
+                "Requisição lenta: %s %s params=%s status=%s %.0f ms%s",
+                request.method, request.url.path, dict(request.query_params), status_code, seconds * 1000,
+                f" rede={network_stats}" if network_stats else "",
+            )
+
+# Routers - these are included globally.
+# Their dependencies will use get_settings() when invoked.
+app.include_router(api_router, prefix="/api/v1")
+
+@app.get("/", include_in_schema=False)
+def read_root():
+    return {"message": "Bem-vindo à API de Consulta CNPJ. Acesse /docs para a documentação interativa."}
@@ -15,7 +15,29 @@ class Settings(BaseSettings):
     
     # Banco de Dados
     DATABASE_URL: str = "sqlite:///./output/CNPJ_full.db"
+    # Troca de banco sem parar a API (blue/green): arquivo de ponteiro gravado pelo
+    # cnpj.py --versionado, com o nome do .db em uso (tem prioridade sobre DATABASE_URL).
+    # Com DATABASE_WATCH_SECONDS > 0, a API troca de banco sozinha quando o ponteiro muda.
+    DATABASE_POINTER_FILE: Optional[str] = None
+    DATABASE_WATCH_SECONDS: float = 0
+    # Espera pelas requisições em andamento no banco anterior antes de fechá-lo
+    DATABASE_DRAIN_SECONDS: float = 30.0
+    # Aquecimento do novo banco antes da troca: prazo e nós de maior PageRank lidos
+    DATABASE_WARMUP_SECONDS: float = 120.0
+    DATABASE_WARMUP_HUBS: int = 200
     
+    # Observabilidade: requisições mais lentas que este limite (ms) são registradas no log
+    SLOW_REQUEST_MS: int = 1000
+
+    # Limites da montagem da rede: ao atingir um deles a resposta traz a rede parcial
+    # com truncated=true. NETWORK_HUB_DEGREE > 0 deixa de expandir nós com mais vínculos
+    # que isso (0 = expande todos).
+    NETWORK_MAX_NODES: int = 5000
+    NETWORK_MAX_EDGES: int = 20000
+    NETWORK_MAX_QUERIES: int = 5000
+    NETWORK_DEADLINE_SECONDS: float = 10.0
+    NETWORK_HUB_DEGREE: int = 0
+
     # SSL
     SSL_KEYFILE_PATH: Optional[str] = None
     SSL_CERTFILE_PATH: Optional[str] = None
@@ -0,0 +1,162 @@
+import threading
+from typing import Dict, Optional, Tuple
+
+# Limites superiores (segundos) das faixas dos histogramas de latência.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Limites das faixas dos histogramas de consultas SQL e de nós por rede montada.
+COUNT_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + '}'
+
+
+class Histogram:
+    """Histograma cumulativo no formato do Prometheus."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        for i, limit in enumerate(self.buckets):
+            if value <= limit:
+                self.counts[i] += 1
+                break
+
+    def render(self, name: str, labels: dict) -> list:
+        lines = []
+        cumulative = 0
+        for limit, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{_labels(**labels, le=f"{limit:g}")} {cumulative}')
+        lines.append(f'{name}_bucket{_labels(**labels, le="+Inf")} {self.count}')
+        lines.append(f'{name}_sum{_labels(**labels)} {self.sum:.6f}')
+        lines.append(f'{name}_count{_labels(**labels)} {self.count}')
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Métricas da API mantidas em memória: latência por rota, contagem de respostas
+    por status e estatísticas das redes montadas pelo NetworkBuilderService.
+
+    As métricas são por processo: com vários workers do uvicorn, cada um expõe
+    as suas no /metrics.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latency: Dict[Tuple[str, str], Histogram] = {}
+        self._responses: Dict[Tuple[str, str, int], int] = {}
+        self._network_seconds: Dict[Tuple[str, int], Histogram] = {}
+        self._network_queries: Dict[Tuple[str, int], Histogram] = {}
+        self._network_nodes: Dict[Tuple[str, int], Histogram] = {}
+        self._network_totals: Dict[str, float] = {
+            'builds': 0, 'sql_queries': 0, 'sql_rows': 0, 'nodes': 0, 'edges': 0,
+            'sql_seconds': 0.0, 'graph_seconds': 0.0, 'cache_hits': 0, 'cache_misses': 0, 'truncated': 0,
+        }
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float):
+        with self._lock:
+            key = (method, route)
+            if key not in self._latency:
+                self._latency[key] = Histogram(LATENCY_BUCKETS)
+            self._latency[key].observe(seconds)
+            self._responses[(method, route, status)] = self._responses.get((method, route, status), 0) + 1
+
+    def observe_network(self, tipo_consulta: str, nivel_max: int, stats: dict):
+        """Registra as estatísticas de uma rede montada (ver NetworkBuilderService.stats)."""
+        key = (tipo_consulta, nivel_max)
+        with self._lock:
+            for registry, buckets, value in (
+                    (self._network_seconds, LATENCY_BUCKETS, stats['sql_seconds'] + stats['graph_seconds']),
+                    (self._network_queries, COUNT_BUCKETS, stats['sql_queries']),
+                    (self._network_nodes, COUNT_BUCKETS, stats['nodes'])):
+                if key not in registry:
+                    registry[key] = Histogram(buckets)
+                registry[key].observe(value)
+
+            self._network_totals['builds'] += 1
+            for name in ('sql_queries', 'sql_rows', 'nodes', 'edges', 'sql_seconds', 'graph_seconds',
+                         'cache_hits', 'cache_misses', 'truncated'):
+                self._network_totals[name] += stats[name]
+
+    def render(self) -> str:
+        """Métricas no formato texto do Prometheus."""
+        with self._lock:
+            lines = ['# HELP http_request_duration_seconds Latência das requisições por rota.',
+                     '# TYPE http_request_duration_seconds histogram']
+            for (method, route), histogram in sorted(self._latency.items()):
+                lines += histogram.render('http_request_duration_seconds', {'method': method, 'route': route})
+
+            lines += ['# HELP http_responses_total Respostas por rota e status.',
+                      '# TYPE http_responses_total counter']
+            lines += [f'http_responses_total{_labels(method=m, route=r, status=s)} {n}'
+                      for (m, r, s), n in sorted(self._responses.items())]
+
+            for name, registry, description in (
+                    ('network_build_seconds', self._network_seconds, 'Tempo de montagem das redes.'),
+                    ('network_build_sql_queries', self._network_queries, 'Consultas SQL por rede montada.'),
+                    ('network_build_nodes', self._network_nodes, 'Nós por rede montada.')):
+                lines += [f'# HELP {name} {description}', f'# TYPE {name} histogram']
+                for (tipo, nivel), histogram in sorted(registry.items()):
+                    lines += histogram.render(name, {'tipo_consulta': tipo, 'nivel_max': nivel})
+
+            totals = self._network_totals
+            for name, description in (
+                    ('builds', 'Redes montadas.'),
+                    ('sql_queries', 'Consultas SQL executadas na montagem das redes.'),
+                    ('sql_rows', 'Linhas lidas do banco na montagem das redes.'),
+                    ('nodes', 'Nós produzidos.'),
+                    ('edges', 'Arestas produzidas.'),
+                    ('sql_seconds', 'Tempo gasto em consultas SQL.'),
+                    ('graph_seconds', 'Tempo gasto fora do SQL (montagem do grafo).'),
+                    ('cache_hits', 'Vínculos pré-calculados (centralidade) lidos do cache da montagem.'),
+                    ('cache_misses', 'Vínculos pré-calculados (centralidade) consultados no banco por não estarem no cache.'),
+                    ('truncated', 'Redes truncadas por atingir um limite de nós, arestas, consultas ou tempo.')):
+                metric = f'network_{name}_total'
+                lines += [f'# HELP {metric} {description}', f'# TYPE {metric} counter', f'{metric} {totals[name]:g}']
+
+            lookups = totals['cache_hits'] + totals['cache_misses']
+            lines += ['# HELP network_cache_hit_ratio Fração dos vínculos pré-calculados lidos do cache da montagem.',
+                      '# TYPE network_cache_hit_ratio gauge',
+                      f'network_cache_hit_ratio {totals["cache_hits"] / lookups if lookups else 0:.4f}']
+
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    return registry
+
+
+def route_template(request) -> Optional[str]:
+    """
+    Caminho da rota (ex: /api/v1/network/) em vez da URL com parâmetros, para limitar a cardinalidade.
+
+    O scope["route"] guarda o caminho relativo ao router incluído (em algumas versões
+    do FastAPI, só "/"), por isso o caminho completo é reconstruído pelo nome da rota.
+    """
+    route = request.scope.get('route')
+    if route is None:
+        return None
+    path_params = request.scope.get('path_params') or {}
+    try:
+        return request.app.url_path_for(route.name, **{name: '{%s}' % name for name in path_params})
+    except Exception:
+        # Conversores tipados (ex: {id:int}) não aceitam o marcador: fica o caminho relativo.
+        return getattr(route, 'path', None)
@@ -1,28 +1,205 @@
-from sqlalchemy import create_engine
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import sessionmaker
 from app.core.config import get_settings
+from app.db import warmup
+
+logger = logging.getLogger("api.database")
+
+# Tabelas que um arquivo precisa ter para a API passar a usá-lo.
+REQUIRED_TABLES = ('estabelecimentos', 'socios')
+
+
+class DatabaseSnapshot:
+    """
+    Um arquivo de banco servido pela API: o engine (com o pool de conexões), a
+    fábrica de sessões e as requisições em andamento nele.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.path = url[len('sqlite:///'):] if url.startswith('sqlite:///') else None
+        connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+        self.engine = create_engine(url, connect_args=connect_args)
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.in_flight = 0
+        self.activated_at: Optional[float] = None
+        self.warmup: Optional[dict] = None
+
+    def validate(self):
+        """Falha (ValueError) se o arquivo não existe ou não tem as tabelas da base de CNPJ."""
+        if self.path is not None and not os.path.isfile(self.path):
+            raise ValueError(f'Arquivo de banco não encontrado: {self.path}')
+        try:
+            missing = set(REQUIRED_TABLES) - set(inspect(self.engine).get_table_names())
+        except SQLAlchemyError as e:
+            raise ValueError(f'Banco {self.url} inválido: {e.orig if hasattr(e, "orig") else e}')
+        if missing:
+            raise ValueError(f'Banco {self.url} sem as tabelas: {", ".join(sorted(missing))}')
+
+    def info(self) -> dict:
+        return {'url': self.url, 'path': self.path, 'in_flight': self.in_flight,
+                'activated_at': self.activated_at, 'warmup': self.warmup}
 
-# Variáveis globais para o motor do banco de dados e a sessão local
+
+# Banco em uso e o anterior (até terminar de drenar). engine e SessionLocal
+# acompanham o banco em uso.
+_current: Optional[DatabaseSnapshot] = None
+_previous: Optional[DatabaseSnapshot] = None
 engine = None
 SessionLocal = None
 
+# Protege _current e as contagens de requisições; avisa quando uma requisição termina.
+_state = threading.Condition()
+# Uma troca de banco por vez.
+_switch_lock = threading.Lock()
+
+
+def resolve_pointer(pointer_file: str) -> Optional[str]:
+    """
+    URL do banco indicado no arquivo de ponteiro gravado pelo cnpj.py --versionado
+    (nome do arquivo .db, relativo à pasta do ponteiro), ou None se ele não existe.
+    """
+    if not os.path.isfile(pointer_file):
+        return None
+    with open(pointer_file, encoding='utf-8') as f:
+        name = f.read().strip()
+    if not name:
+        return None
+    return 'sqlite:///' + os.path.join(os.path.dirname(pointer_file), name)
+
+
+def _initial_url() -> str:
+    settings = get_settings()
+    if settings.DATABASE_POINTER_FILE:
+        url = resolve_pointer(settings.DATABASE_POINTER_FILE)
+        if url is not None:
+            return url
+    return settings.DATABASE_URL
+
+
 def initialize_database():
     """Inicializa o motor do banco de dados e a sessão local com base nas configurações."""
-    global engine, SessionLocal
-    if engine is None:
-        settings = get_settings()
-        SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
-        connect_args = {"check_same_thread": False} if SQLALCHEMY_DATABASE_URL.startswith("sqlite") else {}
-        engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args=connect_args)
-        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    global _current, engine, SessionLocal
+    with _state:
+        if _current is None:
+            _current = DatabaseSnapshot(_initial_url())
+            _current.activated_at = time.time()
+            engine, SessionLocal = _current.engine, _current.SessionLocal
+
+
+@contextmanager
+def snapshot_in_use():
+    """
+    O banco em uso, contado como em uso até o fim do bloco: uma troca de banco
+    espera os blocos abertos no banco anterior terminarem antes de fechá-lo.
+    """
+    if _current is None:
+        initialize_database()
+    with _state:
+        snapshot = _current
+        snapshot.in_flight += 1
+    try:
+        yield snapshot
+    finally:
+        with _state:
+            snapshot.in_flight -= 1
+            _state.notify_all()
+
 
 def get_db():
-    """Dependência para obter uma sessão de banco de dados."""
-    # Garante que o banco de dados seja inicializado na primeira requisição
-    if SessionLocal is None:
+    """Dependência para obter uma sessão de banco de dados (do banco em uso no início da requisição)."""
+    with snapshot_in_use() as snapshot:
+        db = snapshot.SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+def current_database() -> dict:
+    """Banco em uso e, durante uma troca, o anterior ainda drenando."""
+    if _current is None:
         initialize_database()
-    db = SessionLocal()
+    with _state:
+        return {'current': _current.info(), 'previous': _previous.info() if _previous else None}
+
+
+def switch_database(url: str, warm: bool = True) -> dict:
+    """
+    Troca o banco servido pela API (blue/green): valida o novo arquivo, aquece o cache
+    de páginas (ver warmup.py) enquanto o anterior continua atendendo, passa as novas
+    requisições para ele de uma vez e, depois que as requisições em andamento no
+    anterior terminam (até DATABASE_DRAIN_SECONDS), fecha as conexões do anterior.
+    O arquivo anterior pode então ser apagado ou sobrescrito.
+    """
+    global _current, _previous, engine, SessionLocal
+    if _current is None:
+        initialize_database()
+    settings = get_settings()
+    if not _switch_lock.acquire(blocking=False):
+        raise RuntimeError('Já há uma troca de banco em andamento.')
     try:
-        yield db
+        snapshot = DatabaseSnapshot(url)
+        try:
+            snapshot.validate()
+            if warm and snapshot.path is not None:
+                snapshot.warmup = warmup.warm_up(snapshot.path, settings.DATABASE_WARMUP_SECONDS,
+                                                 settings.DATABASE_WARMUP_HUBS)
+        except Exception:
+            snapshot.engine.dispose()
+            raise
+
+        with _state:
+            old = _current
+            _current, _previous = snapshot, old
+            engine, SessionLocal = snapshot.engine, snapshot.SessionLocal
+            snapshot.activated_at = time.time()
+            logger.info('Banco trocado: %s -> %s', old.url, snapshot.url)
+            inicio = time.monotonic()
+            drained = _state.wait_for(lambda: old.in_flight == 0, timeout=settings.DATABASE_DRAIN_SECONDS)
+            drain_seconds = time.monotonic() - inicio
+            _previous = None
+        if not drained:
+            logger.warning('Banco anterior %s fechado com %d requisições em andamento', old.url, old.in_flight)
+        old.engine.dispose()
+        return {'current': snapshot.info(), 'previous_url': old.url, 'drained': drained,
+                'drain_seconds': round(drain_seconds, 3)}
     finally:
-        db.close()
+        _switch_lock.release()
+
+
+def _watch_pointer(pointer_file: str, interval: float, stop: threading.Event):
+    """Troca o banco quando o arquivo de ponteiro passa a indicar outro arquivo (um arquivo inválido é tentado uma vez)."""
+    failed = None
+    while not stop.wait(interval):
+        url = None
+        try:
+            url = resolve_pointer(pointer_file)
+            if url is not None and url not in (_current.url, failed):
+                switch_database(url)
+        except Exception:
+            failed = url
+            logger.exception('Falha ao trocar para o banco indicado em %s', pointer_file)
+
+
+def start_pointer_watcher() -> Optional[threading.Event]:
+    """
+    Com DATABASE_POINTER_FILE e DATABASE_WATCH_SECONDS > 0, verifica o ponteiro a cada
+    DATABASE_WATCH_SECONDS em uma thread. Devolve o evento que encerra a verificação.
+    """
+    settings = get_settings()
+    if not settings.DATABASE_POINTER_FILE or settings.DATABASE_WATCH_SECONDS <= 0:
+        return None
+    initialize_database()
+    stop = threading.Event()
+    threading.Thread(target=_watch_pointer, name='database-pointer-watcher', daemon=True,
+                     args=(settings.DATABASE_POINTER_FILE, settings.DATABASE_WATCH_SECONDS, stop)).start()
+    return stop
@@ -0,0 +1,92 @@
+import time
+import sqlite3
+import logging
+
+logger = logging.getLogger("api.database")
+
+# Índices lidos por inteiro no aquecimento, na ordem de prioridade: os das consultas
+# da montagem da rede primeiro. Os que não existem no banco são ignorados.
+WARMUP_INDEXES = [
+    ('socios', 'ix_socios_cnpj_basico'),
+    ('socios', 'ix_socios_cpf_cnpj'),
+    ('estabelecimentos', 'ix_estabelecimentos_matriz'),
+    ('estabelecimentos', 'ix_estabelecimentos_cnpj'),
+    ('centralidade', 'ix_centralidade_chave'),
+    ('grupos', 'ix_grupos_chave'),
+    ('beneficiarios', 'ix_beneficiarios_empresa'),
+    ('compartilhados', 'ix_compartilhados_cnpj'),
+]
+
+# Instruções da máquina virtual do SQLite entre as verificações do prazo.
+_PROGRESS_STEPS = 100000
+
+
+class _DeadlineReached(Exception):
+    pass
+
+
+def _hubs(conn, limit: int) -> list:
+    """(chave, tipo_pessoa) das empresas e pessoas de maior PageRank (tabela centralidade), metade de cada."""
+    hubs = []
+    for tipo_pessoa in (1, 2):
+        hubs += conn.execute('SELECT chave, tipo_pessoa FROM centralidade WHERE tipo_pessoa = ? '
+                             'ORDER BY pagerank DESC LIMIT ?', (tipo_pessoa, (limit + 1) // 2)).fetchall()
+    return hubs
+
+
+def _read_hub(conn, chave: str, tipo_pessoa: int):
+    """Lê as linhas que a montagem da rede lê ao passar pelo nó: sócios, participações e estabelecimentos."""
+    if tipo_pessoa == 1:
+        conn.execute('SELECT * FROM socios WHERE cnpj_basico = ?', (chave,)).fetchall()
+        conn.execute("SELECT * FROM socios WHERE cnpj_cpf_socio BETWEEN ? || '000000' AND ? || '999999'",
+                     (chave, chave)).fetchall()
+        conn.execute('SELECT * FROM estabelecimentos WHERE cnpj_basico = ?', (chave,)).fetchall()
+    else:
+        conn.execute('SELECT * FROM socios WHERE cnpj_cpf_socio = ? AND nome_socio_razao_social = ?',
+                     (chave[:11], chave[11:])).fetchall()
+
+
+def warm_up(path: str, deadline_seconds: float, hubs: int) -> dict:
+    """
+    Aquece o cache de páginas do sistema operacional para um banco que vai entrar em
+    uso: percorre os índices de WARMUP_INDEXES e lê as linhas dos `hubs` nós de maior
+    PageRank (se a centralidade foi calculada), que aparecem em boa parte das redes.
+    Para ao atingir deadline_seconds. As conexões do pool leem depois as mesmas
+    páginas do cache do sistema, sem ir ao disco.
+    """
+    inicio = time.monotonic()
+    prazo = inicio + deadline_seconds
+    stats = {'indexes': [], 'hubs': 0, 'seconds': 0.0, 'complete': False}
+    conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    # Interrompe a consulta em andamento ao atingir o prazo. O count(*) de um índice
+    # percorre as páginas dele de uma vez, sem passar pelo handler: o prazo também é
+    # verificado entre um passo e outro.
+    conn.set_progress_handler(lambda: time.monotonic() > prazo, _PROGRESS_STEPS)
+
+    def check_deadline():
+        if time.monotonic() > prazo:
+            raise _DeadlineReached('prazo atingido')
+
+    try:
+        existing = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'index')")}
+        for table, index in WARMUP_INDEXES:
+            if index in existing:
+                check_deadline()
+                conn.execute(f'SELECT count(*) FROM {table} INDEXED BY {index}').fetchone()
+                stats['indexes'].append(index)
+        if hubs and 'centralidade' in existing:
+            for chave, tipo_pessoa in _hubs(conn, hubs):
+                check_deadline()
+                _read_hub(conn, chave, tipo_pessoa)
+                stats['hubs'] += 1
+        stats['complete'] = True
+    except (sqlite3.OperationalError, _DeadlineReached) as e:
+        if time.monotonic() <= prazo:
+            raise
+        logger.warning('Aquecimento de %s interrompido no prazo de %.0fs (%s)', path, deadline_seconds, e)
+    finally:
+        conn.close()
+        stats['seconds'] = round(time.monotonic() - inicio, 3)
+    logger.info('Banco %s aquecido em %.1fs: %d índices, %d hubs', path, stats['seconds'],
+                len(stats['indexes']), stats['hubs'])
+    return stats
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 class Node(BaseModel):
     id: str = Field(..., description="Identificador único do nó (CNPJ para PJ, CPF+Nome para PF).")
@@ -10,7 +10,136 @@ class Edge(BaseModel):
     target: str = Field(..., description="ID do nó de destino do vínculo.")
     attributes: Dict[str, Any] = Field(..., description="Dicionário com os atributos do vínculo (ex: qualificação do sócio).")
 
+class LevelStats(BaseModel):
+    nivel: int = Field(..., description="Nível na rede (0 = ponto de entrada; nivel_max + 1 = nós apenas ligados à borda).")
+    nodes: int = Field(..., description="Nós da rede neste nível.")
+    hubs: int = Field(..., description="Nós deste nível não expandidos por terem vínculos demais.")
+    edges: int = Field(..., description="Arestas incluídas a partir dos nós deste nível.")
+    queries: int = Field(..., description="Consultas SQL feitas a partir dos nós deste nível.")
+
 class Graph(BaseModel):
     """Modelo de resposta para a rede de relacionamentos."""
     nodes: List[Node] = Field(..., description="Lista de nós (empresas ou pessoas) na rede.")
     edges: List[Edge] = Field(..., description="Lista de arestas (vínculos) entre os nós.")
+    truncated: bool = Field(False, description="Indica se a montagem parou ao atingir um limite (rede parcial).")
+    truncation_reason: Optional[str] = Field(None, description="Limite atingido: max_nodes, max_edges, max_queries ou deadline.")
+    levels: List[LevelStats] = Field([], description="Estatísticas da montagem por nível.")
+    super_nodes: Optional[List[Dict[str, Any]]] = Field(None, description="Com layout=true, em redes grandes: grupos de nós próximos (x, y, n e o nó principal), para ver a rede de longe.")
+
+
+class Neighborhood(BaseModel):
+    """Modelo de resposta para a vizinhança (1 salto) de um nó, paginada pelos vínculos."""
+    node: str = Field(..., description="ID do nó consultado.")
+    nodes: List[Node] = Field(..., description="O nó consultado (nivel 0) e os vizinhos da página (nivel 1).")
+    edges: List[Edge] = Field(..., description="Vínculos da página entre o nó e os vizinhos.")
+    total_count: int = Field(..., description="Número total de vínculos do nó.")
+    total_pages: int = Field(..., description="Número total de páginas.")
+    page: int = Field(..., description="Número da página atual.")
+    page_size: int = Field(..., description="Número de vínculos por página.")
+
+
+class GroupInfo(BaseModel):
+    """Modelo de resposta para o grupo econômico de uma empresa ou pessoa."""
+    node: str = Field(..., description="ID consultado (CNPJ ou CPF mascarado + nome).")
+    group: Optional[int] = Field(None, description="Número do grupo (None = sem vínculos societários: grupo de um só membro).")
+    size: int = Field(..., description="Número de membros (empresas e pessoas) do grupo.")
+    companies: int = Field(..., description="Número de empresas do grupo.")
+
+
+class SameGroup(BaseModel):
+    """Modelo de resposta para a verificação de duas empresas/pessoas no mesmo grupo econômico."""
+    a: str = Field(..., description="Primeiro ID consultado.")
+    b: str = Field(..., description="Segundo ID consultado.")
+    group_a: Optional[int] = Field(None, description="Grupo do primeiro ID.")
+    group_b: Optional[int] = Field(None, description="Grupo do segundo ID.")
+    same_group: bool = Field(..., description="Se estão ligados por algum caminho de vínculos societários.")
+
+
+class GroupMember(BaseModel):
+    key: str = Field(..., description="cnpj_basico (empresas) ou CPF mascarado + nome (pessoas).")
+    tipo_pessoa: int = Field(..., description="1 = empresa, 2 = pessoa física ou estrangeiro.")
+
+
+class GroupMembers(BaseModel):
+    """Modelo de resposta para os membros de um grupo econômico, paginados."""
+    group: int = Field(..., description="Número do grupo.")
+    size: int = Field(..., description="Número de membros do grupo.")
+    companies: int = Field(..., description="Número de empresas do grupo.")
+    total_pages: int = Field(..., description="Número total de páginas.")
+    page: int = Field(..., description="Número da página atual.")
+    page_size: int = Field(..., description="Número de membros por página.")
+    members: List[GroupMember] = Field(..., description="Membros da página: empresas primeiro, em ordem de chave.")
+
+
+class CentralityScores(BaseModel):
+    """Modelo de resposta para a centralidade de uma empresa ou pessoa na rede inteira de sócios."""
+    key: str = Field(..., description="cnpj_basico (empresas) ou CPF mascarado + nome (pessoas).")
+    tipo_pessoa: int = Field(..., description="1 = empresa, 2 = pessoa física ou estrangeiro.")
+    grau: int = Field(..., description="Número de vizinhos distintos (sócios e empresas em que é sócia).")
+    socios: int = Field(..., description="Linhas de socios da empresa (0 para pessoas).")
+    participacoes: int = Field(..., description="Linhas de socios em que a empresa/pessoa é sócia.")
+    pagerank: float = Field(..., description="PageRank no grafo não dirigido dos vínculos societários.")
+    kcore: int = Field(..., description="Maior k tal que o nó está no k-core da rede.")
+
+
+class CentralityRanking(BaseModel):
+    """Modelo de resposta para o ranking de centralidade, paginado."""
+    metric: str = Field(..., description="Métrica da ordenação (decrescente).")
+    page: int = Field(..., description="Número da página atual.")
+    page_size: int = Field(..., description="Número de itens por página.")
+    items: List[CentralityScores] = Field(..., description="Empresas/pessoas da página.")
+
+
+class NetworkEstimate(BaseModel):
+    """Modelo de resposta para a estimativa do tamanho da rede de um nó, antes de montá-la."""
+    node: str = Field(..., description="ID consultado (CNPJ ou CPF mascarado + nome).")
+    neighbors: int = Field(..., description="Vizinhos a 1 salto (exato).")
+    within_2_hops_max: int = Field(..., description="Teto para o número de nós da rede com nivel_max = 1 (nós a até 2 saltos).")
+    group: Optional[int] = Field(None, description="Grupo econômico do nó (se os grupos foram calculados).")
+    group_size: Optional[int] = Field(None, description="Tamanho do grupo econômico: teto para a rede em qualquer nível.")
+
+
+class BeneficialOwner(BaseModel):
+    key: str = Field(..., description="CPF mascarado + nome (PF e estrangeiros) ou cnpj_basico (empresa no topo da cadeia).")
+    identificador_socio: int = Field(..., description="1 = PJ, 2 = pessoa física, 3 = estrangeiro.")
+    depth: int = Field(..., description="Número de vínculos até a empresa (1 = sócio direto).")
+
+
+class BeneficialOwners(BaseModel):
+    """Modelo de resposta para os beneficiários finais de uma empresa."""
+    cnpj_basico: str = Field(..., description="Empresa consultada.")
+    max_depth: int = Field(..., description="Comprimento da cadeia mais longa.")
+    cycle: bool = Field(..., description="Se a empresa faz parte de um ciclo de participações societárias.")
+    owners: List[BeneficialOwner] = Field(..., description="Beneficiários, dos mais próximos aos mais distantes.")
+
+
+class ControlledCompany(BaseModel):
+    cnpj_basico: str = Field(..., description="Empresa controlada.")
+    depth: int = Field(..., description="Número de vínculos até a empresa (1 = sócio direto).")
+
+
+class ControlledCompanies(BaseModel):
+    """Modelo de resposta para as empresas de que uma pessoa é beneficiária final."""
+    node: str = Field(..., description="ID consultado.")
+    companies: List[ControlledCompany] = Field(..., description="Empresas, das mais próximas às mais distantes.")
+
+
+class DatabaseSnapshotInfo(BaseModel):
+    """Um arquivo de banco servido pela API."""
+    url: str = Field(..., description="URL do banco (SQLAlchemy).")
+    path: Optional[str] = Field(None, description="Caminho do arquivo SQLite.")
+    in_flight: int = Field(..., description="Requisições em andamento neste banco.")
+    activated_at: Optional[float] = Field(None, description="Início do uso deste banco (timestamp Unix).")
+    warmup: Optional[Dict[str, Any]] = Field(None, description="Aquecimento antes da troca: índices lidos, hubs lidos, segundos e se terminou no prazo.")
+
+class DatabaseStatus(BaseModel):
+    """Modelo de resposta para o banco em uso."""
+    current: DatabaseSnapshotInfo = Field(..., description="Banco em uso pelas novas requisições.")
+    previous: Optional[DatabaseSnapshotInfo] = Field(None, description="Durante uma troca: banco anterior, ainda com requisições em andamento.")
+
+class DatabaseSwitch(BaseModel):
+    """Modelo de resposta para a troca de banco."""
+    current: DatabaseSnapshotInfo = Field(..., description="Novo banco em uso.")
+    previous_url: str = Field(..., description="Banco anterior, já fechado.")
+    drained: bool = Field(..., description="Se as requisições em andamento no banco anterior terminaram antes do prazo (DATABASE_DRAIN_SECONDS).")
+    drain_seconds: float = Field(..., description="Espera pelas requisições em andamento no banco anterior.")
@@ -0,0 +1,63 @@
+from typing import TYPE_CHECKING
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.services.group_service import group_key
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Tabela gravada pelo src/beneficiarios.py após a carga.
+BENEFICIAL_OWNERS_TABLE = 'beneficiarios'
+
+
+class BeneficialOwnerService:
+    """
+    Consultas aos beneficiários finais (pessoas no topo das cadeias de sócios PJ),
+    calculados em lote pelo src/beneficiarios.py: quem controla uma empresa e quais
+    empresas uma pessoa controla, sem expandir a rede nível a nível.
+
+    Empresas sem sócios PJ não estão na tabela: os beneficiários delas são os próprios
+    sócios, lidos da tabela socios.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def available(self) -> bool:
+        """Se os beneficiários já foram calculados neste banco."""
+        return self.db.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                               {'name': BENEFICIAL_OWNERS_TABLE}).first() is not None
+
+    def owners_of(self, cnpj: str) -> 'pd.DataFrame':
+        """beneficiario, identificador_socio, profundidade e ciclo, dos mais próximos aos mais distantes."""
+        import pandas as pd
+        params = (cnpj[:8],)
+        df = pd.read_sql_query(f'SELECT beneficiario, identificador_socio, profundidade, ciclo FROM {BENEFICIAL_OWNERS_TABLE} '
+                               f'WHERE cnpj_basico = ? ORDER BY profundidade, beneficiario', self.db.bind, params=params)
+        if df.empty:
+            df = pd.read_sql_query("SELECT DISTINCT ifnull(cnpj_cpf_socio, '') || ifnull(nome_socio_razao_social, '') AS beneficiario, "
+                                   "CAST(identificador_socio AS INTEGER) AS identificador_socio, 1 AS profundidade, 0 AS ciclo "
+                                   "FROM socios WHERE cnpj_basico = ? ORDER BY beneficiario", self.db.bind, params=params)
+        return df
+
+    def controlled_by(self, node_id: str) -> 'pd.DataFrame':
+        """
+        Empresas (cnpj_basico) de que a pessoa é beneficiária final, com a menor
+        profundidade. Para uma empresa, as participações diretas e as cadeias em que
+        ela é o topo.
+        """
+        import pandas as pd
+        key = group_key(node_id)
+        if key.isdigit():
+            direct = ("SELECT cnpj_basico FROM socios WHERE cnpj_cpf_socio BETWEEN ? || '000000' AND ? || '999999' "
+                      "AND +identificador_socio = '1'")
+            params = (key, key, key)
+        else:
+            direct = 'SELECT cnpj_basico FROM socios WHERE cnpj_cpf_socio = ? AND nome_socio_razao_social = ?'
+            params = (key[:11], key[11:], key)
+        return pd.read_sql_query(f'SELECT cnpj_basico, min(profundidade) AS profundidade FROM ('
+                                 f'SELECT cnpj_basico, 1 AS profundidade FROM ({direct}) '
+                                 f'UNION ALL SELECT cnpj_basico, profundidade FROM {BENEFICIAL_OWNERS_TABLE} WHERE beneficiario = ?) '
+                                 f'GROUP BY cnpj_basico ORDER BY profundidade, cnpj_basico', self.db.bind, params=params)
@@ -0,0 +1,80 @@
+from typing import TYPE_CHECKING, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.services.group_service import GroupService, group_key
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Tabela gravada pelo src/centralidade.py após a carga.
+CENTRALITY_TABLE = 'centralidade'
+
+# Métricas que podem ordenar o ranking.
+RANKING_METRICS = ('pagerank', 'grau', 'kcore', 'socios', 'participacoes')
+
+
+class CentralityService:
+    """
+    Consultas à centralidade da rede inteira de sócios (grau, vínculos, PageRank e
+    k-core), calculada em lote pelo src/centralidade.py: métricas de um nó, ranking e
+    estimativa do tamanho de uma rede antes de montá-la.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def available(self) -> bool:
+        """Se a centralidade já foi calculada neste banco."""
+        return self.db.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                               {'name': CENTRALITY_TABLE}).first() is not None
+
+    def scores(self, node_id: str) -> Optional[dict]:
+        """grau, socios, participacoes, pagerank e kcore do nó, ou None se ele não tem vínculos."""
+        row = self.db.execute(text(f'SELECT grau, socios, participacoes, pagerank, kcore FROM {CENTRALITY_TABLE} '
+                                   f'WHERE chave = :key'), {'key': group_key(node_id)}).mappings().first()
+        return dict(row) if row else None
+
+    def ranking(self, metric: str = 'pagerank', tipo_pessoa: Optional[int] = None,
+                page: int = 1, page_size: int = 100) -> 'pd.DataFrame':
+        """Empresas/pessoas em ordem decrescente da métrica, paginadas."""
+        import pandas as pd
+        if metric not in RANKING_METRICS:
+            raise ValueError(f"Métrica inválida: {metric}. Opções: {', '.join(RANKING_METRICS)}")
+        where = 'WHERE tipo_pessoa = ?' if tipo_pessoa is not None else ''
+        params = ([tipo_pessoa] if tipo_pessoa is not None else []) + [page_size, (page - 1) * page_size]
+        query = (f'SELECT chave, tipo_pessoa, grau, socios, participacoes, pagerank, kcore FROM {CENTRALITY_TABLE} '
+                 f'{where} ORDER BY {metric} DESC, chave LIMIT ? OFFSET ?')
+        return pd.read_sql_query(query, self.db.bind, params=tuple(params))
+
+    def estimate(self, node_id: str) -> dict:
+        """
+        Tamanho da rede de um nó antes de montá-la: vizinhos (exato), teto para os nós a
+        até 2 saltos (1 + grau + soma dos graus dos vizinhos) e o tamanho do grupo
+        econômico, teto para qualquer nível (se os grupos foram calculados). A rede com
+        nivel_max = k chega a nós a k + 1 saltos: a de nível 1 tem no máximo
+        within_2_hops_max nós.
+        """
+        key = group_key(node_id)
+        scores = self.scores(node_id)
+        if scores is None:
+            return {'neighbors': 0, 'within_2_hops_max': 1, 'group': None, 'group_size': 1}
+        if key.isdigit():
+            neighbors = ("SELECT CASE WHEN identificador_socio = '1' THEN substr(cnpj_cpf_socio, 1, 8) "
+                         "ELSE cnpj_cpf_socio || nome_socio_razao_social END AS chave FROM socios WHERE cnpj_basico = :key "
+                         "UNION SELECT cnpj_basico FROM socios "
+                         "WHERE cnpj_cpf_socio BETWEEN :key || '000000' AND :key || '999999' AND identificador_socio = '1'")
+            params = {'key': key}
+        else:
+            neighbors = "SELECT cnpj_basico AS chave FROM socios WHERE cnpj_cpf_socio = :cpf AND nome_socio_razao_social = :nome"
+            params = {'cpf': key[:11], 'nome': key[11:]}
+        total = self.db.execute(text(f'SELECT sum(c.grau) FROM ({neighbors}) v '
+                                     f'JOIN {CENTRALITY_TABLE} c ON c.chave = v.chave'), params).scalar() or 0
+        result = {'neighbors': scores['grau'], 'within_2_hops_max': 1 + scores['grau'] + total,
+                  'group': None, 'group_size': None}
+        groups = GroupService(self.db)
+        if groups.available():
+            result['group'] = groups.group_of(node_id)
+            result['group_size'] = groups.group_size(result['group'])[0]
+        return result
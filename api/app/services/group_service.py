@@ -0,0 +1,63 @@
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Tabelas gravadas pelo src/grupos.py após a carga (componentes conexos da rede de sócios).
+GROUPS_TABLE = 'grupos'
+GROUP_SIZES_TABLE = 'grupos_tamanho'
+
+
+def group_key(node_id: str) -> str:
+    """Chave na tabela grupos: o cnpj_basico para CNPJs (14 ou 8 dígitos); para pessoas, o CPF mascarado + nome."""
+    if node_id.isdigit() and len(node_id) in (8, 14):
+        return node_id[:8]
+    return node_id
+
+
+class GroupService:
+    """
+    Consultas aos grupos econômicos (componentes conexos da rede inteira de sócios),
+    calculados em lote pelo src/grupos.py: grupo de uma empresa/pessoa, tamanho do
+    grupo, membros e se duas empresas/pessoas estão no mesmo grupo, sem montar a rede.
+
+    Empresas/pessoas sem vínculos não estão na tabela: cada uma é um grupo de um só
+    membro (grupo None).
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def available(self) -> bool:
+        """Se os grupos já foram calculados neste banco."""
+        return self.db.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                               {'name': GROUP_SIZES_TABLE}).first() is not None
+
+    def group_of(self, node_id: str) -> Optional[int]:
+        row = self.db.execute(text(f'SELECT grupo FROM {GROUPS_TABLE} WHERE chave = :key'),
+                              {'key': group_key(node_id)}).first()
+        return row[0] if row else None
+
+    def group_size(self, group: Optional[int]) -> Tuple[int, int]:
+        """(membros, empresas) do grupo; (1, 1) para quem não tem vínculos e (0, 0) se o grupo não existe."""
+        if group is None:
+            return 1, 1
+        row = self.db.execute(text(f'SELECT nos, empresas FROM {GROUP_SIZES_TABLE} WHERE grupo = :group'),
+                              {'group': group}).first()
+        return (row[0], row[1]) if row else (0, 0)
+
+    def same_group(self, node_a: str, node_b: str) -> bool:
+        if group_key(node_a) == group_key(node_b):
+            return True
+        group_a = self.group_of(node_a)
+        return group_a is not None and group_a == self.group_of(node_b)
+
+    def members(self, group: int, page: int = 1, page_size: int = 100) -> 'pd.DataFrame':
+        """Membros do grupo (chave, tipo_pessoa), empresas primeiro, em ordem de chave, paginados no banco."""
+        import pandas as pd
+        query = (f'SELECT chave, tipo_pessoa FROM {GROUPS_TABLE} WHERE grupo = ? '
+                 f'ORDER BY tipo_pessoa, chave LIMIT ? OFFSET ?')
+        return pd.read_sql_query(query, self.db.bind, params=(group, page_size, (page - 1) * page_size))
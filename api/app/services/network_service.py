@@ -1,18 +1,294 @@
-import pandas as pd
-import networkx as nx
+import time
+from typing import TYPE_CHECKING, List, Optional
 from sqlalchemy.orm import Session
-from networkx.readwrite import json_graph
+from app.services.centrality_service import CentralityService, CENTRALITY_TABLE
+from app.services.shared_attribute_service import (SharedAttributeService, SHARED_ATTRIBUTE_TYPES,
+                                                   shared_neighbors_query)
+
+# pandas e o grafo (numpy) só são importados ao montar a primeira rede: a API sobe
+# sem eles, e o lifespan do main.py os pré-carrega em segundo plano.
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Colunas de socios lidas na expansão da rede; as demais são lidas na hidratação.
+SOCIOS_KEY_COLUMNS = ['cnpj_basico', 'identificador_socio', 'cnpj_cpf_socio', 'nome_socio_razao_social']
+
+# Número de chaves (estabelecimentos ou pares empresa-sócio) por consulta na hidratação.
+HYDRATION_BATCH_SIZE = 500
+
+# node_columns/edge_columns: hidrata todas as colunas da tabela.
+ALL_COLUMNS = '*'
+
+
+def _literal(value) -> str:
+    """Valor como literal de texto SQL (aspas simples escapadas)."""
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _codes(values: Optional[List[str]], description: str) -> Optional[tuple]:
+    """Códigos de qualificação ou de situação cadastral com 2 dígitos, ordenados; None = sem filtro."""
+    if not values:
+        return None
+    codes = tuple(sorted({str(v).strip().zfill(2) for v in values}))
+    invalid = [c for c in codes if not (c.isdigit() and len(c) == 2)]
+    if invalid:
+        raise ValueError(f'Códigos de {description} inválidos: {", ".join(invalid)}')
+    return codes
+
+
+def _in_filter(column: str, codes: Optional[tuple]) -> str:
+    """Condição ' AND coluna IN (...)' com os códigos já validados, ou '' sem filtro."""
+    if not codes:
+        return ''
+    return f" AND {column} IN ({', '.join(_literal(c) for c in codes)})"
+
+
+def split_node_id(node_id: str):
+    """
+    (tipo_pessoa, id_pessoa) a partir do id de um nó da rede: 14 dígitos = PJ (o CNPJ);
+    senão, PF, com o CPF mascarado nos 11 primeiros caracteres seguido do nome.
+    """
+    if len(node_id) == 14 and node_id.isdigit():
+        return 1, node_id
+    return 2, (node_id[:11], node_id[11:])
 
 class NetworkBuilderService:
-    def __init__(self, db: Session, nivel_max: int = 1):
+    """
+    Monta a rede de relacionamentos a partir de um CNPJ, CPF ou nome de sócio.
+
+    Além da profundidade (nivel_max), a expansão é limitada pelo número de nós, de
+    arestas e de consultas SQL e por um prazo em segundos (None = sem limite). Ao
+    atingir um limite, a expansão para e a rede parcial é devolvida com `truncated`
+    = True. Com hub_degree, nós com mais vínculos que isso não são expandidos.
+
+    Se a centralidade foi calculada (src/centralidade.py), os vínculos de cada nó são
+    conhecidos antes das consultas: hubs e empresas sem sócios ou sem participações
+    não são consultados.
+
+    Com shared_attributes (tipos de SHARED_ATTRIBUTE_TYPES, com src/compartilhados.py
+    calculado), empresas com o mesmo endereço, telefone ou e-mail também são ligadas
+    (arestas mesmo_endereco, mesmo_telefone e mesmo_email) e expandidas.
+
+    qualifications (códigos de qualificacao_socio) e situations (códigos de
+    situacao_cadastral, ex: ['02'] = só ativas) restringem os vínculos seguidos
+    (None ou vazio = sem filtro). Os filtros entram nas próprias consultas da
+    expansão: sócios e empresas excluídos não são lidos. A origem entra sempre.
+
+    A expansão lê apenas as colunas-chave; ao final, os atributos das arestas
+    (socios) e, se pedidos, dos nós PJ (estabelecimentos) são lidos em lote, só
+    para as colunas em edge_columns/node_columns (ALL_COLUMNS = todas; None ou
+    [] = nenhuma). Por padrão, todas as das arestas e nenhuma dos nós.
+    """
+    def __init__(self, db: Session, nivel_max: int = 1, max_nodes: Optional[int] = None,
+                 max_edges: Optional[int] = None, max_queries: Optional[int] = None,
+                 deadline_seconds: Optional[float] = None, hub_degree: Optional[int] = None,
+                 node_columns: Optional[List[str]] = None, edge_columns: Optional[List[str]] = ALL_COLUMNS,
+                 shared_attributes: Optional[List[str]] = None, qualifications: Optional[List[str]] = None,
+                 situations: Optional[List[str]] = None):
         self.db = db
         self.nivel_max = nivel_max
-        self.G = nx.DiGraph()
+        self.max_nodes = max_nodes
+        self.max_edges = max_edges
+        self.max_queries = max_queries
+        self.deadline_seconds = deadline_seconds
+        self.hub_degree = hub_degree
+        self._deadline = None
+        self.truncated = False
+        self.truncation_reason = None
+        # Consultas SQL e arestas incluídas a partir dos nós de cada nível
+        self._queries_per_level = {}
+        self._edges_per_level = {}
+        # Grafo compacto (atributos em colunas, adjacência em arrays); ver src/grafo.py
+        from grafo import Grafo
+        self.G = Grafo()
+        # Vínculos pré-calculados de cada nó (tabela centralidade), se existir; o cache
+        # da montagem (_precomputed) é medido em cache_hits/cache_misses nas estatísticas
+        self._centrality = CentralityService(db)
+        self._use_centrality = self._centrality.available()
+        self._precomputed = {}
+        self.node_columns = self._projection('estabelecimentos', node_columns)
+        self.edge_columns = self._projection('socios', edge_columns)
+        self.shared_attributes = self._shared_types(shared_attributes)
+        self.qualifications = _codes(qualifications, 'qualificação')
+        self.situations = _codes(situations, 'situação cadastral')
+        # Condições dos filtros nas consultas de sócios (socios) e de participações (socios s
+        # JOIN estabelecimentos e da matriz); sócios PJ são filtrados pelo próprio estabelecimento
+        self._socios_filter = _in_filter('qualificacao_socio', self.qualifications)
+        if self.situations:
+            self._socios_filter += (
+                " AND (identificador_socio <> '1' OR EXISTS (SELECT 1 FROM estabelecimentos e "
+                "WHERE e.cnpj_basico = substr(socios.cnpj_cpf_socio, 1, 8) "
+                "AND e.cnpj_ordem = substr(socios.cnpj_cpf_socio, 9, 4) "
+                "AND e.cnpj_dv = substr(socios.cnpj_cpf_socio, 13, 2)"
+                f"{_in_filter('e.situacao_cadastral', self.situations)}))")
+        # Nós PJ expandidos, hidratados ao final da montagem
+        self._pj_nodes = {}
+        # Estatísticas da montagem, expostas no /metrics e no log de requisições lentas.
+        self.stats = {'sql_queries': 0, 'sql_rows': 0, 'sql_seconds': 0.0, 'graph_seconds': 0.0,
+                      'cache_hits': 0, 'cache_misses': 0, 'nodes': 0, 'edges': 0, 'truncated': 0}
 
     def _get_full_cnpj(self, row):
         return f"{row['cnpj_basico']}{row['cnpj_ordem']}{row['cnpj_dv']}"
 
+    def _read_sql(self, query: str, nivel: Optional[int] = 0) -> 'pd.DataFrame':
+        """Executa a consulta contabilizando o tempo e as linhas lidas (e, se houver nível, a consulta no nível)."""
+        import pandas as pd
+        if nivel is not None:
+            self._queries_per_level[nivel] = self._queries_per_level.get(nivel, 0) + 1
+        inicio = time.perf_counter()
+        df = pd.read_sql_query(query, self.db.bind)
+        self.stats['sql_seconds'] += time.perf_counter() - inicio
+        self.stats['sql_queries'] += 1
+        self.stats['sql_rows'] += len(df)
+        return df
+
+    def _projection(self, table: str, columns: Optional[List[str]]) -> List[str]:
+        """Colunas da tabela a hidratar: todas (ALL_COLUMNS), nenhuma (None) ou as informadas, que precisam existir na tabela."""
+        if not columns:
+            return []
+        import pandas as pd
+        existing = list(pd.read_sql_query(f'SELECT * FROM {table} LIMIT 0', self.db.bind).columns)
+        if columns == ALL_COLUMNS:
+            return existing
+        unknown = [c for c in columns if c not in existing]
+        if unknown:
+            raise ValueError(f'Colunas inexistentes na tabela {table}: {", ".join(unknown)}')
+        return list(columns)
+
+    def _shared_types(self, types: Optional[List[str]]) -> tuple:
+        """Tipos de atributo compartilhado a seguir na expansão; exigem a tabela de src/compartilhados.py."""
+        types = tuple(types or ())
+        unknown = [t for t in types if t not in SHARED_ATTRIBUTE_TYPES]
+        if unknown:
+            raise ValueError(f'Tipos de atributo compartilhado inválidos: {", ".join(unknown)} '
+                             f'(opções: {", ".join(SHARED_ATTRIBUTE_TYPES)})')
+        if types and not SharedAttributeService(self.db).available():
+            raise ValueError('Atributos compartilhados não calculados nesta base (execute src/compartilhados.py).')
+        return types
+
+    def _read_batches(self, table: str, columns: List[str], key_columns: List[str], keys) -> list:
+        """
+        Linhas da tabela cujas key_columns estão entre as chaves (tuplas) informadas, em consultas
+        de até HYDRATION_BATCH_SIZE chaves. Com a chave completa, cada nó lê só o seu estabelecimento
+        (e não todas as filiais do cnpj_basico). O OR de igualdades usa o índice em qualquer banco.
+        """
+        keys = list(keys)
+        rows = []
+        for start in range(0, len(keys), HYDRATION_BATCH_SIZE):
+            batch = keys[start:start + HYDRATION_BATCH_SIZE]
+            condition = ' OR '.join('(' + ' AND '.join(f'{c} = {_literal(v)}' for c, v in zip(key_columns, key)) + ')'
+                                    for key in batch)
+            df = self._read_sql(f"SELECT {', '.join(columns)} FROM {table} WHERE {condition}", nivel=None)
+            # Colunas só com nulos no lote viriam como NaN: mantém None
+            rows += df.astype(object).where(df.notna(), None).to_dict('records')
+        return rows
+
+    def _hydrate(self):
+        """Lê em lote os atributos dos nós PJ e das arestas, só para as colunas pedidas."""
+        nodes = [n for n in self._pj_nodes if n in self.G]
+        if nodes and self.node_columns:
+            columns = list(dict.fromkeys(['cnpj_basico', 'cnpj_ordem', 'cnpj_dv'] + self.node_columns))
+            by_cnpj = {row['cnpj_basico'] + row['cnpj_ordem'] + row['cnpj_dv']: row
+                       for row in self._read_batches('estabelecimentos', columns, ['cnpj_basico', 'cnpj_ordem', 'cnpj_dv'],
+                                                     ((n[:8], n[8:12], n[12:]) for n in nodes))}
+            for cnpj in nodes:
+                row = by_cnpj.get(cnpj)
+                if row is not None:
+                    self.G.nodes[cnpj].update({c: row[c] for c in self.node_columns})
+
+        extra_columns = [c for c in self.edge_columns if c not in SOCIOS_KEY_COLUMNS]
+        if self.G.number_of_edges() and extra_columns:
+            keys = ['cnpj_basico', 'cnpj_cpf_socio', 'nome_socio_razao_social']
+            # Só as arestas de sócios vêm da tabela socios
+            edges = [self.G.edges[u, v] for u, v in self.G.edges if self.G.edges[u, v].get('tipo') == 'socio']
+            by_key = {tuple(row[k] for k in keys): row
+                      for row in self._read_batches('socios', keys + extra_columns, ['cnpj_basico', 'cnpj_cpf_socio'],
+                                                    dict.fromkeys((e['cnpj_basico'], e['cnpj_cpf_socio']) for e in edges))}
+            for attributes in edges:
+                row = by_key.get(tuple(attributes[k] for k in keys))
+                if row is not None:
+                    attributes.update({c: row[c] for c in extra_columns})
+
+    def _within_budget(self, new_nodes: int = 0, expansion: bool = True) -> bool:
+        """
+        Verifica se a rede comporta mais `new_nodes` nós e, se expansion, se os limites
+        de consultas e o prazo não foram atingidos. Ao atingir um limite, marca a rede
+        como truncada.
+        """
+        reason = None
+        if self.max_nodes is not None and self.G.number_of_nodes() + new_nodes > self.max_nodes:
+            reason = 'max_nodes'
+        elif self.max_edges is not None and self.G.number_of_edges() >= self.max_edges:
+            reason = 'max_edges'
+        elif expansion and self.max_queries is not None and self.stats['sql_queries'] >= self.max_queries:
+            reason = 'max_queries'
+        elif expansion and self._deadline is not None and time.monotonic() > self._deadline:
+            reason = 'deadline'
+
+        if reason is not None and not self.truncated:
+            self.truncated = True
+            self.truncation_reason = reason
+        return reason is None
+
+    def _add_edge(self, source, target, nivel, **attributes):
+        """
+        Inclui a aresta se couber nos limites. Nós ainda fora da rede (além do nível
+        máximo) contam no limite de nós e, com a rede truncada, não entram mais.
+        """
+        new_nodes = (source not in self.G) + (target not in self.G)
+        if self.truncated and new_nodes:
+            return
+        if not self.G.has_edge(source, target) and not self._within_budget(new_nodes, expansion=False):
+            return
+        self.G.add_edge(source, target, **attributes)
+        self._edges_per_level[nivel] = self._edges_per_level.get(nivel, 0) + 1
+
+    def _is_hub(self, id_node, nivel, n_links):
+        """Marca o nó como hub não expandido se tiver mais vínculos que hub_degree. A origem é sempre expandida."""
+        if not self.hub_degree or nivel == 0 or n_links <= self.hub_degree:
+            return False
+        self.G.nodes[id_node]['hub'] = True
+        self.G.nodes[id_node]['vinculos_nao_expandidos'] = self.G.nodes[id_node].get('vinculos_nao_expandidos', 0) + n_links
+        return True
+
+    def _precomputed_links(self, id_node, nivel, tipo_pessoa=1):
+        """
+        Linhas de socios (socios e participacoes) do nó, pela tabela centralidade; None sem
+        a tabela. Pessoas sempre têm participações: só são consultadas para achar hubs.
+        """
+        if not self._use_centrality or (tipo_pessoa == 2 and not self.hub_degree):
+            return None
+        if id_node in self._precomputed:
+            self.stats['cache_hits'] += 1
+        else:
+            self.stats['cache_misses'] += 1
+            self._queries_per_level[nivel] = self._queries_per_level.get(nivel, 0) + 1
+            inicio = time.perf_counter()
+            # Fora da tabela = sem nenhum vínculo
+            self._precomputed[id_node] = self._centrality.scores(id_node) or {'socios': 0, 'participacoes': 0}
+            self.stats['sql_seconds'] += time.perf_counter() - inicio
+            self.stats['sql_queries'] += 1
+        return self._precomputed[id_node]
+
+    def level_stats(self):
+        """Por nível: nós na rede, hubs não expandidos e arestas e consultas SQL feitas a partir dos nós do nível."""
+        stats = {}
+        for _, data in self.G.nodes(data=True):
+            # Nós criados apenas por arestas ficam além do nível máximo
+            nivel = data.get('nivel', self.nivel_max + 1)
+            level = stats.setdefault(nivel, {'nivel': nivel, 'nodes': 0, 'hubs': 0, 'edges': 0, 'queries': 0})
+            level['nodes'] += 1
+            level['hubs'] += int(bool(data.get('hub')))
+        for nivel in set(self._edges_per_level) | set(self._queries_per_level):
+            level = stats.setdefault(nivel, {'nivel': nivel, 'nodes': 0, 'hubs': 0, 'edges': 0, 'queries': 0})
+            level['edges'] = self._edges_per_level.get(nivel, 0)
+            level['queries'] = self._queries_per_level.get(nivel, 0)
+        return [stats[nivel] for nivel in sorted(stats)]
+
     def build_network(self, tipo_consulta: str, valor: str):
+        inicio = time.perf_counter()
+        if self.deadline_seconds is not None:
+            self._deadline = time.monotonic() + self.deadline_seconds
         if tipo_consulta == 'cnpj':
             self._explorar_vinculos(1, valor)
         elif tipo_consulta == 'nome_socio':
@@ -20,8 +296,98 @@ class NetworkBuilderService:
         elif tipo_consulta == 'cpf':
             cpf_mascarado = '***' + valor[3:9] + '**'
             self._insere_por_cpf(cpf_mascarado)
+        self._hydrate()
+
+        self.stats['graph_seconds'] = time.perf_counter() - inicio - self.stats['sql_seconds']
+        self.stats['nodes'] = self.G.number_of_nodes()
+        self.stats['edges'] = self.G.number_of_edges()
+        self.stats['truncated'] = int(self.truncated)
         return self.G
 
+    def build_neighborhood(self, node_id: str, page: int = 1, page_size: int = 50, order: str = 'nome'):
+        """
+        Vizinhança de um nó (vínculos a 1 salto), paginada no próprio SQL: os sócios
+        da empresa e as participações societárias da empresa ou da pessoa, nesta
+        ordem. Devolve o grafo com o nó (nivel 0), os vizinhos da página (nivel 1)
+        e as arestas entre eles, e o total de vínculos do nó.
+
+        Participações em empresas sem estabelecimento matriz não entram no grafo,
+        mas contam no total. Os filtros de qualifications e situations valem como em
+        build_network: vínculos fora deles não entram nem contam. Com order = 'pagerank' (e a centralidade calculada), os
+        vizinhos de maior PageRank vêm primeiro; senão, a ordem é pelo nome.
+        """
+        inicio = time.perf_counter()
+        tipo_pessoa, id_pessoa = split_node_id(node_id)
+        columns = ', '.join(SOCIOS_KEY_COLUMNS)
+        # Participações: só em empresas com matriz nas situações pedidas
+        participations_filter = _in_filter('qualificacao_socio', self.qualifications)
+        if self.situations:
+            participations_filter += (
+                " AND EXISTS (SELECT 1 FROM estabelecimentos e WHERE e.cnpj_basico = socios.cnpj_basico "
+                f"AND e.identificador_matriz_filial = '1'{_in_filter('e.situacao_cadastral', self.situations)})")
+        if tipo_pessoa == 1:
+            links = (f"SELECT 'socio' AS direcao, {columns} FROM socios "
+                     f"WHERE cnpj_basico = {_literal(node_id[:8])}{self._socios_filter} "
+                     f"UNION ALL "
+                     f"SELECT 'participacao' AS direcao, {columns} FROM socios "
+                     f"WHERE cnpj_cpf_socio = {_literal(node_id)}{participations_filter}")
+        else:
+            cpf, nome = id_pessoa
+            links = (f"SELECT 'participacao' AS direcao, {columns} FROM socios "
+                     f"WHERE cnpj_cpf_socio = {_literal(cpf)} AND nome_socio_razao_social = {_literal(nome)}"
+                     f"{participations_filter}")
+
+        total_count = int(self._read_sql(f"SELECT COUNT(*) AS total FROM ({links})").iloc[0]['total'])
+        order_by = 'l.direcao DESC, l.nome_socio_razao_social, l.cnpj_basico, l.cnpj_cpf_socio'
+        # CNPJ da matriz de cada participação na mesma consulta (NULL se a empresa não tem matriz)
+        links_ordered = (f"SELECT l.*, e.cnpj_basico || e.cnpj_ordem || e.cnpj_dv AS cnpj_matriz FROM ({links}) l "
+                         f"LEFT JOIN estabelecimentos e ON l.direcao = 'participacao' "
+                         f"AND e.cnpj_basico = l.cnpj_basico AND e.identificador_matriz_filial = '1'"
+                         f"{_in_filter('e.situacao_cadastral', self.situations)}")
+        if order == 'pagerank' and self._use_centrality:
+            neighbor_key = ("CASE WHEN l.direcao = 'participacao' THEN l.cnpj_basico "
+                            "WHEN l.identificador_socio = '1' THEN substr(l.cnpj_cpf_socio, 1, 8) "
+                            "ELSE l.cnpj_cpf_socio || l.nome_socio_razao_social END")
+            links_ordered += f" LEFT JOIN {CENTRALITY_TABLE} c ON c.chave = {neighbor_key}"
+            order_by = order_by.replace('l.direcao DESC, ', 'l.direcao DESC, c.pagerank DESC, ')
+        df_links = self._read_sql(f"{links_ordered} ORDER BY {order_by} "
+                                  f"LIMIT {int(page_size)} OFFSET {(int(page) - 1) * int(page_size)}")
+
+        if total_count or tipo_pessoa == 1:
+            self.G.add_node(node_id, nivel=0, tipo_pessoa=tipo_pessoa)
+            if tipo_pessoa == 1:
+                self._pj_nodes[node_id] = None
+            else:
+                self.G.nodes[node_id].update({'cpf': id_pessoa[0], 'nome': id_pessoa[1]})
+
+        for _, link in df_links.iterrows():
+            attributes = link[SOCIOS_KEY_COLUMNS].to_dict()
+            if link['direcao'] == 'socio':
+                tipo_socio = int(link['identificador_socio'])
+                cpf_cnpj, nome = link['cnpj_cpf_socio'], link['nome_socio_razao_social']
+                neighbor = cpf_cnpj if tipo_socio == 1 else cpf_cnpj + nome
+                source, target = neighbor, node_id
+            else:
+                neighbor = link['cnpj_matriz']
+                if not isinstance(neighbor, str):
+                    continue
+                tipo_socio = 1
+                source, target = node_id, neighbor
+
+            if neighbor not in self.G:
+                self.G.add_node(neighbor, nivel=1, tipo_pessoa=tipo_socio)
+                if tipo_socio == 1:
+                    self._pj_nodes[neighbor] = None
+                else:
+                    self.G.nodes[neighbor].update({'cpf': cpf_cnpj, 'nome': nome})
+            self.G.add_edge(source, target, tipo='socio', **attributes)
+        self._hydrate()
+
+        self.stats['graph_seconds'] = time.perf_counter() - inicio - self.stats['sql_seconds']
+        self.stats['nodes'] = self.G.number_of_nodes()
+        self.stats['edges'] = self.G.number_of_edges()
+        return self.G, total_count
+
     def _insere_por_cpf(self, cpf: str):
         query = f"SELECT DISTINCT identificador_socio, cnpj_cpf_socio, nome_socio_razao_social FROM socios WHERE cnpj_cpf_socio = '{cpf}'"
         self._processar_socios_encontrados(query)
@@ -31,7 +397,7 @@ class NetworkBuilderService:
         self._processar_socios_encontrados(query)
 
     def _processar_socios_encontrados(self, query: str):
-        df_socios = pd.read_sql_query(query, self.db.bind)
+        df_socios = self._read_sql(query)
         if df_socios.empty:
             return
         for _, socio in df_socios.iterrows():
@@ -47,7 +413,9 @@ class NetworkBuilderService:
         id_node = id_pessoa if tipo_pessoa == 1 else id_pessoa[0] + id_pessoa[1]
         if id_node in self.G and self.G.nodes[id_node].get('nivel', self.nivel_max + 1) <= nivel:
             return
-        
+        if self.truncated or not self._within_budget(new_nodes=int(id_node not in self.G)):
+            return
+
         if id_node not in self.G:
             self.G.add_node(id_node, nivel=nivel, tipo_pessoa=tipo_pessoa)
         else:
@@ -59,12 +427,35 @@ class NetworkBuilderService:
             self._processar_pf(id_node, id_pessoa, nivel)
 
     def _processar_pj(self, cnpj, nivel):
+        self._pj_nodes[cnpj] = None
         cnpj_basico = cnpj[:8]
-        query_socios = f"SELECT * FROM socios WHERE cnpj_basico = '{cnpj_basico}'"
-        df_socios = pd.read_sql_query(query_socios, self.db.bind)
-        for _, socio in df_socios.iterrows():
-            self._adicionar_vinculo_socio(socio, cnpj, nivel)
+        precomputed = self._precomputed_links(cnpj, nivel)
+        if precomputed is None or (precomputed['socios'] and not self._is_hub(cnpj, nivel, precomputed['socios'])):
+            query_socios = (f"SELECT {', '.join(SOCIOS_KEY_COLUMNS)} FROM socios "
+                            f"WHERE cnpj_basico = '{cnpj_basico}'{self._socios_filter}")
+            df_socios = self._read_sql(query_socios, nivel)
+            if not self._is_hub(cnpj, nivel, len(df_socios)):
+                for _, socio in df_socios.iterrows():
+                    if self.truncated:
+                        return
+                    self._adicionar_vinculo_socio(socio, cnpj, nivel)
         self._buscar_participacoes_societarias(1, cnpj, nivel)
+        if self.shared_attributes and not self.truncated:
+            self._buscar_compartilhados(cnpj, nivel)
+
+    def _buscar_compartilhados(self, cnpj, nivel):
+        """Liga a empresa às que têm o mesmo endereço, telefone ou e-mail (uma aresta por par de empresas)."""
+        df = self._read_sql(shared_neighbors_query(cnpj[:8], self.shared_attributes, self.situations), nivel)
+        neighbors = {}
+        for row in df.itertuples():
+            neighbors.setdefault(row.cnpj_basico + row.cnpj_ordem + row.cnpj_dv, []).append(row.tipo)
+        for cnpj_neighbor, types in neighbors.items():
+            if not self._within_budget():
+                return
+            self._explorar_vinculos(1, cnpj_neighbor, nivel + 1, origem=cnpj)
+            if not self.G.has_edge(cnpj_neighbor, cnpj):
+                types.sort(key=SHARED_ATTRIBUTE_TYPES.index)
+                self._add_edge(cnpj, cnpj_neighbor, nivel, tipo='mesmo_' + types[0], compartilha=','.join(types))
 
     def _processar_pf(self, id_node, id_pessoa, nivel):
         cpf, nome = id_pessoa
@@ -73,20 +464,29 @@ class NetworkBuilderService:
 
     def _buscar_participacoes_societarias(self, tipo_pessoa, id_pessoa, nivel):
         source_node = id_pessoa if tipo_pessoa == 1 else id_pessoa[0] + id_pessoa[1]
+        precomputed = self._precomputed_links(source_node, nivel, tipo_pessoa)
+        if precomputed is not None and (not precomputed['participacoes'] or self._is_hub(source_node, nivel, precomputed['participacoes'])):
+            return
         if tipo_pessoa == 1:
-            query = f"SELECT * FROM socios WHERE cnpj_cpf_socio = '{id_pessoa}'"
+            condition = f"s.cnpj_cpf_socio = '{id_pessoa}'"
         else:
             cpf, nome = id_pessoa
-            query = f"SELECT * FROM socios WHERE cnpj_cpf_socio = '{cpf}' AND nome_socio_razao_social = '{nome}'"
-        df_participacoes = pd.read_sql_query(query, self.db.bind)
+            condition = f"s.cnpj_cpf_socio = '{cpf}' AND s.nome_socio_razao_social = '{nome}'"
+        # A matriz de cada empresa vem na mesma consulta (uma por nó, não uma por participação);
+        # empresas sem matriz ou fora das situações pedidas não são lidas
+        query = (f"SELECT {', '.join('s.' + c for c in SOCIOS_KEY_COLUMNS)}, e.cnpj_ordem, e.cnpj_dv FROM socios s "
+                 f"JOIN estabelecimentos e ON e.cnpj_basico = s.cnpj_basico AND e.identificador_matriz_filial = '1'"
+                 f"{_in_filter('e.situacao_cadastral', self.situations)} "
+                 f"WHERE {condition}{_in_filter('s.qualificacao_socio', self.qualifications)}")
+        df_participacoes = self._read_sql(query, nivel)
+        if self._is_hub(source_node, nivel, len(df_participacoes)):
+            return
         for _, participacao in df_participacoes.iterrows():
-            cnpj_basico = participacao['cnpj_basico']
-            query_matriz = f"SELECT * FROM estabelecimentos WHERE cnpj_basico = '{cnpj_basico}' AND identificador_matriz_filial = 1"
-            df_matriz = pd.read_sql_query(query_matriz, self.db.bind)
-            if not df_matriz.empty:
-                cnpj_matriz = self._get_full_cnpj(df_matriz.iloc[0])
-                self._explorar_vinculos(1, cnpj_matriz, nivel + 1, origem=id_pessoa)
-                self.G.add_edge(source_node, cnpj_matriz, tipo='socio', **participacao.to_dict())
+            if not self._within_budget():
+                return
+            cnpj_matriz = self._get_full_cnpj(participacao)
+            self._explorar_vinculos(1, cnpj_matriz, nivel + 1, origem=id_pessoa)
+            self._add_edge(source_node, cnpj_matriz, nivel, tipo='socio', **participacao[SOCIOS_KEY_COLUMNS].to_dict())
 
     def _adicionar_vinculo_socio(self, socio, cnpj_empresa, nivel):
         tipo_socio = int(socio['identificador_socio'])
@@ -95,4 +495,4 @@ class NetworkBuilderService:
         id_socio_node = id_socio_num if tipo_socio == 1 else id_socio_num + nome_socio
         
         self._explorar_vinculos(tipo_socio, id_socio_num if tipo_socio == 1 else (id_socio_num, nome_socio), nivel + 1, origem=cnpj_empresa)
-        self.G.add_edge(id_socio_node, cnpj_empresa, tipo='socio', **socio.to_dict())
+        self._add_edge(id_socio_node, cnpj_empresa, nivel, tipo='socio', **socio.to_dict())
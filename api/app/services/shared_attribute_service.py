@@ -0,0 +1,37 @@
+from typing import Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Tabela gravada pelo src/compartilhados.py após a carga: (tipo, chave, cnpj_basico)
+# das empresas com o mesmo endereço, telefone ou e-mail.
+SHARED_ATTRIBUTES_TABLE = 'compartilhados'
+SHARED_ATTRIBUTE_TYPES = ('endereco', 'telefone', 'email')
+
+
+def shared_neighbors_query(cnpj_basico: str, types: Sequence[str], situations: Optional[Sequence[str]] = None) -> str:
+    """
+    Consulta das empresas que compartilham algum dos tipos com a empresa, com o CNPJ
+    da matriz: tipo, cnpj_basico, cnpj_ordem, cnpj_dv (os tipos e as situações já
+    validados). Com situations, só as matrizes nessas situações cadastrais.
+    """
+    type_list = ', '.join(f"'{t}'" for t in types)
+    situation_filter = f" AND e.situacao_cadastral IN ({', '.join(repr(s) for s in situations)})" if situations else ''
+    cnpj_basico = cnpj_basico.replace("'", "''")
+    return (f"SELECT a.tipo, e.cnpj_basico, e.cnpj_ordem, e.cnpj_dv FROM {SHARED_ATTRIBUTES_TABLE} a "
+            f"JOIN {SHARED_ATTRIBUTES_TABLE} b ON b.tipo = a.tipo AND b.chave = a.chave AND b.cnpj_basico <> a.cnpj_basico "
+            f"JOIN estabelecimentos e ON e.cnpj_basico = b.cnpj_basico AND e.identificador_matriz_filial = '1' "
+            f"WHERE a.cnpj_basico = '{cnpj_basico}' AND a.tipo IN ({type_list}){situation_filter} "
+            f"ORDER BY e.cnpj_basico, a.tipo")
+
+
+class SharedAttributeService:
+    """Acesso à tabela de endereços, telefones e e-mails compartilhados (src/compartilhados.py)."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def available(self) -> bool:
+        """Se os atributos compartilhados já foram calculados neste banco."""
+        return self.db.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                               {'name': SHARED_ATTRIBUTES_TABLE}).first() is not None
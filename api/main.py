@@ -1,10 +1,6 @@
 import typer
 import os
 import sys
-import uvicorn
-from colorama import just_fix_windows_console
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
 
 # Resolve paths and ensure imports work when running this file directly
 THIS_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -18,41 +14,16 @@ if PROJECT_ROOT not in sys.path:
 if THIS_DIR not in sys.path:
     sys.path.insert(0, THIS_DIR)
 
-# Import get_settings here, but don't call it yet.
-from app.core.config import get_settings
-
-# Import api_router here. Its dependencies (get_db, get_current_user)
-# will correctly use get_settings() when they are called.
-from app.api_v1.api import api_router
-
-# Create the FastAPI app instance globally.
-# Its configuration (title, description, etc.) does not depend on settings.
-app = FastAPI(
-    title="API de Consulta de Rede CNPJ",
-    description="API para explorar a rede de relacionamentos de empresas e sócios da base de dados da Receita Federal.",
-    version="1.0.0",
-    openapi_url="/api/v1/openapi.json"
-)
-
-# Fix Windows console to render ANSI escape sequences correctly
-just_fix_windows_console()
-
-# Middlewares - these do not depend on settings
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Routers - these are included globally.
-# Their dependencies will use get_settings() when invoked.
-app.include_router(api_router, prefix="/api/v1")
-
-@app.get("/", include_in_schema=False)
-def read_root():
-    return {"message": "Bem-vindo à API de Consulta CNPJ. Acesse /docs para a documentação interativa."}
+def __getattr__(name):
+    """
+    The FastAPI app (app/application.py) is imported on first access to main.app,
+    by uvicorn ("api.main:app") or by tests: the CLI below (--help, option errors)
+    starts without importing FastAPI, SQLAlchemy and the routers.
+    """
+    if name == "app":
+        from app.application import app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # --- CLI with Typer ---
@@ -68,6 +39,8 @@ def run(
     )
 ):
     """Starts the FastAPI API server using Uvicorn."""
+    import uvicorn
+    from app.core.config import get_settings
 
     # Set the ENV_FILE environment variable.
     # This must happen BEFORE get_settings() is called for the first time.
@@ -105,6 +78,7 @@ def run(
         uvicorn.run("api.main:app", **uvicorn_args)
     except ModuleNotFoundError:
         # Fallback for environments where import string resolution fails
+        from app.application import app
         uvicorn.run(app, **uvicorn_args)
 
 if __name__ == "__main__":
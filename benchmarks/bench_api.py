@@ -0,0 +1,364 @@
+"""
+Teste de carga da API (api/main.py): endpoints /network e /query.
+
+Sobe uma instância local do uvicorn apontando para um banco sintético (gerado
+com o gera_dados_rfb.py e carregado com o cnpj.py, como no bench_carga.py) ou
+para o banco informado em --base, e dispara uma mistura configurável de
+requisições com vários clientes simultâneos:
+
+    cnpj, cpf, nome_socio : GET /api/v1/network/ com nivel_max sorteado em --niveis
+    query                 : POST /api/v1/query com SELECT paginado
+
+Com --url, a carga é enviada para uma API já em execução. Com --taxa, as
+requisições são disparadas em ritmo fixo (carga aberta) e a latência é medida
+a partir do horário programado de cada uma, para não esconder filas.
+
+O relatório traz, por tipo de requisição (e nível), throughput, latências
+p50/p90/p99/p99.9/máx, histograma de latências e taxas de erro (4xx, 5xx e
+falhas de conexão), e pode ser gravado em JSON para comparar execuções.
+
+Uso:
+    python benchmarks/bench_api.py --empresas 20000 --concorrencia 8 --duracao 30
+    python benchmarks/bench_api.py --base output/CNPJ_full.db --mix cnpj:6,cpf:2,nome_socio:1,query:1 --niveis 0 1 2
+    python benchmarks/bench_api.py --url http://localhost:8000 --token <token> --base output/CNPJ_full.db --taxa 20
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import sqlite3
+import argparse
+import datetime
+import tempfile
+import threading
+import contextlib
+import subprocess
+import http.client
+import urllib.parse
+
+import numpy as np
+
+DIR_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+RAIZ_PROJETO = os.path.dirname(DIR_BENCHMARKS)
+
+import bench_carga
+import gera_dados_rfb
+
+TOKEN_PADRAO = 'token_do_teste_de_carga'
+MIX_PADRAO = 'cnpj:5,cpf:2,nome_socio:2,query:1'
+
+# Limites superiores (ms) das faixas do histograma de latências.
+FAIXAS_HISTOGRAMA_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, float('inf')]
+
+# Consultas SQL usadas nas requisições ao /query.
+CONSULTAS_SQL = [
+    "SELECT cnpj_basico, cnpj_ordem, cnpj_dv, nome_fantasia, uf FROM estabelecimentos WHERE uf = '{uf}'",
+    "SELECT * FROM socios WHERE qualificacao_socio = '49'",
+    "SELECT cnpj_basico, razao_social, capital_social FROM empresas WHERE porte_empresa = '05'",
+]
+UFS = [uf for uf, _ in gera_dados_rfb.UFS_MUNICIPIOS]
+
+
+def parse_mix(texto):
+    """'cnpj:5,cpf:2' -> {'cnpj': 5.0, 'cpf': 2.0}"""
+    mix = {}
+    for parte in texto.split(','):
+        tipo, _, peso = parte.partition(':')
+        if tipo not in ('cnpj', 'cpf', 'nome_socio', 'query'):
+            raise ValueError(f'Tipo de requisição inválido no --mix: {tipo}')
+        mix[tipo] = float(peso or 1)
+    return mix
+
+
+def amostra_valores(db_path, n=500, seed=0):
+    """Valores reais do banco para as consultas de rede: CNPJs de matrizes, CPFs e nomes de sócios."""
+    rng = random.Random(seed)
+    with contextlib.closing(sqlite3.connect(db_path)) as conBD:
+        cnpjs = [r[0] for r in conBD.execute(
+            "SELECT cnpj_basico || cnpj_ordem || cnpj_dv FROM estabelecimentos "
+            "WHERE identificador_matriz_filial = '1' ORDER BY RANDOM() LIMIT ?", (n,))]
+        pfs = conBD.execute(
+            "SELECT cnpj_cpf_socio, nome_socio_razao_social FROM socios "
+            "WHERE identificador_socio = '2' ORDER BY RANDOM() LIMIT ?", (n,)).fetchall()
+
+    # A API recebe o CPF com 11 dígitos e aplica a máscara ***XXXXXX**: só os
+    # 6 dígitos centrais importam.
+    cpfs = ['000' + cpf[3:9] + '00' for cpf, _ in pfs]
+    nomes = [nome for _, nome in pfs]
+    rng.shuffle(cpfs)
+    return {'cnpj': cnpjs, 'cpf': cpfs, 'nome_socio': nomes}
+
+
+class GeradorRequisicoes:
+    """Sorteia as requisições segundo o mix, os níveis e os valores amostrados."""
+
+    def __init__(self, mix, niveis, valores, page_size=50, seed=0):
+        self.tipos = list(mix)
+        self.pesos = [mix[t] for t in self.tipos]
+        self.niveis = niveis
+        self.valores = valores
+        self.page_size = page_size
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def proxima(self):
+        """Retorna (rótulo, método, caminho, corpo)."""
+        with self.lock:
+            tipo = self.rng.choices(self.tipos, self.pesos)[0]
+            if tipo == 'query':
+                sql = self.rng.choice(CONSULTAS_SQL).format(uf=self.rng.choice(UFS))
+                pagina = self.rng.randint(1, 5)
+                caminho = f'/api/v1/query?page={pagina}&page_size={self.page_size}'
+                return 'query', 'POST', caminho, json.dumps({'sql': sql})
+
+            nivel = self.rng.choice(self.niveis)
+            valor = self.rng.choice(self.valores[tipo])
+        params = urllib.parse.urlencode({'tipo_consulta': tipo, 'valor': valor, 'nivel_max': nivel})
+        return f'{tipo}/nivel{nivel}', 'GET', f'/api/v1/network/?{params}', None
+
+
+class Cliente:
+    """Conexão HTTP keep-alive de um cliente do teste de carga (uma por thread)."""
+
+    def __init__(self, url, token, timeout):
+        partes = urllib.parse.urlsplit(url)
+        classe = http.client.HTTPSConnection if partes.scheme == 'https' else http.client.HTTPConnection
+        self._nova_conexao = lambda: classe(partes.hostname, partes.port, timeout=timeout)
+        self.conexao = self._nova_conexao()
+        self.headers = {'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'}
+
+    def envia(self, metodo, caminho, corpo):
+        """Retorna (status, bytes da resposta); status 0 indica falha de conexão/timeout."""
+        try:
+            self.conexao.request(metodo, caminho, body=corpo, headers=self.headers)
+            resposta = self.conexao.getresponse()
+            return resposta.status, len(resposta.read())
+        except (OSError, http.client.HTTPException):
+            self.conexao.close()
+            self.conexao = self._nova_conexao()
+            return 0, 0
+
+
+class Resultados:
+    """Amostras (rótulo, status, latência, bytes) coletadas pelas threads."""
+
+    def __init__(self):
+        self.amostras = []
+        self.lock = threading.Lock()
+
+    def registra(self, rotulo, status, latencia, n_bytes):
+        with self.lock:
+            self.amostras.append((rotulo, status, latencia, n_bytes))
+
+
+def executa_carga(url, token, gerador, concorrencia, duracao, taxa=None, timeout=120):
+    """
+    Dispara requisições durante `duracao` segundos com `concorrencia` clientes.
+    Sem taxa, cada cliente envia a próxima requisição assim que recebe a resposta
+    (carga fechada). Com taxa (req/s), as requisições são programadas em ritmo
+    fixo e a latência conta a partir do horário programado (carga aberta).
+    """
+    resultados = Resultados()
+    inicio = time.perf_counter()
+    fim = inicio + duracao
+    proxima_programada = [inicio]
+    lock_agenda = threading.Lock()
+
+    def agenda():
+        """Horário programado da próxima requisição (carga aberta)."""
+        with lock_agenda:
+            horario = proxima_programada[0]
+            proxima_programada[0] += 1.0 / taxa
+        return horario
+
+    def trabalha():
+        cliente = Cliente(url, token, timeout)
+        while True:
+            if taxa:
+                programada = agenda()
+                if programada >= fim:
+                    break
+                espera = programada - time.perf_counter()
+                if espera > 0:
+                    time.sleep(espera)
+            else:
+                programada = time.perf_counter()
+                if programada >= fim:
+                    break
+
+            rotulo, metodo, caminho, corpo = gerador.proxima()
+            status, n_bytes = cliente.envia(metodo, caminho, corpo)
+            resultados.registra(rotulo, status, time.perf_counter() - programada, n_bytes)
+        cliente.conexao.close()
+
+    threads = [threading.Thread(target=trabalha, name=f'cliente_{i}') for i in range(concorrencia)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return resultados.amostras, time.perf_counter() - inicio
+
+
+def histograma(latencias_ms):
+    contagens, _ = np.histogram(latencias_ms, bins=[0] + FAIXAS_HISTOGRAMA_MS)
+    return {f'<={faixa:g}ms' if faixa != float('inf') else f'>{FAIXAS_HISTOGRAMA_MS[-2]:g}ms': int(c)
+            for faixa, c in zip(FAIXAS_HISTOGRAMA_MS, contagens)}
+
+
+def resume(amostras, segundos):
+    """Estatísticas por rótulo e no total."""
+    grupos = {}
+    for amostra in amostras:
+        grupos.setdefault(amostra[0], []).append(amostra)
+    grupos = dict(sorted(grupos.items()))
+    grupos['total'] = amostras
+
+    resumo = {}
+    for rotulo, grupo in grupos.items():
+        status = np.array([a[1] for a in grupo])
+        latencias_ms = np.array([a[2] for a in grupo]) * 1000
+        ok = (status >= 200) & (status < 400)
+        estatisticas = {
+            'requisicoes': len(grupo),
+            'req_por_s': round(len(grupo) / segundos, 2),
+            'ok_por_s': round(int(ok.sum()) / segundos, 2),
+            'erros_4xx': int(((status >= 400) & (status < 500)).sum()),
+            'erros_5xx': int((status >= 500).sum()),
+            'falhas_conexao': int((status == 0).sum()),
+            'taxa_erro': round(float((~ok).mean()), 4),
+            'status': {str(s): int(n) for s, n in zip(*np.unique(status, return_counts=True))},
+            'kb_medio_resposta': round(float(np.mean([a[3] for a in grupo])) / 1024, 1),
+        }
+        for nome, p in (('p50_ms', 50), ('p90_ms', 90), ('p99_ms', 99), ('p999_ms', 99.9)):
+            estatisticas[nome] = round(float(np.percentile(latencias_ms, p)), 2)
+        estatisticas['max_ms'] = round(float(latencias_ms.max()), 2)
+        estatisticas['histograma'] = histograma(latencias_ms)
+        resumo[rotulo] = estatisticas
+    return resumo
+
+
+def imprime_resumo(resumo):
+    print(f'  {"requisição":<22} {"n":>7} {"req/s":>8} {"p50 ms":>9} {"p90 ms":>9} {"p99 ms":>9} '
+          f'{"máx ms":>9} {"4xx":>5} {"5xx":>5} {"falhas":>6}')
+    for rotulo, e in resumo.items():
+        print(f'  {rotulo:<22} {e["requisicoes"]:>7,} {e["req_por_s"]:>8.1f} {e["p50_ms"]:>9.1f} {e["p90_ms"]:>9.1f} '
+              f'{e["p99_ms"]:>9.1f} {e["max_ms"]:>9.1f} {e["erros_4xx"]:>5} {e["erros_5xx"]:>5} {e["falhas_conexao"]:>6}')
+    print('  Histograma (total):')
+    total = resumo['total']['histograma']
+    maior = max(total.values()) or 1
+    for faixa, n in total.items():
+        if n:
+            print(f'    {faixa:>10} {n:>8,} {"#" * max(1, round(40 * n / maior))}')
+
+
+def porta_livre():
+    with contextlib.closing(socket.socket()) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def servidor_local(db_path, token, workers=1):
+    """Sobe o uvicorn com a API apontando para db_path e espera o /status responder."""
+    porta = porta_livre()
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{os.path.abspath(db_path)}', STATIC_BEARER_TOKEN=token,
+               API_RELOAD='false', API_DEBUG='false')
+    env['PYTHONPATH'] = os.pathsep.join(p for p in (RAIZ_PROJETO, os.path.join(RAIZ_PROJETO, 'api'),
+                                                     env.get('PYTHONPATH')) if p)
+    env.pop('ENV_FILE', None)
+
+    processo = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'api.main:app', '--host', '127.0.0.1', '--port', str(porta),
+         '--workers', str(workers), '--log-level', 'warning'],
+        cwd=RAIZ_PROJETO, env=env)
+    url = f'http://127.0.0.1:{porta}'
+    try:
+        limite = time.time() + 60
+        while True:
+            if processo.poll() is not None:
+                raise RuntimeError('O uvicorn terminou antes de ficar pronto.')
+            try:
+                conexao = http.client.HTTPConnection('127.0.0.1', porta, timeout=2)
+                conexao.request('GET', '/api/v1/status')
+                if conexao.getresponse().status == 200:
+                    break
+            except OSError:
+                if time.time() > limite:
+                    raise RuntimeError('O uvicorn não respondeu em 60s.')
+                time.sleep(0.2)
+        yield url
+    finally:
+        processo.terminate()
+        try:
+            processo.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            processo.kill()
+
+
+def prepara_banco(trabalho, n_empresas, seed):
+    """Gera o dump sintético e o carrega com o cnpj.py (com índices)."""
+    entrada = os.path.join(trabalho, 'zips')
+    saida = os.path.join(trabalho, 'db')
+    os.makedirs(saida, exist_ok=True)
+    print(f'Gerando banco sintético com {n_empresas:,} empresas em {trabalho}...')
+    gera_dados_rfb.gera_dump(entrada, n_empresas, seed=seed)
+    bench_carga.em_processo_novo(bench_carga.etapa_carga, entrada, saida)
+    bench_carga.em_processo_novo(bench_carga.etapa_indices, saida)
+    return os.path.join(saida, 'CNPJ_full.db')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de carga dos endpoints /network e /query da API.')
+    parser.add_argument('--base', help='Banco SQLite usado pela API e para amostrar os valores. (Padrão: banco sintético)')
+    parser.add_argument('--empresas', type=int, default=20000, help='Empresas do banco sintético. (Padrão: 20000)')
+    parser.add_argument('--url', help='URL de uma API já em execução. (Padrão: sobe um uvicorn local)')
+    parser.add_argument('--token', default=TOKEN_PADRAO, help='Token Bearer da API.')
+    parser.add_argument('--workers', type=int, default=1, help='Workers do uvicorn local. (Padrão: 1)')
+    parser.add_argument('--mix', default=MIX_PADRAO, help=f'Pesos dos tipos de requisição. (Padrão: {MIX_PADRAO})')
+    parser.add_argument('--niveis', type=int, nargs='+', default=[0, 1, 2], help='Valores de nivel_max sorteados. (Padrão: 0 1 2)')
+    parser.add_argument('--concorrencia', type=int, default=8, help='Clientes simultâneos. (Padrão: 8)')
+    parser.add_argument('--duracao', type=float, default=30, help='Duração do teste em segundos. (Padrão: 30)')
+    parser.add_argument('--taxa', type=float, help='Requisições por segundo (carga aberta). (Padrão: carga fechada)')
+    parser.add_argument('--aquecimento', type=float, default=3, help='Segundos de aquecimento, descartados. (Padrão: 3)')
+    parser.add_argument('--timeout', type=float, default=120, help='Timeout de cada requisição em segundos. (Padrão: 120)')
+    parser.add_argument('--seed', type=int, default=0, help='Semente do banco sintético e do sorteio. (Padrão: 0)')
+    parser.add_argument('--json', help='Arquivo onde gravar os resultados em JSON.')
+    args = parser.parse_args()
+
+    db_path = args.base or prepara_banco(tempfile.mkdtemp(prefix='bench_api_'), args.empresas, args.seed)
+    valores = amostra_valores(db_path, seed=args.seed)
+    gerador = GeradorRequisicoes(parse_mix(args.mix), args.niveis, valores, seed=args.seed)
+
+    with contextlib.ExitStack() as stack:
+        url = args.url or stack.enter_context(servidor_local(db_path, args.token, args.workers))
+        print(f'API: {url} | mix {args.mix} | níveis {args.niveis} | {args.concorrencia} clientes'
+              + (f' | {args.taxa:g} req/s' if args.taxa else ''))
+
+        if args.aquecimento:
+            executa_carga(url, args.token, gerador, args.concorrencia, args.aquecimento, args.taxa, args.timeout)
+        amostras, segundos = executa_carga(url, args.token, gerador, args.concorrencia, args.duracao,
+                                           args.taxa, args.timeout)
+
+    if not amostras:
+        print('Nenhuma requisição concluída.')
+        sys.exit(1)
+
+    resumo = resume(amostras, segundos)
+    print(f'{len(amostras):,} requisições em {segundos:,.1f}s:')
+    imprime_resumo(resumo)
+
+    if args.json:
+        resultados = {'data': datetime.datetime.now().isoformat(timespec='seconds'), 'url': url,
+                      'base': db_path, 'mix': parse_mix(args.mix), 'niveis': args.niveis,
+                      'concorrencia': args.concorrencia, 'taxa': args.taxa, 'segundos': round(segundos, 3),
+                      'resultados': resumo}
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        print(f'Resultados gravados em {args.json}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+"""
+Benchmark ponta a ponta: carga do cnpj.py, criação de índices (cnpj_index) e
+consultas da RedeCNPJ nos níveis 1 a 3, sobre o dump sintético do
+gera_dados_rfb.py (ou sobre uma pasta com os ZIPs reais, via --entrada).
+
+Cada etapa roda em um processo novo, para que o pico de memória (RSS) medido
+seja só o dela. O resultado é gravado em JSON, para comparar execuções:
+
+    carga      : segundos, registros por tabela, registros/s
+    indices    : segundos
+    consultas  : por nível, latência p50/p90/p99/máx, consultas/s e tamanho
+                 médio das redes (nós e arestas)
+
+e, em todas as etapas, o pico de RSS em MB.
+
+Uso:
+    python benchmarks/bench_carga.py --empresas 50000 --json resultados.json
+    python benchmarks/bench_carga.py --entrada tools/downloads_cnpj --consultas 20
+"""
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import platform
+import tempfile
+import datetime
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# O módulo resource só existe em sistemas Unix.
+try:
+    import resource
+except ImportError:
+    resource = None
+
+DIR_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(DIR_BENCHMARKS), 'src'))
+
+import gera_dados_rfb
+
+NIVEIS = (1, 2, 3)
+
+
+def pico_rss_mb():
+    """Pico de memória residente do processo atual, em MB."""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é em KB no Linux e em bytes no macOS.
+    return round(pico / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def percentis(latencias):
+    if not latencias:
+        return {}
+    valores = np.array(latencias) * 1000
+    return {'p50_ms': round(float(np.percentile(valores, 50)), 2),
+            'p90_ms': round(float(np.percentile(valores, 90)), 2),
+            'p99_ms': round(float(np.percentile(valores, 99)), 2),
+            'max_ms': round(float(valores.max()), 2),
+            'media_ms': round(float(valores.mean()), 2)}
+
+
+def etapa_carga(entrada, saida):
+    """Carrega os ZIPs de `entrada` com o cnpj.py (sem índices)."""
+    import glob
+    import cnpj
+
+    db_path = os.path.join(saida, cnpj.NOME_ARQUIVO_SQLITE)
+    if os.path.exists(db_path):
+        os.remove(db_path)
+
+    arquivos = glob.glob(os.path.join(entrada, '*.zip'))
+    inicio = time.perf_counter()
+    conBD = sqlite3.connect(db_path)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for file_prefix, config in cnpj.FILE_CONFIG.items():
+            files_to_process = sorted(f for f in arquivos if os.path.basename(f).startswith(file_prefix))
+            if files_to_process:
+                cnpj.process_zip_files(files_to_process, config, conBD, 'sqlite')
+    conBD.close()
+    segundos = time.perf_counter() - inicio
+
+    registros = {}
+    with contextlib.closing(sqlite3.connect(db_path)) as conBD:
+        tabelas = [t for (t,) in conBD.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+        for tabela in tabelas:
+            registros[tabela] = conBD.execute(f'SELECT COUNT(*) FROM {tabela}').fetchone()[0]
+
+    # cnaes_secundarios é derivada de estabelecimentos: não conta como linha lida.
+    lidos = sum(n for t, n in registros.items() if t != cnpj.CNAES_SECUNDARIOS)
+    return {'segundos': round(segundos, 3), 'registros': registros,
+            'registros_por_s': round(lidos / segundos, 1) if segundos else None,
+            'mb_entrada': round(sum(os.path.getsize(f) for f in arquivos) / 1e6, 1),
+            'pico_rss_mb': pico_rss_mb()}
+
+
+def etapa_indices(saida):
+    import cnpj
+
+    inicio = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        cnpj.cnpj_index(saida)
+    return {'segundos': round(time.perf_counter() - inicio, 3), 'pico_rss_mb': pico_rss_mb()}
+
+
+def sementes(db_path, n_consultas, seed=0):
+    """
+    Pontos de partida das consultas: CNPJs de matrizes e sócios pessoa física,
+    sorteados entre as linhas de socios. O sorteio por linha favorece empresas
+    e pessoas com muitos vínculos, como nas consultas reais a hubs.
+    """
+    rng = random.Random(seed)
+    with contextlib.closing(sqlite3.connect(db_path)) as conBD:
+        n_socios = conBD.execute('SELECT MAX(rowid) FROM socios').fetchone()[0] or 0
+        pjs, pfs = [], []
+        for rowid in rng.sample(range(1, n_socios + 1), min(n_socios, 4 * n_consultas)):
+            linha = conBD.execute(
+                'SELECT s.identificador_socio, s.cnpj_cpf_socio, s.nome_socio_razao_social, '
+                "e.cnpj_basico || e.cnpj_ordem || e.cnpj_dv FROM socios s JOIN estabelecimentos e "
+                "ON e.cnpj_basico = s.cnpj_basico AND e.identificador_matriz_filial = '1' WHERE s.rowid = ?",
+                (rowid,)).fetchone()
+            if linha is None:
+                continue
+            if len(pjs) < n_consultas:
+                pjs.append(('cnpj', linha[3]))
+            if linha[0] == '2' and len(pfs) < n_consultas:
+                pfs.append(('cpf_nome', (linha[1], linha[2])))
+    return pjs + pfs
+
+
+def etapa_consultas(db_path, nivel, itens):
+    """Monta uma RedeCNPJ por item e mede a latência de cada montagem."""
+    from rede_cnpj import RedeCNPJ
+
+    latencias, nos, arestas = [], [], []
+    erros = 0
+    conBD = sqlite3.connect(db_path)
+    inicio = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for tipo, item in itens:
+            inicio_consulta = time.perf_counter()
+            rede = RedeCNPJ(conBD, nivel_max=nivel)
+            try:
+                rede.insere_pessoa(1 if tipo == 'cnpj' else 2, item)
+            except Exception:
+                erros += 1
+                continue
+            latencias.append(time.perf_counter() - inicio_consulta)
+            nos.append(rede.G.number_of_nodes())
+            arestas.append(rede.G.number_of_edges())
+    segundos = time.perf_counter() - inicio
+    conBD.close()
+
+    resultado = {'nivel': nivel, 'consultas': len(itens), 'erros': erros, 'segundos': round(segundos, 3),
+                 'consultas_por_s': round(len(itens) / segundos, 2) if segundos else None,
+                 'media_nos': round(float(np.mean(nos)), 1) if nos else 0,
+                 'max_nos': int(max(nos, default=0)),
+                 'media_arestas': round(float(np.mean(arestas)), 1) if arestas else 0}
+    resultado.update(percentis(latencias))
+    resultado['pico_rss_mb'] = pico_rss_mb()
+    return resultado
+
+
+def em_processo_novo(funcao, *args):
+    """Executa a etapa em um processo novo (spawn), para isolar o pico de RSS."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(funcao, *args).result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de carga, índices e consultas da RedeCNPJ.')
+    parser.add_argument('--entrada', help='Pasta com os ZIPs da RFB. (Padrão: gera um dump sintético)')
+    parser.add_argument('--empresas', type=int, default=20000, help='Empresas do dump sintético. (Padrão: 20000)')
+    parser.add_argument('--seed', type=int, default=0, help='Semente do dump sintético e das consultas. (Padrão: 0)')
+    parser.add_argument('--consultas', type=int, default=10, help='Consultas de cada tipo (CNPJ e PF) por nível. (Padrão: 10)')
+    parser.add_argument('--niveis', type=int, nargs='+', default=list(NIVEIS), help='Níveis consultados. (Padrão: 1 2 3)')
+    parser.add_argument('--trabalho', help='Pasta de trabalho para o dump e o banco. (Padrão: temporária)')
+    parser.add_argument('--json', help='Arquivo onde gravar os resultados em JSON.')
+    args = parser.parse_args()
+
+    trabalho = args.trabalho or tempfile.mkdtemp(prefix='bench_cnpj_')
+    resultados = {'data': datetime.datetime.now().isoformat(timespec='seconds'),
+                  'python': platform.python_version(), 'plataforma': platform.platform()}
+
+    entrada = args.entrada
+    if not entrada:
+        entrada = os.path.join(trabalho, 'zips')
+        print(f'Gerando dump sintético com {args.empresas:,} empresas em {entrada}...')
+        resultados['dump_sintetico'] = gera_dados_rfb.gera_dump(entrada, args.empresas, seed=args.seed)
+    resultados['entrada'] = entrada
+
+    saida = os.path.join(trabalho, 'db')
+    os.makedirs(saida, exist_ok=True)
+
+    print('Carga (cnpj.py)...')
+    carga = resultados['carga'] = em_processo_novo(etapa_carga, entrada, saida)
+    print(f'  {carga["segundos"]:,.1f}s, {carga["registros_por_s"]:,.0f} registros/s, pico RSS {carga["pico_rss_mb"]} MB')
+
+    print('Índices (cnpj_index)...')
+    indices = resultados['indices'] = em_processo_novo(etapa_indices, saida)
+    print(f'  {indices["segundos"]:,.1f}s, pico RSS {indices["pico_rss_mb"]} MB')
+
+    db_path = os.path.join(saida, 'CNPJ_full.db')
+    itens = sementes(db_path, args.consultas, args.seed)
+    resultados['consultas'] = []
+    for nivel in args.niveis:
+        print(f'Consultas RedeCNPJ nível {nivel} ({len(itens)} consultas)...')
+        consulta = em_processo_novo(etapa_consultas, db_path, nivel, itens)
+        resultados['consultas'].append(consulta)
+        print(f'  p50 {consulta.get("p50_ms")} ms | p99 {consulta.get("p99_ms")} ms | '
+              f'{consulta["consultas_por_s"]} consultas/s | {consulta["media_nos"]} nós em média | '
+              f'pico RSS {consulta["pico_rss_mb"]} MB')
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        print(f'Resultados gravados em {args.json}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+"""
+Benchmark da estrutura de grafo da RedeCNPJ: Grafo (src/grafo.py) x nx.DiGraph.
+
+1. Memória e tempo de montagem: uma rede é montada a partir do banco e seus nós
+   e arestas (com os atributos) são reinseridos, em um processo novo, em cada
+   estrutura vazia. O tracemalloc mede a memória ocupada pela estrutura (os
+   valores dos atributos são os mesmos objetos nas duas); o tempo de inserção
+   dos nós e das arestas é medido em uma passada separada, sem o tracemalloc.
+2. Montagem completa: RedeCNPJ.insere_pessoa com cada estrutura, a partir das
+   mesmas sementes (o tempo inclui as consultas SQL).
+3. Exportação (--exporta N): um Grafo sintético com N elementos (nós + arestas)
+   é gravado em GraphML, GEXF e JSON pelos escritores do exporta.py e pelo
+   caminho anterior (cópia para o nx.DiGraph + nx.write_*, json.dumps do
+   node-link). Compara o pico de memória da exportação com a memória do grafo
+   (o tempo é medido com o tracemalloc ativo: serve só para comparar os métodos).
+
+Uso:
+    python benchmarks/bench_grafo.py --base /tmp/bench_cnpj_xxx/db/CNPJ_full.db --nivel 2
+    python benchmarks/bench_grafo.py --exporta 500000
+"""
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import tracemalloc
+import contextlib
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+DIR_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(DIR_BENCHMARKS), 'src'))
+
+import networkx as nx
+
+import exporta
+from grafo import Grafo
+from rede_cnpj import RedeCNPJ
+from bench_carga import sementes, percentis
+
+ESTRUTURAS = {'grafo': Grafo, 'networkx': nx.DiGraph}
+
+
+def monta_rede(db_path, nivel, itens, estrutura='grafo'):
+    """Monta uma única rede com todos os itens (como o consulta.py com um arquivo de entrada)."""
+    conBD = sqlite3.connect(db_path)
+    rede = RedeCNPJ(conBD, nivel_max=nivel)
+    rede.G = ESTRUTURAS[estrutura]()
+    latencias = []
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for tipo, item in itens:
+            inicio = time.perf_counter()
+            rede.insere_pessoa(1 if tipo == 'cnpj' else 2, item)
+            latencias.append(time.perf_counter() - inicio)
+    conBD.close()
+    return rede, latencias
+
+
+def etapa_memoria(db_path, nivel, itens, estrutura):
+    """Reinsere os elementos de uma rede em uma estrutura vazia, medindo memória e tempo."""
+    rede, _ = monta_rede(db_path, nivel, itens)
+    nos = list(rede.G.nodes(data=True))
+    arestas = list(rede.G.edges(data=True))
+    del rede
+
+    # Tempo medido sem o tracemalloc, que encarece cada alocação
+    G = ESTRUTURAS[estrutura]()
+    inicio = time.perf_counter()
+    for id_no, dados in nos:
+        G.add_node(id_no, **dados)
+    segundos_nos = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    for origem, destino, dados in arestas:
+        G.add_edge(origem, destino, **dados)
+    segundos_arestas = time.perf_counter() - inicio
+    del G
+
+    tracemalloc.start()
+    inicial = tracemalloc.get_traced_memory()[0]
+    G = ESTRUTURAS[estrutura]()
+    for id_no, dados in nos:
+        G.add_node(id_no, **dados)
+    memoria_nos = tracemalloc.get_traced_memory()[0] - inicial
+    for origem, destino, dados in arestas:
+        G.add_edge(origem, destino, **dados)
+    memoria_total = tracemalloc.get_traced_memory()[0] - inicial
+    tracemalloc.stop()
+
+    return {'estrutura': estrutura, 'nos': len(nos), 'arestas': len(arestas),
+            'mb': round(memoria_total / 1e6, 2),
+            'bytes_por_no': round(memoria_nos / len(nos)) if nos else None,
+            'bytes_por_aresta': round((memoria_total - memoria_nos) / len(arestas)) if arestas else None,
+            'segundos_nos': round(segundos_nos, 4), 'segundos_arestas': round(segundos_arestas, 4)}
+
+
+def etapa_montagem(db_path, nivel, itens, estrutura):
+    inicio = time.perf_counter()
+    rede, latencias = monta_rede(db_path, nivel, itens, estrutura)
+    resultado = {'estrutura': estrutura, 'segundos': round(time.perf_counter() - inicio, 3),
+                 'nos': rede.G.number_of_nodes(), 'arestas': rede.G.number_of_edges()}
+    resultado.update(percentis(latencias))
+    return resultado
+
+
+def grafo_sintetico(elementos, seed=0):
+    """Grafo com ~1/3 de nós e ~2/3 de arestas, com atributos parecidos com os da RedeCNPJ."""
+    rnd = random.Random(seed)
+    n_nos = max(elementos // 3, 2)
+    G = Grafo()
+    for i in range(n_nos):
+        if i % 4:
+            G.add_node(f'PF_***{i:06d}**-NOME {i}', tipo_pessoa=2, nivel=rnd.randint(0, 3), nome=f'NOME {i}',
+                       cpf=f'***{i:06d}**', hub=None)
+        else:
+            G.add_node(f'{i:014d}', tipo_pessoa=1, nivel=rnd.randint(0, 3), nome=f'EMPRESA {i} & CIA <LTDA>',
+                       uf=rnd.choice(('SP', 'RJ', 'MG')), capital_social=rnd.random() * 1e6, hub=rnd.random() < 0.01)
+    ids = list(G)
+    while G.number_of_edges() < elementos - n_nos:
+        G.add_edge(rnd.choice(ids), rnd.choice(ids[::4]), tipo='socio', qualificacao_socio=rnd.randint(1, 80),
+                   data_entrada_sociedade=f'20{rnd.randint(10, 23)}0101', nivel=rnd.randint(1, 3))
+    return G
+
+
+def _exporta_networkx(G, formato, caminho):
+    if formato == 'json':
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(json.dumps(G.node_link(), default=str))
+        return
+    H = G.para_networkx()
+    for _, dados in H.nodes(data=True):
+        for chave in [chave for chave, valor in dados.items() if valor is None]:
+            del dados[chave]
+    (nx.write_graphml if formato == 'graphml' else nx.write_gexf)(H, caminho)
+
+
+def _exporta_streaming(G, formato, caminho):
+    if formato == 'json':
+        with open(caminho, 'wb') as arquivo:
+            exporta.escreve_json(G, arquivo)
+    else:
+        (exporta.escreve_graphml if formato == 'graphml' else exporta.escreve_gexf)(G, caminho)
+
+
+def etapa_exportacao(elementos, formato, metodo):
+    """Memória do grafo sintético e pico de memória (acima dele) e tempo ao exportá-lo."""
+    tracemalloc.start()
+    G = grafo_sintetico(elementos)
+    G.grau(next(iter(G)))  # monta a adjacência antes da medição
+    memoria_grafo = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    escreve = _exporta_streaming if metodo == 'streaming' else _exporta_networkx
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, f'rede.{formato}')
+        inicio = time.perf_counter()
+        escreve(G, formato, caminho)
+        segundos = time.perf_counter() - inicio
+        tamanho = os.path.getsize(caminho)
+    pico = tracemalloc.get_traced_memory()[1] - memoria_grafo
+    tracemalloc.stop()
+    return {'formato': formato, 'metodo': metodo, 'elementos': G.number_of_nodes() + G.number_of_edges(),
+            'mb_grafo': round(memoria_grafo / 1e6, 2), 'mb_pico_exportacao': round(pico / 1e6, 2),
+            'mb_arquivo': round(tamanho / 1e6, 2), 'segundos': round(segundos, 3)}
+
+
+def em_processo_novo(funcao, *args):
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(funcao, *args).result()
+
+
+def compara_estruturas(args):
+    itens = sementes(args.base, args.consultas, args.seed)
+    resultados = {'nivel': args.nivel, 'sementes': len(itens), 'memoria': [], 'montagem': []}
+
+    print(f'Memória da estrutura ({len(itens)} sementes, nível {args.nivel}):')
+    for estrutura in ESTRUTURAS:
+        r = em_processo_novo(etapa_memoria, args.base, args.nivel, itens, estrutura)
+        resultados['memoria'].append(r)
+        print(f'  {estrutura:<9} {r["nos"]:>8,} nós {r["arestas"]:>8,} arestas {r["mb"]:>9,.2f} MB | '
+              f'{r["bytes_por_no"]:>6,} B/nó {r["bytes_por_aresta"]:>6,} B/aresta | '
+              f'inserção {r["segundos_nos"] + r["segundos_arestas"]:.3f}s')
+
+    print('Montagem completa (RedeCNPJ, inclui SQL):')
+    for estrutura in ESTRUTURAS:
+        r = em_processo_novo(etapa_montagem, args.base, args.nivel, itens, estrutura)
+        resultados['montagem'].append(r)
+        print(f'  {estrutura:<9} {r["segundos"]:>8,.2f}s | p50 {r.get("p50_ms")} ms | p99 {r.get("p99_ms")} ms')
+
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compara a memória e o tempo de montagem e de exportação do Grafo e do nx.DiGraph.')
+    parser.add_argument('--base', help='Banco SQLite gerado pelo cnpj.py (ex: o do bench_carga.py).')
+    parser.add_argument('--nivel', type=int, default=2, help='Nível das redes montadas. (Padrão: 2)')
+    parser.add_argument('--consultas', type=int, default=10, help='Sementes de cada tipo (CNPJ e PF). (Padrão: 10)')
+    parser.add_argument('--seed', type=int, default=0, help='Semente do sorteio dos pontos de partida. (Padrão: 0)')
+    parser.add_argument('--exporta', type=int, metavar='N',
+                        help='Mede a exportação de um grafo sintético com N elementos (nós + arestas).')
+    parser.add_argument('--json', help='Arquivo onde gravar os resultados em JSON.')
+    args = parser.parse_args()
+    if not args.base and not args.exporta:
+        parser.error('informe --base e/ou --exporta')
+
+    resultados = {}
+    if args.base:
+        resultados.update(compara_estruturas(args))
+
+    if args.exporta:
+        resultados['exportacao'] = []
+        print(f'Exportação ({args.exporta:,} elementos; pico de memória acima do grafo):')
+        for formato in ('graphml', 'gexf', 'json'):
+            for metodo in ('streaming', 'networkx'):
+                r = em_processo_novo(etapa_exportacao, args.exporta, formato, metodo)
+                resultados['exportacao'].append(r)
+                print(f'  {formato:<8} {metodo:<9} grafo {r["mb_grafo"]:>8,.2f} MB | pico {r["mb_pico_exportacao"]:>8,.2f} MB | '
+                      f'arquivo {r["mb_arquivo"]:>8,.2f} MB | {r["segundos"]:>7,.2f}s')
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        print(f'Resultados gravados em {args.json}')
+
+
+if __name__ == '__main__':
+    main()
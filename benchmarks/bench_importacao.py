@@ -0,0 +1,112 @@
+"""
+Tempo de inicialização das ferramentas de linha de comando e da API.
+
+Cada cenário roda em um processo novo várias vezes (a primeira, que compila os
+.pyc, é descartada), e o relatório traz a mediana do tempo total do processo.
+Uma execução a mais com `python -X importtime` (que deixa o processo mais
+lento, por isso fica fora da mediana) mostra os pacotes que mais pesaram: o
+tempo próprio de todos os módulos de cada pacote, em qualquer profundidade. Os
+módulos pesados (pandas, numpy, networkx, scipy) importados são marcados.
+
+    python            : interpretador sem importar nada (referência)
+    consulta_help     : src/consulta.py --help
+    api_help          : api/main.py --help (CLI do servidor)
+    api_app           : importa main.app como o uvicorn, até a API poder responder
+
+Uso:
+    python benchmarks/bench_importacao.py
+    python benchmarks/bench_importacao.py --repeticoes 10 --alvo-ms 300 --json importacao.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import statistics
+
+DIR_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+RAIZ_PROJETO = os.path.dirname(DIR_BENCHMARKS)
+DIR_API = os.path.join(RAIZ_PROJETO, 'api')
+
+# nome: (argumentos do python, pasta de trabalho)
+CENARIOS = {
+    'python': (['-c', 'pass'], RAIZ_PROJETO),
+    'consulta_help': ([os.path.join('src', 'consulta.py'), '--help'], RAIZ_PROJETO),
+    'api_help': (['main.py', '--help'], DIR_API),
+    'api_app': (['-c', 'import main; main.app'], DIR_API),
+}
+
+PESADOS = ('pandas', 'numpy', 'networkx', 'scipy')
+
+
+def le_importtime(stderr):
+    """Tempo próprio (µs) somado por pacote (primeiro componente do nome do módulo)."""
+    pacotes = {}
+    for linha in stderr.splitlines():
+        if not linha.startswith('import time:') or '|' not in linha:
+            continue
+        proprio, _, nome = linha[len('import time:'):].split('|', 2)
+        if not proprio.strip().isdigit():
+            continue  # cabeçalho
+        raiz = nome.strip().split('.')[0]
+        pacotes[raiz] = pacotes.get(raiz, 0) + int(proprio)
+    return pacotes
+
+
+def executa(argumentos, pasta, importtime=False):
+    """(segundos do processo, stderr) de uma execução do cenário."""
+    opcoes = ['-X', 'importtime'] if importtime else []
+    inicio = time.perf_counter()
+    processo = subprocess.run([sys.executable, *opcoes, *argumentos], cwd=pasta,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    segundos = time.perf_counter() - inicio
+    if processo.returncode != 0:
+        raise RuntimeError(f'{" ".join(argumentos)} terminou com código {processo.returncode}:\n{processo.stderr[-2000:]}')
+    return segundos, processo.stderr
+
+
+def mede(nome, repeticoes, mais_pesados):
+    argumentos, pasta = CENARIOS[nome]
+    executa(argumentos, pasta)
+    tempos = [executa(argumentos, pasta)[0] for _ in range(repeticoes)]
+    pacotes = le_importtime(executa(argumentos, pasta, importtime=True)[1])
+    ranking = sorted(pacotes.items(), key=lambda p: -p[1])[:mais_pesados]
+    return {'cenario': nome, 'mediana_ms': round(statistics.median(tempos) * 1000, 1),
+            'min_ms': round(min(tempos) * 1000, 1), 'max_ms': round(max(tempos) * 1000, 1),
+            'importacao_ms': round(sum(pacotes.values()) / 1000, 1),
+            'mais_pesados': [{'pacote': p, 'ms': round(us / 1000, 1)} for p, us in ranking],
+            'pesados_importados': [p for p in PESADOS if p in pacotes]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mede o tempo de inicialização do consulta.py e da API com -X importtime.')
+    parser.add_argument('--cenarios', nargs='+', choices=list(CENARIOS), default=list(CENARIOS),
+                        help='Cenários a medir. (Padrão: todos)')
+    parser.add_argument('--repeticoes', type=int, default=5, help='Execuções de cada cenário. (Padrão: 5)')
+    parser.add_argument('--mais-pesados', dest='mais_pesados', type=int, default=5,
+                        help='Pacotes mais pesados listados por cenário. (Padrão: 5)')
+    parser.add_argument('--alvo-ms', dest='alvo_ms', type=float, default=300,
+                        help='Tempo máximo esperado (mediana) de cada cenário. (Padrão: 300)')
+    parser.add_argument('--json', help='Arquivo onde gravar os resultados em JSON.')
+    args = parser.parse_args()
+
+    resultados = []
+    for nome in args.cenarios:
+        r = mede(nome, args.repeticoes, args.mais_pesados)
+        r['dentro_do_alvo'] = r['mediana_ms'] <= args.alvo_ms
+        resultados.append(r)
+        pesados = f' | importa {", ".join(r["pesados_importados"])}' if r['pesados_importados'] else ''
+        print(f'{nome:<14} mediana {r["mediana_ms"]:>7,.1f} ms (min {r["min_ms"]:,.1f}, max {r["max_ms"]:,.1f}) | '
+              f'importações {r["importacao_ms"]:>7,.1f} ms | {"ok" if r["dentro_do_alvo"] else "ACIMA DO ALVO"}{pesados}')
+        for p in r['mais_pesados']:
+            print(f'    {p["pacote"]:<28} {p["ms"]:>7,.1f} ms')
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'alvo_ms': args.alvo_ms, 'cenarios': resultados}, f, indent=2, ensure_ascii=False)
+        print(f'Resultados gravados em {args.json}')
+
+
+if __name__ == '__main__':
+    main()
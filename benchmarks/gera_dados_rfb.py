@@ -0,0 +1,307 @@
+"""
+Gerador de um dump sintético da base de CNPJ no layout da Receita Federal.
+
+Grava Empresas*.zip, Estabelecimentos*.zip, Socios*.zip e Simples.zip com
+um CSV por arquivo, como no dump oficial: latin1, separado por ';', todos os
+campos entre aspas e sem cabeçalho. Serve de entrada para o cnpj.py, o
+cnpj_sql.py e o bench_carga.py sem depender dos ~5 GB da RFB.
+
+A rede societária tem distribuição de grau de cauda longa: o número de sócios
+por empresa segue uma Zipf e a escolha dos sócios (pessoas físicas e
+empresas) é proporcional a 1/rank^alpha, de modo que alguns poucos sócios
+(holdings, administradores profissionais) participam de muitas empresas.
+
+Uso:
+    python benchmarks/gera_dados_rfb.py --empresas 100000 --saida /tmp/rfb_sintetico
+"""
+import io
+import os
+import csv
+import time
+import argparse
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+# Layout das tabelas (ver src/cnpj.py).
+EMPRESAS_COLS = ['cnpj_basico', 'razao_social', 'natureza_juridica', 'qualificacao_responsavel', 'capital_social', 'porte_empresa', 'ente_federativo_responsavel']
+ESTABELECIMENTOS_COLS = ['cnpj_basico', 'cnpj_ordem', 'cnpj_dv', 'identificador_matriz_filial', 'nome_fantasia', 'situacao_cadastral', 'data_situacao_cadastral', 'motivo_situacao_cadastral', 'nome_cidade_exterior', 'pais', 'data_inicio_atividade', 'cnae_fiscal_principal', 'cnae_fiscal_secundaria', 'tipo_logradouro', 'logradouro', 'numero', 'complemento', 'bairro', 'cep', 'uf', 'municipio', 'ddd_1', 'telefone_1', 'ddd_2', 'telefone_2', 'ddd_fax', 'fax', 'email', 'situacao_especial', 'data_situacao_especial']
+SOCIOS_COLS = ['cnpj_basico', 'identificador_socio', 'nome_socio_razao_social', 'cnpj_cpf_socio', 'qualificacao_socio', 'data_entrada_sociedade', 'pais', 'representante_legal', 'nome_representante', 'qualificacao_representante_legal', 'faixa_etaria']
+SIMPLES_COLS = ['cnpj_basico', 'opcao_pelo_simples', 'data_opcao_simples', 'data_exclusao_simples', 'opcao_pelo_mei', 'data_opcao_mei', 'data_exclusao_mei']
+
+ENCODING = 'latin1'
+DATA_REFERENCIA = 'D40113'
+
+# Nomes dos membros dentro de cada ZIP, como no dump oficial.
+SUFIXOS_MEMBRO = {'Empresas': 'EMPRECSV', 'Estabelecimentos': 'ESTABELE', 'Socios': 'SOCIOCSV'}
+
+PRENOMES = ['JOSÉ', 'MARIA', 'JOÃO', 'ANA', 'ANTÔNIO', 'FRANCISCO', 'LUÍS', 'PAULO', 'CARLOS', 'MÁRCIA',
+            'SEBASTIÃO', 'CONCEIÇÃO', 'FÁBIO', 'PATRÍCIA', 'JÚLIA', 'ANDRÉ', 'CLÁUDIA', 'RAIMUNDO', 'LÚCIA', 'VITÓRIA']
+SOBRENOMES = ['SILVA', 'SANTOS', 'OLIVEIRA', 'SOUZA', 'RODRIGUES', 'FERREIRA', 'ALVES', 'PEREIRA', 'LIMA', 'GOMES',
+              'CONCEIÇÃO', 'ARAÚJO', 'GONÇALVES', 'MAGALHÃES', 'BRAGANÇA', 'ASSUNÇÃO', 'GUIMARÃES', 'FALCÃO', 'ROCHA', 'DIAS']
+ATIVIDADES = ['COMÉRCIO', 'SERVIÇOS', 'CONSTRUÇÃO', 'TRANSPORTES', 'INDÚSTRIA', 'PARTICIPAÇÕES', 'ALIMENTAÇÃO',
+              'TECNOLOGIA', 'CONFECÇÕES', 'LOGÍSTICA', 'ENGENHARIA', 'AGROPECUÁRIA']
+SUFIXOS_EMPRESA = ['LTDA', 'S.A.', 'EIRELI', 'ME', 'LTDA - EPP']
+LOGRADOUROS = ['BRASIL', 'SÃO JOÃO', 'GETÚLIO VARGAS', 'TIRADENTES', 'DA CONCEIÇÃO', 'DOM PEDRO II', 'XV DE NOVEMBRO', 'SANTOS DUMONT']
+BAIRROS = ['CENTRO', 'JARDIM AMÉRICA', 'VILA NOVA', 'BOA VISTA', 'SÃO CRISTÓVÃO', 'PARQUE INDUSTRIAL']
+UFS_MUNICIPIOS = [('SP', '7107'), ('RJ', '6001'), ('MG', '4123'), ('RS', '8801'), ('PR', '7535'),
+                  ('BA', '3849'), ('PE', '2531'), ('CE', '1389'), ('GO', '9373'), ('DF', '9701')]
+CNAES = ['4781400', '5611201', '4711302', '8211300', '4120400', '4930202', '6201501', '7020400',
+         '4744099', '9602501', '4399103', '6462000', '8599604', '4530703', '1091102', '0111301']
+
+NATUREZAS = ['2062', '2135', '2054', '2305', '2240', '3999']
+QUALIFICACOES_SOCIO = ['49', '22', '05', '10', '16', '28', '54']
+
+
+def _pesos_zipf(n, alpha):
+    """Probabilidades proporcionais a 1/rank^alpha para n itens."""
+    pesos = 1.0 / np.arange(1, n + 1) ** alpha
+    return pesos / pesos.sum()
+
+
+def _escolhe(rng, opcoes, n, p=None):
+    return rng.choice(np.array(opcoes, dtype=object), n, p=p)
+
+
+def _datas(rng, n, inicio='19700101', fim='20231231'):
+    """Datas AAAAMMDD aleatórias entre inicio e fim."""
+    dias = rng.integers(0, (pd.Timestamp(fim) - pd.Timestamp(inicio)).days, n)
+    return (pd.Timestamp(inicio) + pd.to_timedelta(dias, unit='D')).strftime('%Y%m%d').to_numpy(dtype=object)
+
+
+def _digitos(largura, valores):
+    return np.char.zfill(valores.astype(str), largura).astype(object)
+
+
+def _nomes_pessoas(rng, n):
+    nomes = (_escolhe(rng, PRENOMES, n) + ' ' + _escolhe(rng, SOBRENOMES, n) + ' '
+             + _escolhe(rng, SOBRENOMES, n))
+    return nomes
+
+
+def digitos_verificadores(cnpj_basico, cnpj_ordem):
+    """Calcula (vetorizado) os dois dígitos verificadores dos CNPJs."""
+    texto = ''.join(b + o for b, o in zip(cnpj_basico, cnpj_ordem)).encode('ascii')
+    base = (np.frombuffer(texto, dtype=np.uint8).reshape(-1, 12) - ord('0')).astype(np.int64)
+    pesos_1 = np.array([5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+    pesos_2 = np.array([6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+
+    resto = (base @ pesos_1) % 11
+    dv1 = np.where(resto < 2, 0, 11 - resto)
+    resto = (np.column_stack([base, dv1]) @ pesos_2) % 11
+    dv2 = np.where(resto < 2, 0, 11 - resto)
+    return np.char.zfill((dv1 * 10 + dv2).astype(str), 2).astype(object)
+
+
+def gera_empresas(rng, n_empresas):
+    """Empresas com cnpj_basico únicos; cerca de 30% são MEI/empresários individuais."""
+    cnpj_basico = _digitos(8, rng.choice(10**8, n_empresas, replace=False))
+    individual = rng.random(n_empresas) < 0.3
+
+    razao_social = np.where(
+        individual,
+        _nomes_pessoas(rng, n_empresas) + ' ' + _digitos(11, rng.integers(0, 10**11, n_empresas)),
+        _escolhe(rng, SOBRENOMES, n_empresas) + ' ' + _escolhe(rng, ATIVIDADES, n_empresas) + ' '
+        + _escolhe(rng, SUFIXOS_EMPRESA, n_empresas))
+
+    capital = np.round(rng.lognormal(10, 2, n_empresas), 2)
+    return pd.DataFrame({
+        'cnpj_basico': cnpj_basico,
+        'razao_social': razao_social,
+        'natureza_juridica': np.where(individual, '2135', _escolhe(rng, NATUREZAS, n_empresas)),
+        'qualificacao_responsavel': np.where(individual, '50', '49'),
+        'capital_social': np.char.replace(np.char.mod('%.2f', capital), '.', ','),
+        'porte_empresa': _escolhe(rng, ['01', '03', '05'], n_empresas, p=[0.7, 0.1, 0.2]),
+        'ente_federativo_responsavel': None,
+    })[EMPRESAS_COLS]
+
+
+def gera_estabelecimentos(rng, empresas, media_filiais=0.3):
+    """Uma matriz por empresa e um número geométrico de filiais."""
+    n_empresas = len(empresas)
+    filiais = rng.geometric(1 / (1 + media_filiais), n_empresas) - 1
+    repeticoes = filiais + 1
+
+    cnpj_basico = np.repeat(empresas['cnpj_basico'].to_numpy(), repeticoes)
+    n = len(cnpj_basico)
+    # Número do estabelecimento dentro de cada empresa: 0001 para a matriz.
+    inicio = np.repeat(np.cumsum(repeticoes) - repeticoes, repeticoes)
+    ordem = np.arange(n) - inicio + 1
+    cnpj_ordem = _digitos(4, ordem)
+    matriz = ordem == 1
+
+    situacao = _escolhe(rng, ['02', '08', '04', '03'], n, p=[0.6, 0.3, 0.07, 0.03])
+    n_secundarios = rng.integers(0, 4, n)
+    secundarios = [','.join(rng.choice(CNAES, k, replace=False)) for k in n_secundarios]
+    uf_municipio = rng.integers(0, len(UFS_MUNICIPIOS), n)
+    ufs = np.array([u for u, _ in UFS_MUNICIPIOS], dtype=object)
+    municipios = np.array([m for _, m in UFS_MUNICIPIOS], dtype=object)
+    nome_fantasia = _escolhe(rng, ATIVIDADES, n) + ' ' + _escolhe(rng, SOBRENOMES, n)
+
+    return pd.DataFrame({
+        'cnpj_basico': cnpj_basico,
+        'cnpj_ordem': cnpj_ordem,
+        'cnpj_dv': digitos_verificadores(cnpj_basico, cnpj_ordem),
+        'identificador_matriz_filial': np.where(matriz, '1', '2'),
+        'nome_fantasia': np.where(rng.random(n) < 0.6, nome_fantasia, None),
+        'situacao_cadastral': situacao,
+        'data_situacao_cadastral': _datas(rng, n, '20050101'),
+        'motivo_situacao_cadastral': np.where(situacao == '08', '01', '00'),
+        'nome_cidade_exterior': None,
+        'pais': None,
+        'data_inicio_atividade': _datas(rng, n),
+        'cnae_fiscal_principal': _escolhe(rng, CNAES, n),
+        'cnae_fiscal_secundaria': np.where(n_secundarios > 0, np.array(secundarios, dtype=object), None),
+        'tipo_logradouro': _escolhe(rng, ['RUA', 'AVENIDA', 'TRAVESSA', 'RODOVIA'], n, p=[0.6, 0.3, 0.05, 0.05]),
+        'logradouro': _escolhe(rng, LOGRADOUROS, n),
+        'numero': _digitos(1, rng.integers(1, 3000, n)),
+        'complemento': np.where(rng.random(n) < 0.3, 'SALA ' + _digitos(1, rng.integers(1, 999, n)), None),
+        'bairro': _escolhe(rng, BAIRROS, n),
+        'cep': _digitos(8, rng.integers(10**6, 10**8, n)),
+        'uf': ufs[uf_municipio],
+        'municipio': municipios[uf_municipio],
+        'ddd_1': _digitos(2, rng.integers(11, 99, n)),
+        'telefone_1': _digitos(8, rng.integers(10**7, 10**8, n)),
+        'ddd_2': None,
+        'telefone_2': None,
+        'ddd_fax': None,
+        'fax': None,
+        'email': np.where(rng.random(n) < 0.5, 'CONTATO' + _digitos(1, np.arange(n)) + '@EXEMPLO.COM.BR', None),
+        'situacao_especial': None,
+        'data_situacao_especial': None,
+    })[ESTABELECIMENTOS_COLS]
+
+
+def gera_socios(rng, empresas, estabelecimentos, alpha_pf=0.6, alpha_pj=0.7, fracao_pj=0.08):
+    """
+    Quadro societário com hubs. O número de sócios por empresa segue uma Zipf
+    (a maioria tem 1 ou 2, poucas têm dezenas). Cada vaga é ocupada por uma
+    pessoa física de um conjunto escolhida com probabilidade ~ 1/rank^alpha_pf,
+    ou, com probabilidade fracao_pj, por outra empresa (sócia PJ, identificada
+    pelo CNPJ da matriz) escolhida com probabilidade ~ 1/rank^alpha_pj.
+    """
+    n_empresas = len(empresas)
+    por_empresa = np.minimum(rng.zipf(2.0, n_empresas), 60)
+    por_empresa[rng.random(n_empresas) < 0.3] = 0  # empresários individuais e MEI não têm QSA
+    cnpj_basico = np.repeat(empresas['cnpj_basico'].to_numpy(), por_empresa)
+    n = len(cnpj_basico)
+
+    # Pessoas físicas: CPF mascarado como no dump (***XXXXXX**) + nome.
+    n_pessoas = max(1, int(n * 0.7))
+    cpfs = '***' + _digitos(6, rng.integers(0, 10**6, n_pessoas)) + '**'
+    nomes = _nomes_pessoas(rng, n_pessoas)
+    pessoa = rng.choice(n_pessoas, n, p=_pesos_zipf(n_pessoas, alpha_pf))
+
+    # Sócios PJ: CNPJ completo da matriz de outra empresa.
+    matrizes = estabelecimentos[estabelecimentos['identificador_matriz_filial'] == '1']
+    cnpjs_matriz = (matrizes['cnpj_basico'] + matrizes['cnpj_ordem'] + matrizes['cnpj_dv']).to_numpy()
+    razoes = empresas.set_index('cnpj_basico').loc[matrizes['cnpj_basico'], 'razao_social'].to_numpy()
+    ordem_pj = rng.permutation(len(cnpjs_matriz))
+    empresa_socia = ordem_pj[rng.choice(len(cnpjs_matriz), n, p=_pesos_zipf(len(cnpjs_matriz), alpha_pj))]
+
+    pj = rng.random(n) < fracao_pj
+    pj &= matrizes['cnpj_basico'].to_numpy()[empresa_socia] != cnpj_basico  # não é sócia de si mesma
+    estrangeiro = ~pj & (rng.random(n) < 0.01)
+
+    socios = pd.DataFrame({
+        'cnpj_basico': cnpj_basico,
+        'identificador_socio': np.where(pj, '1', np.where(estrangeiro, '3', '2')),
+        'nome_socio_razao_social': np.where(pj, razoes[empresa_socia], nomes[pessoa]),
+        'cnpj_cpf_socio': np.where(pj, cnpjs_matriz[empresa_socia], np.where(estrangeiro, '***999999**', cpfs[pessoa])),
+        'qualificacao_socio': np.where(pj, '22', _escolhe(rng, QUALIFICACOES_SOCIO, n, p=[0.4, 0.3, 0.1, 0.08, 0.05, 0.05, 0.02])),
+        'data_entrada_sociedade': _datas(rng, n, '19900101'),
+        'pais': np.where(estrangeiro, '249', None),
+        'representante_legal': '***000000**',
+        'nome_representante': None,
+        'qualificacao_representante_legal': '00',
+        'faixa_etaria': np.where(pj, '0', _escolhe(rng, list('123456789'), n)),
+    })[SOCIOS_COLS]
+    return socios.drop_duplicates(subset=['cnpj_basico', 'cnpj_cpf_socio', 'nome_socio_razao_social'])
+
+
+def gera_simples(rng, empresas):
+    """Opção pelo Simples/MEI para cerca de metade das empresas."""
+    optantes = empresas['cnpj_basico'].to_numpy()[rng.random(len(empresas)) < 0.5]
+    n = len(optantes)
+    mei = rng.random(n) < 0.4
+    excluida = rng.random(n) < 0.2
+    return pd.DataFrame({
+        'cnpj_basico': optantes,
+        'opcao_pelo_simples': 'S',
+        'data_opcao_simples': _datas(rng, n, '20070701'),
+        'data_exclusao_simples': np.where(excluida, _datas(rng, n, '20100101'), '00000000'),
+        'opcao_pelo_mei': np.where(mei, 'S', 'N'),
+        'data_opcao_mei': np.where(mei, _datas(rng, n, '20090701'), '00000000'),
+        'data_exclusao_mei': '00000000',
+    })[SIMPLES_COLS]
+
+
+def grava_zip(df, caminho, membro):
+    """Grava o DataFrame como o único CSV de um ZIP, no formato do dump da RFB."""
+    with zipfile.ZipFile(caminho, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        with zf.open(membro, 'w', force_zip64=True) as destino:
+            texto = io.TextIOWrapper(destino, encoding=ENCODING, newline='')
+            df.to_csv(texto, sep=';', header=False, index=False, quoting=csv.QUOTE_ALL, lineterminator='\n')
+            texto.flush()
+            texto.detach()
+
+
+def grava_particionado(df, pasta, prefixo, n_arquivos):
+    """Divide as linhas em n_arquivos ZIPs (<prefixo>0.zip, <prefixo>1.zip, ...)."""
+    caminhos = []
+    for i, parte in enumerate(np.array_split(np.arange(len(df)), n_arquivos)):
+        caminho = os.path.join(pasta, f'{prefixo}{i}.zip')
+        grava_zip(df.iloc[parte], caminho, f'K3241.K03200Y{i}.{DATA_REFERENCIA}.{SUFIXOS_MEMBRO[prefixo]}')
+        caminhos.append(caminho)
+    return caminhos
+
+
+def gera_dump(pasta, n_empresas, n_arquivos=10, seed=0):
+    """
+    Gera o dump sintético em `pasta` e retorna um resumo com o número de linhas
+    de cada tabela e os maiores graus da rede societária.
+    """
+    os.makedirs(pasta, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    empresas = gera_empresas(rng, n_empresas)
+    estabelecimentos = gera_estabelecimentos(rng, empresas)
+    socios = gera_socios(rng, empresas, estabelecimentos)
+    simples = gera_simples(rng, empresas)
+
+    grava_particionado(empresas, pasta, 'Empresas', n_arquivos)
+    grava_particionado(estabelecimentos, pasta, 'Estabelecimentos', n_arquivos)
+    grava_particionado(socios, pasta, 'Socios', n_arquivos)
+    grava_zip(simples, os.path.join(pasta, 'Simples.zip'), f'F.K03200$W.SIMPLES.CSV.{DATA_REFERENCIA}')
+
+    grau_socios = socios.groupby(['cnpj_cpf_socio', 'nome_socio_razao_social']).size()
+    return {
+        'empresas': len(empresas),
+        'estabelecimentos': len(estabelecimentos),
+        'socios': len(socios),
+        'simples': len(simples),
+        'maior_grau_socio': int(grau_socios.max()) if len(grau_socios) else 0,
+        'maior_qsa': int(socios.groupby('cnpj_basico').size().max()) if len(socios) else 0,
+        'socios_com_grau_10_ou_mais': int((grau_socios >= 10).sum()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gera um dump sintético da base de CNPJ no layout da Receita Federal.')
+    parser.add_argument('--empresas', type=int, default=100000, help='Número de empresas. (Padrão: 100000)')
+    parser.add_argument('--arquivos', type=int, default=10, help='ZIPs por tabela, como no dump oficial. (Padrão: 10)')
+    parser.add_argument('--saida', default=os.path.join('tools', 'downloads_cnpj_sintetico'),
+                        help='Pasta de saída. (Padrão: tools/downloads_cnpj_sintetico)')
+    parser.add_argument('--seed', type=int, default=0, help='Semente do gerador aleatório. (Padrão: 0)')
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    resumo = gera_dump(args.saida, args.empresas, args.arquivos, args.seed)
+    print(f'Dump sintético gravado em {args.saida} em {time.perf_counter() - inicio:,.1f}s:')
+    for chave, valor in resumo.items():
+        print(f'  {chave}: {valor:,}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,330 @@
+"""
+Particiona arquivos de empresas/estabelecimentos em um arquivo por valor de
+uma ou mais colunas (ex: uf, municipio, cnae_fiscal), em uma única passada.
+
+As linhas são acumuladas em um buffer por partição e gravadas em blocos,
+usando um pool LRU de arquivos abertos: o número de descritores abertos
+fica limitado mesmo com milhares de partições (ex: municípios).
+
+Entradas aceitas:
+- CSV no layout antigo (empresas.csv, com cabeçalho, ver header_dict.py);
+- ZIPs de Estabelecimentos da Receita Federal (novo layout, ';', latin1);
+- uma tabela do banco SQLite gerado pelo cnpj.py (--sqlite).
+
+Com mais de um arquivo de entrada e --workers > 1, cada arquivo é
+particionado em um processo separado e os resultados são concatenados
+ao final.
+
+Uso:
+    python particionar_csv.py --colunas uf municipio
+    python particionar_csv.py --colunas cnae_fiscal --entrada Estabelecimentos*.zip --workers 4
+    python particionar_csv.py --colunas uf --sqlite CNPJ_full.db --tabela estabelecimentos
+"""
+import settings
+import argparse
+import csv
+import glob
+import io
+import os
+import shutil
+import sqlite3
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from header_dict import get_header_index, get_estabelecimentos_index
+
+# Número máximo de arquivos de saída abertos ao mesmo tempo.
+MAX_ARQUIVOS_ABERTOS = 256
+
+# Tamanho do buffer de cada partição antes de ser gravado em disco.
+BUFFER_PARTICAO = 64 * 1024
+
+# Limite da soma dos buffers de todas as partições.
+BUFFER_TOTAL = 256 * 1024 * 1024
+
+# Buffer de escrita de cada arquivo aberto.
+BUFFER_ARQUIVO = 1024 * 1024
+
+SQLITE_FETCH_SIZE = 50000
+
+
+class _BufferParticao:
+
+    __slots__ = ('caminho', 'io', 'writer')
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.io = io.StringIO()
+        self.writer = csv.writer(self.io, quoting=csv.QUOTE_ALL, lineterminator='\n')
+
+
+class Particionador:
+    """Distribui linhas entre os arquivos de suas partições."""
+
+    def __init__(self, pasta_saida, sufixo='', encoding='utf-8',
+                 max_abertos=MAX_ARQUIVOS_ABERTOS, buffer_particao=BUFFER_PARTICAO,
+                 buffer_total=BUFFER_TOTAL):
+        self.pasta_saida = pasta_saida
+        self.sufixo = sufixo
+        self.encoding = encoding
+        self.max_abertos = max_abertos
+        self.buffer_particao = buffer_particao
+        self.buffer_total = buffer_total
+
+        self._buffers = {}             # chaves -> _BufferParticao
+        self._abertos = OrderedDict()  # caminho -> arquivo, do menos ao mais recente
+        self._criados = set()          # caminhos já criados nesta execução
+        self._bytes_em_buffer = 0
+
+    def _caminho(self, chaves):
+        partes = [_nome_seguro(chave) for chave in chaves]
+        return os.path.join(self.pasta_saida, *partes[:-1], partes[-1] + '.csv' + self.sufixo)
+
+    def _arquivo(self, caminho):
+        arquivo = self._abertos.get(caminho)
+        if arquivo is not None:
+            self._abertos.move_to_end(caminho)
+            return arquivo
+
+        if len(self._abertos) >= self.max_abertos:
+            _, menos_recente = self._abertos.popitem(last=False)
+            menos_recente.close()
+
+        # Na primeira abertura o arquivo é recriado; depois, só acrescenta.
+        if caminho in self._criados:
+            modo = 'a'
+        else:
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            self._criados.add(caminho)
+            modo = 'w'
+
+        arquivo = open(caminho, modo, encoding=self.encoding, newline='', buffering=BUFFER_ARQUIVO)
+        self._abertos[caminho] = arquivo
+        return arquivo
+
+    def _descarrega(self, buffer):
+        conteudo = buffer.io.getvalue()
+        if conteudo:
+            self._arquivo(buffer.caminho).write(conteudo)
+            self._bytes_em_buffer -= len(conteudo)
+            buffer.io.seek(0)
+            buffer.io.truncate()
+
+    def descarrega_tudo(self):
+        for buffer in self._buffers.values():
+            self._descarrega(buffer)
+
+    def escreve(self, chaves, linha):
+        buffer = self._buffers.get(chaves)
+        if buffer is None:
+            buffer = self._buffers[chaves] = _BufferParticao(self._caminho(chaves))
+
+        antes = buffer.io.tell()
+        buffer.writer.writerow(linha)
+        depois = buffer.io.tell()
+        self._bytes_em_buffer += depois - antes
+
+        if depois >= self.buffer_particao:
+            self._descarrega(buffer)
+        if self._bytes_em_buffer >= self.buffer_total:
+            self.descarrega_tudo()
+
+    def fecha(self):
+        self.descarrega_tudo()
+        for arquivo in self._abertos.values():
+            arquivo.close()
+        self._abertos.clear()
+
+    def caminhos(self):
+        return sorted(self._criados)
+
+
+def _nome_seguro(valor):
+    valor = str(valor).strip().replace(os.sep, '_').replace('/', '_')
+    return valor if valor not in ('', '.', '..') else '_'
+
+
+# --- Leitura das entradas ---
+
+def linhas_csv(caminho, encoding='utf-8'):
+    """Linhas de um CSV no layout antigo (com cabeçalho)."""
+    with open(caminho, 'r', encoding=encoding, newline='') as f:
+        linhas = csv.reader(linha.replace('\0', '') for linha in f)
+        next(linhas, None)
+        yield from linhas
+
+
+def linhas_zip(caminho, encoding='latin1'):
+    """Linhas dos membros de um ZIP da Receita Federal (';', sem cabeçalho)."""
+    with zipfile.ZipFile(caminho) as zf:
+        for info in zf.infolist():
+            if info.is_dir():
+                continue
+            with zf.open(info) as membro:
+                texto = io.TextIOWrapper(membro, encoding=encoding, newline='')
+                yield from csv.reader(texto, delimiter=';')
+
+
+def indices_entrada(caminho, colunas):
+    """Posição das colunas de partição de acordo com o layout da entrada."""
+    if zipfile.is_zipfile(caminho):
+        return [get_estabelecimentos_index(coluna) for coluna in colunas]
+    return [get_header_index(coluna) for coluna in colunas]
+
+
+def particiona_linhas(linhas, indices, particionador):
+    """Grava cada linha na partição correspondente. Retorna (sucessos, erros)."""
+    count_sucesso = 0
+    count_erro = 0
+
+    for linha in linhas:
+        try:
+            chaves = tuple(linha[i] for i in indices)
+            particionador.escreve(chaves, linha)
+            count_sucesso += 1
+        except (IndexError, TypeError):
+            count_erro += 1
+
+        if count_sucesso and count_sucesso % 100000 == 0:
+            print('Registros processados: {} | Erros: {}'.format(count_sucesso, count_erro), end='\r')
+
+    return count_sucesso, count_erro
+
+
+def _particiona_arquivo(caminho, colunas, pasta_saida, sufixo='', encoding_entrada='utf-8',
+                        encoding_saida='utf-8', max_abertos=MAX_ARQUIVOS_ABERTOS):
+    particionador = Particionador(pasta_saida, sufixo, encoding_saida, max_abertos)
+    try:
+        if zipfile.is_zipfile(caminho):
+            linhas = linhas_zip(caminho)
+        else:
+            linhas = linhas_csv(caminho, encoding_entrada)
+        contagem = particiona_linhas(linhas, indices_entrada(caminho, colunas), particionador)
+    finally:
+        particionador.fecha()
+    return contagem, particionador.caminhos()
+
+
+def _particiona_shard(args):
+    return _particiona_arquivo(*args)
+
+
+def _junta_shards(caminhos_por_shard, sufixos):
+    """Concatena os arquivos parciais de cada shard, na ordem das entradas."""
+    destinos = OrderedDict()
+    for caminhos, sufixo in zip(caminhos_por_shard, sufixos):
+        for caminho in caminhos:
+            destinos.setdefault(caminho[:-len(sufixo)], []).append(caminho)
+
+    for destino, partes in destinos.items():
+        with open(destino, 'wb') as saida:
+            for parte in partes:
+                with open(parte, 'rb') as entrada:
+                    shutil.copyfileobj(entrada, saida, BUFFER_ARQUIVO)
+                os.remove(parte)
+
+
+def particiona(entradas, colunas, pasta_saida, workers=1, encoding_entrada='utf-8',
+               encoding_saida='utf-8', max_abertos=MAX_ARQUIVOS_ABERTOS):
+    """
+    Particiona os arquivos de entrada (CSV ou ZIP) pelas colunas indicadas.
+    A última coluna define o nome do arquivo e as anteriores, subpastas.
+    Ex: colunas ['uf', 'municipio'] -> <pasta_saida>/SP/7107.csv
+    """
+    if workers <= 1 or len(entradas) <= 1:
+        particionador = Particionador(pasta_saida, encoding=encoding_saida, max_abertos=max_abertos)
+        total_sucesso = total_erro = 0
+        try:
+            for caminho in entradas:
+                if zipfile.is_zipfile(caminho):
+                    linhas = linhas_zip(caminho)
+                else:
+                    linhas = linhas_csv(caminho, encoding_entrada)
+                sucesso, erro = particiona_linhas(linhas, indices_entrada(caminho, colunas), particionador)
+                total_sucesso += sucesso
+                total_erro += erro
+        finally:
+            particionador.fecha()
+        return total_sucesso, total_erro
+
+    # Cada processo grava em arquivos com um sufixo próprio,
+    # para que dois processos nunca escrevam no mesmo arquivo.
+    sufixos = ['.part{}'.format(i) for i in range(len(entradas))]
+    tarefas = [(caminho, colunas, pasta_saida, sufixo, encoding_entrada, encoding_saida,
+                max(1, max_abertos // workers))
+               for caminho, sufixo in zip(entradas, sufixos)]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        resultados = list(executor.map(_particiona_shard, tarefas))
+
+    _junta_shards([caminhos for _, caminhos in resultados], sufixos)
+
+    return (sum(sucesso for (sucesso, _), _ in resultados),
+            sum(erro for (_, erro), _ in resultados))
+
+
+def particiona_sqlite(caminho_bd, tabela, colunas, pasta_saida, encoding_saida='utf-8',
+                      max_abertos=MAX_ARQUIVOS_ABERTOS):
+    """Particiona uma tabela do banco SQLite pelas colunas indicadas (nomes da tabela)."""
+    conBD = sqlite3.connect('file:{}?mode=ro'.format(caminho_bd), uri=True)
+    particionador = Particionador(pasta_saida, encoding=encoding_saida, max_abertos=max_abertos)
+    try:
+        cursor = conBD.execute('SELECT * FROM {}'.format(tabela))
+        nomes = [descricao[0] for descricao in cursor.description]
+        indices = [nomes.index(coluna) for coluna in colunas]
+
+        def linhas():
+            while True:
+                bloco = cursor.fetchmany(SQLITE_FETCH_SIZE)
+                if not bloco:
+                    return
+                yield from bloco
+
+        return particiona_linhas(linhas(), indices, particionador)
+    finally:
+        particionador.fecha()
+        conBD.close()
+
+
+def main():
+    location = os.getenv('FILES_LOCATION', '')
+
+    parser = argparse.ArgumentParser(
+        description='Particiona empresas/estabelecimentos em um arquivo por valor de coluna, em uma única passada.',
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument('--colunas', nargs='+', default=['uf'],
+                        help='Colunas de partição (ver header_dict.py), ex: uf municipio. (Padrão: uf)')
+    parser.add_argument('--entrada', nargs='+',
+                        help='Arquivos CSV (layout antigo) ou ZIPs de Estabelecimentos da RFB. Aceita curingas.\n'
+                             '(Padrão: FILES_LOCATION + empresas.csv)')
+    parser.add_argument('--sqlite', help='Lê de um banco SQLite em vez de arquivos de entrada.')
+    parser.add_argument('--tabela', default='estabelecimentos', help='Tabela lida com --sqlite. (Padrão: estabelecimentos)')
+    parser.add_argument('--saida', help='Pasta de saída. (Padrão: FILES_LOCATION + particoes_<colunas>)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Processos para particionar vários arquivos de entrada em paralelo. (Padrão: 1)')
+    parser.add_argument('--max-abertos', dest='max_abertos', type=int, default=MAX_ARQUIVOS_ABERTOS,
+                        help='Número máximo de arquivos de saída abertos. (Padrão: {})'.format(MAX_ARQUIVOS_ABERTOS))
+    parser.add_argument('--encoding', default='utf-8', help='Encoding das entradas CSV e da saída. (Padrão: utf-8)')
+    args = parser.parse_args()
+
+    pasta_saida = args.saida or os.path.join(location, 'particoes_' + '_'.join(args.colunas))
+
+    if args.sqlite:
+        sucesso, erro = particiona_sqlite(args.sqlite, args.tabela, args.colunas, pasta_saida,
+                                          args.encoding, args.max_abertos)
+    else:
+        padroes = args.entrada or [location + 'empresas.csv']
+        entradas = [caminho for padrao in padroes for caminho in sorted(glob.glob(padrao))]
+        if not entradas:
+            parser.error('Nenhum arquivo de entrada encontrado: {}'.format(' '.join(padroes)))
+        sucesso, erro = particiona(entradas, args.colunas, pasta_saida, args.workers,
+                                   args.encoding, args.encoding, args.max_abertos)
+
+    print('Registros processados: {} | Erros: {}'.format(sucesso, erro))
+    print('Partições gravadas em "{}".'.format(pasta_saida))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+# -*- encoding: utf-8 -*-
+"""
+Beneficiários finais: para cada empresa com sócios PJ, as pessoas físicas e os
+estrangeiros no topo das cadeias de participação (sócio PJ -> seus sócios -> ...),
+com a profundidade de cada um, calculados uma vez após a carga. Quem controla
+uma empresa passa a ser uma consulta indexada, sem expandir a rede nível a nível.
+
+- As cadeias são percorridas em largura, no SQLite, a partir dos sócios diretos:
+  cada par (empresa, beneficiário) é gravado uma só vez, na menor profundidade
+  (1 = sócio direto). Os pares já vistos não são propagados de novo, então ciclos
+  de participação (A sócia de B, B sócia de A) não fazem a busca voltar.
+- Empresas que fazem parte de um ciclo (componentes fortemente conexos do grafo
+  de participações PJ -> PJ) são marcadas com ciclo = 1.
+- O topo da cadeia também pode ser uma empresa: sócia PJ sem sócios na base, ou
+  com mais de MAX_SOCIOS_CONTROLADOR sócios (cooperativas, fundos, companhias
+  abertas), que não tem controladores identificáveis e não é atravessada.
+- Empresas sem sócios PJ não entram na tabela: os beneficiários delas são os
+  próprios sócios (beneficiarios_de consulta a tabela socios nesse caso).
+
+Tabela gravada: beneficiarios (cnpj_basico, beneficiario, identificador_socio,
+profundidade, ciclo). beneficiario é o cnpj_basico (PJ) ou o CPF mascarado seguido
+do nome (PF e estrangeiros), como nas chaves da tabela grupos.
+
+Depois de uma carga parcial, atualiza_beneficiarios recalcula só as empresas cujos
+sócios mudaram e as que estão abaixo delas nas cadeias.
+
+Uso (após a carga do cnpj.py, que já chama calcula_beneficiarios ao final):
+    python beneficiarios.py output/CNPJ_full.db [--alteradas=<arquivo>]
+"""
+import sys
+import time
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+TABELA_BENEFICIARIOS = 'beneficiarios'
+
+# Sócias PJ com mais sócios que isso encerram a cadeia (não são atravessadas).
+MAX_SOCIOS_CONTROLADOR = 1000
+
+# Limite de segurança para o comprimento das cadeias.
+PROFUNDIDADE_MAX = 50
+
+_SOCIO_PJ = ("identificador_socio = '1' AND length(cnpj_cpf_socio) = 14 "
+             "AND cnpj_cpf_socio NOT GLOB '*[^0-9]*'")
+_CHAVE_PESSOA = "ifnull(cnpj_cpf_socio, '') || ifnull(nome_socio_razao_social, '')"
+
+
+def _ciclos(conBD):
+    """cnpj_basico das empresas em ciclos de participação (componente forte com 2+ empresas ou auto-participação)."""
+    # O SciPy só é importado aqui: as consultas não dependem dele
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import connected_components
+    arestas = pd.read_sql_query('SELECT dono, empresa FROM _arestas', conBD)
+    if arestas.empty:
+        return []
+    codigos, chaves = pd.factorize(pd.concat([arestas['dono'], arestas['empresa']], ignore_index=True))
+    dono, empresa = codigos[:len(arestas)], codigos[len(arestas):]
+    A = csr_matrix((np.ones(len(dono), dtype=np.int8), (dono, empresa)), shape=(len(chaves), len(chaves)))
+    _, rotulo = connected_components(A, directed=True, connection='strong')
+    tamanho = np.bincount(rotulo)
+    em_ciclo = tamanho[rotulo] > 1
+    em_ciclo[dono[dono == empresa]] = True
+    return chaves[em_ciclo].tolist()
+
+
+def _propaga(conBD, incremental):
+    """
+    Calcula os pares (empresa, beneficiário) das empresas de _alvo em _pares. Sementes:
+    os sócios PF/estrangeiros diretos e as sócias PJ que encerram a cadeia (profundidade
+    1) e, para as sócias PJ fora de _alvo, os beneficiários delas (da tabela gravada, se
+    incremental, ou os sócios diretos). Cada nível k gera o nível k + 1.
+    """
+    conBD.executescript(f'''
+        CREATE TEMP TABLE _arestas AS
+            SELECT DISTINCT substr(cnpj_cpf_socio, 1, 8) AS dono, cnpj_basico AS empresa FROM socios
+            WHERE {_SOCIO_PJ} AND cnpj_basico IN (SELECT cnpj_basico FROM _alvo);
+        CREATE INDEX temp._ix_arestas_dono ON _arestas (dono);
+
+        CREATE TEMP TABLE _terminais AS
+            SELECT d.dono FROM (SELECT DISTINCT dono FROM _arestas) d
+            LEFT JOIN (SELECT cnpj_basico, count(*) AS n FROM socios
+                       WHERE cnpj_basico IN (SELECT dono FROM _arestas) GROUP BY cnpj_basico) s
+                ON s.cnpj_basico = d.dono
+            WHERE s.n IS NULL OR s.n > {MAX_SOCIOS_CONTROLADOR};
+        CREATE UNIQUE INDEX temp._ix_terminais ON _terminais (dono);
+
+        CREATE TEMP TABLE _pares (empresa TEXT, beneficiario TEXT, identificador_socio INTEGER,
+                                  profundidade INTEGER, PRIMARY KEY (empresa, beneficiario)) WITHOUT ROWID;
+        CREATE INDEX temp._ix_pares_profundidade ON _pares (profundidade);
+        INSERT OR IGNORE INTO _pares
+            SELECT cnpj_basico, {_CHAVE_PESSOA}, CAST(identificador_socio AS INTEGER), 1 FROM socios
+            WHERE cnpj_basico IN (SELECT cnpj_basico FROM _alvo) AND NOT ({_SOCIO_PJ});
+        INSERT OR IGNORE INTO _pares
+            SELECT a.empresa, a.dono, 1, 1 FROM _arestas a JOIN _terminais t ON t.dono = a.dono;
+
+        CREATE TEMP TABLE _sementes (empresa TEXT, beneficiario TEXT, identificador_socio INTEGER, profundidade INTEGER);
+        CREATE TEMP TABLE _donos_externos AS
+            SELECT DISTINCT dono FROM _arestas
+            WHERE dono NOT IN (SELECT cnpj_basico FROM _alvo) AND dono NOT IN (SELECT dono FROM _terminais);
+    ''')
+    if incremental:
+        conBD.execute(f'''
+            INSERT INTO _sementes
+                SELECT cnpj_basico, beneficiario, identificador_socio, profundidade FROM {TABELA_BENEFICIARIOS}
+                WHERE cnpj_basico IN (SELECT dono FROM _donos_externos)''')
+    conBD.execute(f'''
+        INSERT INTO _sementes
+            SELECT cnpj_basico, {_CHAVE_PESSOA}, CAST(identificador_socio AS INTEGER), 1 FROM socios
+            WHERE cnpj_basico IN (SELECT dono FROM _donos_externos {
+                f'EXCEPT SELECT cnpj_basico FROM {TABELA_BENEFICIARIOS}' if incremental else ''})
+              AND NOT ({_SOCIO_PJ})''')
+    conBD.execute('CREATE INDEX temp._ix_sementes_profundidade ON _sementes (profundidade)')
+    profundidade_sementes = conBD.execute('SELECT max(profundidade) FROM _sementes').fetchone()[0] or 0
+
+    k = 1
+    while k < PROFUNDIDADE_MAX:
+        novos = conBD.execute(f'''
+            INSERT OR IGNORE INTO _pares
+                SELECT a.empresa, p.beneficiario, p.identificador_socio, {k + 1}
+                FROM (SELECT empresa, beneficiario, identificador_socio FROM _pares WHERE profundidade = {k}
+                      UNION ALL
+                      SELECT empresa, beneficiario, identificador_socio FROM _sementes WHERE profundidade = {k}) p
+                JOIN _arestas a ON a.dono = p.empresa
+                WHERE a.empresa <> a.dono AND a.dono NOT IN (SELECT dono FROM _terminais)''').rowcount
+        k += 1
+        if not novos and k > profundidade_sementes:
+            break
+    else:
+        print(f'  Aviso: cadeias interrompidas na profundidade {PROFUNDIDADE_MAX}.')
+
+
+def _grava(conBD, incremental):
+    ciclos = _ciclos(conBD)
+    conBD.execute('CREATE TEMP TABLE _ciclos (cnpj_basico TEXT PRIMARY KEY)')
+    conBD.executemany('INSERT INTO _ciclos VALUES (?)', ((c,) for c in ciclos))
+    if incremental:
+        conBD.execute(f'DELETE FROM {TABELA_BENEFICIARIOS} WHERE cnpj_basico IN (SELECT cnpj_basico FROM _afetadas)')
+    else:
+        conBD.execute(f'DROP TABLE IF EXISTS {TABELA_BENEFICIARIOS}')
+        conBD.execute(f'CREATE TABLE {TABELA_BENEFICIARIOS} (cnpj_basico TEXT, beneficiario TEXT, '
+                      f'identificador_socio INTEGER, profundidade INTEGER, ciclo INTEGER)')
+    linhas = conBD.execute(f'''
+        INSERT INTO {TABELA_BENEFICIARIOS}
+            SELECT empresa, beneficiario, identificador_socio, profundidade,
+                   empresa IN (SELECT cnpj_basico FROM _ciclos)
+            FROM _pares ORDER BY empresa, profundidade, beneficiario''').rowcount
+    if not incremental:
+        conBD.execute(f'CREATE INDEX ix_beneficiarios_empresa ON {TABELA_BENEFICIARIOS} (cnpj_basico)')
+        conBD.execute(f'CREATE INDEX ix_beneficiarios_beneficiario ON {TABELA_BENEFICIARIOS} (beneficiario)')
+    for tabela in ('_alvo', '_afetadas', '_arestas', '_terminais', '_pares', '_sementes', '_donos_externos', '_ciclos'):
+        conBD.execute(f'DROP TABLE IF EXISTS temp.{tabela}')
+    conBD.commit()
+    return linhas, len(ciclos)
+
+
+def calcula_beneficiarios(conBD):
+    """
+    Calcula os beneficiários finais de todas as empresas com sócios PJ e grava a tabela
+    beneficiarios (substituindo a anterior), com os índices das consultas. Devolve o
+    número de pares (empresa, beneficiário) gravados.
+    """
+    inicio = time.perf_counter()
+    print('Calculando beneficiários finais (cadeias de sócios PJ)...')
+    conBD.execute(f'CREATE TEMP TABLE _alvo AS SELECT DISTINCT cnpj_basico FROM socios WHERE {_SOCIO_PJ}')
+    conBD.execute('CREATE UNIQUE INDEX temp._ix_alvo ON _alvo (cnpj_basico)')
+    n_empresas = conBD.execute('SELECT count(*) FROM _alvo').fetchone()[0]
+    _propaga(conBD, incremental=False)
+    linhas, n_ciclos = _grava(conBD, incremental=False)
+    print(f'Beneficiários de {n_empresas:,} empresas ({linhas:,} pares, {n_ciclos:,} empresas em ciclos) '
+          f'gravados em {time.perf_counter() - inicio:.1f}s.')
+    return linhas
+
+
+def atualiza_beneficiarios(conBD, cnpjs_alterados):
+    """
+    Recalcula os beneficiários depois de uma carga parcial: cnpjs_alterados são os
+    cnpj_basico (ou CNPJs) cujas linhas de socios mudaram. São refeitas essas empresas
+    e todas as que estão abaixo delas nas cadeias (de que elas são sócias, direta ou
+    indiretamente); as demais linhas da tabela são aproveitadas. Sem a tabela, calcula
+    tudo. Devolve o número de pares gravados.
+    """
+    if not existe(conBD):
+        return calcula_beneficiarios(conBD)
+    inicio = time.perf_counter()
+    conBD.execute('CREATE TEMP TABLE _alteradas (cnpj_basico TEXT PRIMARY KEY)')
+    conBD.executemany('INSERT OR IGNORE INTO _alteradas VALUES (?)', ((str(c).strip()[:8],) for c in cnpjs_alterados))
+    # O + em identificador_socio evita que o SQLite troque o índice de cnpj_cpf_socio por um automático
+    conBD.execute('''
+        CREATE TEMP TABLE _afetadas AS
+            WITH RECURSIVE abaixo(cnpj_basico) AS (
+                SELECT cnpj_basico FROM _alteradas
+                UNION
+                SELECT s.cnpj_basico FROM abaixo a
+                JOIN socios s ON s.cnpj_cpf_socio BETWEEN a.cnpj_basico || '000000' AND a.cnpj_basico || '999999'
+                WHERE +s.identificador_socio = '1')
+            SELECT cnpj_basico FROM abaixo''')
+    conBD.execute('DROP TABLE temp._alteradas')
+    conBD.execute('CREATE UNIQUE INDEX temp._ix_afetadas ON _afetadas (cnpj_basico)')
+    conBD.execute(f'CREATE TEMP TABLE _alvo AS SELECT DISTINCT cnpj_basico FROM socios '
+                  f'WHERE cnpj_basico IN (SELECT cnpj_basico FROM _afetadas) AND {_SOCIO_PJ}')
+    conBD.execute('CREATE UNIQUE INDEX temp._ix_alvo ON _alvo (cnpj_basico)')
+    n_empresas = conBD.execute('SELECT count(*) FROM _afetadas').fetchone()[0]
+    _propaga(conBD, incremental=True)
+    linhas, _ = _grava(conBD, incremental=True)
+    print(f'Beneficiários de {n_empresas:,} empresas afetadas recalculados ({linhas:,} pares) '
+          f'em {time.perf_counter() - inicio:.1f}s.')
+    return linhas
+
+
+# --- Consultas ---
+
+def existe(conBD):
+    """Se os beneficiários já foram calculados neste banco."""
+    return conBD.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                         (TABELA_BENEFICIARIOS,)).fetchone() is not None
+
+
+def beneficiarios_de(conBD, cnpj):
+    """
+    Beneficiários finais da empresa (CNPJ ou cnpj_basico): DataFrame com beneficiario,
+    identificador_socio, profundidade e ciclo, dos mais próximos aos mais distantes.
+    Empresas sem sócios PJ não estão na tabela: devolve os sócios diretos.
+    """
+    cnpj_basico = cnpj[:8]
+    df = pd.read_sql_query(f'SELECT beneficiario, identificador_socio, profundidade, ciclo FROM {TABELA_BENEFICIARIOS} '
+                           f'WHERE cnpj_basico = ? ORDER BY profundidade, beneficiario', conBD, params=[cnpj_basico])
+    if df.empty:
+        df = pd.read_sql_query(f'SELECT DISTINCT {_CHAVE_PESSOA} AS beneficiario, CAST(identificador_socio AS INTEGER) '
+                               f'AS identificador_socio, 1 AS profundidade, 0 AS ciclo FROM socios '
+                               f'WHERE cnpj_basico = ? ORDER BY beneficiario', conBD, params=[cnpj_basico])
+    return df
+
+
+def controladas(conBD, id_pessoa):
+    """
+    Empresas (cnpj_basico) de que a pessoa (CPF mascarado + nome) é beneficiária final,
+    direta ou por meio de sócias PJ, com a menor profundidade. Para uma empresa (CNPJ),
+    as participações diretas e as cadeias em que ela é o topo.
+    """
+    if id_pessoa.isdigit() and len(id_pessoa) in (8, 14):
+        chave, diretas = id_pessoa[:8], ("SELECT cnpj_basico FROM socios WHERE cnpj_cpf_socio BETWEEN ? || '000000' "
+                                         "AND ? || '999999' AND +identificador_socio = '1'")
+        parametros = [chave, chave, chave]
+    else:
+        chave, diretas = id_pessoa, 'SELECT cnpj_basico FROM socios WHERE cnpj_cpf_socio = ? AND nome_socio_razao_social = ?'
+        parametros = [chave[:11], chave[11:], chave]
+    return pd.read_sql_query(f'SELECT cnpj_basico, min(profundidade) AS profundidade FROM ('
+                             f'SELECT cnpj_basico, 1 AS profundidade FROM ({diretas}) '
+                             f'UNION ALL SELECT cnpj_basico, profundidade FROM {TABELA_BENEFICIARIOS} WHERE beneficiario = ?) '
+                             f'GROUP BY cnpj_basico ORDER BY profundidade, cnpj_basico', conBD, params=parametros)
+
+
+def main():
+    argumentos = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    opcoes = dict(arg[2:].split('=', 1) for arg in sys.argv[1:] if arg.startswith('--') and '=' in arg)
+    if len(argumentos) != 1:
+        print('Uso: python beneficiarios.py <arquivo .db> [--alteradas=<arquivo com um CNPJ por linha>]')
+        sys.exit(-1)
+    conBD = sqlite3.connect(argumentos[0])
+    try:
+        if 'alteradas' in opcoes:
+            with open(opcoes['alteradas'], encoding='utf-8') as arquivo:
+                atualiza_beneficiarios(conBD, [linha for linha in arquivo if linha.strip()])
+        else:
+            calcula_beneficiarios(conBD)
+    finally:
+        conBD.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+# -*- encoding: utf-8 -*-
+"""
+Centralidade na rede inteira de sócios, calculada uma vez após a carga com uma
+matriz esparsa do SciPy (as mesmas arestas e chaves dos grupos econômicos, ver
+grupos.py):
+
+- socios e participacoes: linhas de socios da empresa e em que a empresa/pessoa é
+  sócia (o que a expansão da rede leria ao passar pelo nó), e grau: vizinhos
+  distintos. Com elas, a montagem da rede reconhece hubs antes de consultá-los e o
+  tamanho de uma consulta pode ser estimado antes de ela rodar.
+- pagerank: PageRank no grafo não dirigido (vínculos nos dois sentidos), para
+  ordenar empresas e pessoas por importância.
+- kcore: maior k tal que o nó está no k-core (subgrafo em que todos têm ao menos
+  k vizinhos): separa o miolo densamente ligado da rede das suas bordas.
+
+Tabela gravada: centralidade (chave, tipo_pessoa, grau, socios, participacoes,
+pagerank, kcore), com as chaves da tabela grupos.
+
+Uso (após a carga do cnpj.py, que já chama calcula_centralidade ao final):
+    python centralidade.py output/CNPJ_full.db
+"""
+import sys
+import time
+import sqlite3
+
+import numpy as np
+
+import grupos
+
+TABELA_CENTRALIDADE = 'centralidade'
+
+AMORTECIMENTO_PAGERANK = 0.85
+TOLERANCIA_PAGERANK = 1e-9
+MAX_ITERACOES_PAGERANK = 100
+
+
+def adjacencia(n, origem, destino):
+    """Matriz de adjacência simétrica e binária (sem laços nem arestas repetidas), em CSR."""
+    # O SciPy só é importado no cálculo: as consultas (RedeCNPJ, consulta.py) não dependem dele
+    import scipy.sparse as sp
+    fora_laco = origem != destino
+    a, b = origem[fora_laco], destino[fora_laco]
+    uns = np.ones(2 * len(a), dtype=np.int8)
+    A = sp.csr_matrix((uns, (np.concatenate([a, b]), np.concatenate([b, a]))), shape=(n, n))
+    A.data[:] = 1
+    return A
+
+
+def pagerank(A, amortecimento=AMORTECIMENTO_PAGERANK, tolerancia=TOLERANCIA_PAGERANK,
+             max_iteracoes=MAX_ITERACOES_PAGERANK):
+    """PageRank por iteração de potência; a massa dos nós sem vizinhos é redistribuída igualmente."""
+    n = A.shape[0]
+    if not n:
+        return np.zeros(0)
+    grau = np.asarray(A.sum(axis=1)).ravel().astype(np.float64)
+    inverso = np.divide(1.0, grau, out=np.zeros(n), where=grau > 0)
+    isolados = grau == 0
+    rank = np.full(n, 1.0 / n)
+    for _ in range(max_iteracoes):
+        anterior = rank
+        rank = amortecimento * (A @ (anterior * inverso) + anterior[isolados].sum() / n) + (1 - amortecimento) / n
+        if np.abs(rank - anterior).sum() < tolerancia * n:
+            break
+    return rank
+
+
+def kcore(A):
+    """
+    Núcleo (core number) de cada nó, removendo em lote os nós de grau <= k e
+    atualizando só os vizinhos dos removidos: O(arestas) no total.
+    """
+    n = A.shape[0]
+    indptr, indices = A.indptr, A.indices
+    grau = np.diff(indptr).astype(np.int64)
+    nucleo = np.zeros(n, dtype=np.int64)
+    vivo = np.ones(n, dtype=bool)
+    k = 0
+    while vivo.any():
+        k = max(k, int(grau[vivo].min()))
+        remover = np.flatnonzero(vivo & (grau <= k))
+        while len(remover):
+            nucleo[remover] = k
+            vivo[remover] = False
+            # Vizinhos dos removidos (com repetição): um vínculo a menos para cada
+            inicio, fim = indptr[remover], indptr[remover + 1]
+            tamanhos = fim - inicio
+            posicoes = np.repeat(fim - np.cumsum(tamanhos), tamanhos) + np.arange(tamanhos.sum())
+            vizinhos = indices[posicoes]
+            vizinhos = vizinhos[vivo[vizinhos]]
+            np.subtract.at(grau, vizinhos, 1)
+            vizinhos = np.unique(vizinhos)
+            remover = vizinhos[grau[vizinhos] <= k]
+    return nucleo
+
+
+def calcula_centralidade(conBD, chunksize=grupos.CHUNKSIZE):
+    """
+    Calcula grau, vínculos, PageRank e k-core de cada empresa e pessoa da tabela socios
+    e grava a tabela centralidade (substituindo a anterior), com os índices das
+    consultas. Devolve o número de empresas e pessoas gravadas.
+    """
+    inicio = time.perf_counter()
+    print('Calculando centralidade (grau, PageRank e k-core) da rede de sócios...')
+
+    ids_empresas, ids_pessoas, origem, destino = grupos.le_arestas(conBD, chunksize)
+    n = len(ids_empresas) + len(ids_pessoas)
+    socios = np.bincount(origem, minlength=n)
+    fora_laco = origem != destino
+    participacoes = np.bincount(destino[fora_laco], minlength=n)
+    A = adjacencia(n, origem, destino)
+    del origem, destino, fora_laco
+
+    grau = np.diff(A.indptr)
+    rank = pagerank(A)
+    nucleo = kcore(A)
+    del A
+    print(f'  {n:,} empresas e pessoas (maior grau: {int(grau.max()) if n else 0:,}, '
+          f'maior k-core: {int(nucleo.max()) if n else 0}) em {time.perf_counter() - inicio:.1f}s')
+
+    conBD.execute(f'DROP TABLE IF EXISTS {TABELA_CENTRALIDADE}')
+    conBD.execute(f'CREATE TABLE {TABELA_CENTRALIDADE} (chave TEXT, tipo_pessoa INTEGER, grau INTEGER, '
+                  f'socios INTEGER, participacoes INTEGER, pagerank REAL, kcore INTEGER)')
+    grupos.grava_por_chave(conBD, TABELA_CENTRALIDADE, ids_empresas, ids_pessoas,
+                           [grau, socios, participacoes, rank, nucleo], chunksize)
+    conBD.execute(f'CREATE INDEX ix_centralidade_chave ON {TABELA_CENTRALIDADE} (chave)')
+    conBD.execute(f'CREATE INDEX ix_centralidade_pagerank ON {TABELA_CENTRALIDADE} (tipo_pessoa, pagerank)')
+    conBD.commit()
+
+    print(f'Centralidade gravada em {time.perf_counter() - inicio:.1f}s.')
+    return n
+
+
+# --- Consultas ---
+
+def existe(conBD):
+    """Se a centralidade já foi calculada neste banco."""
+    return conBD.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                         (TABELA_CENTRALIDADE,)).fetchone() is not None
+
+
+def do_no(conBD, id_pessoa):
+    """dict com grau, socios, participacoes, pagerank e kcore da empresa/pessoa, ou None se ela não tem vínculos."""
+    cursor = conBD.execute(f'SELECT grau, socios, participacoes, pagerank, kcore FROM {TABELA_CENTRALIDADE} '
+                           f'WHERE chave = ?', (grupos.chave(id_pessoa),))
+    linha = cursor.fetchone()
+    return dict(zip([c[0] for c in cursor.description], linha)) if linha else None
+
+
+def estimativa(conBD, id_pessoa):
+    """
+    Tamanho da rede de uma empresa/pessoa antes de montá-la: vizinhos (exato), um
+    teto para os nós a até 2 saltos (1 + grau + soma dos graus dos vizinhos) e, se
+    os grupos foram calculados, o tamanho do grupo econômico (teto para qualquer
+    nível). A rede com nível máximo k chega a nós a k + 1 saltos da origem: a de
+    nível 1 tem no máximo ate_2_saltos_max nós.
+    """
+    chave = grupos.chave(id_pessoa)
+    centralidade = do_no(conBD, id_pessoa)
+    if centralidade is None:
+        return {'vizinhos': 0, 'ate_2_saltos_max': 1, 'grupo': None, 'tamanho_grupo': 1}
+    if chave.isdigit():
+        vizinhos = ("SELECT CASE WHEN identificador_socio = '1' THEN substr(cnpj_cpf_socio, 1, 8) "
+                    "ELSE cnpj_cpf_socio || nome_socio_razao_social END AS chave FROM socios WHERE cnpj_basico = :chave "
+                    "UNION SELECT cnpj_basico FROM socios "
+                    "WHERE cnpj_cpf_socio BETWEEN :chave || '000000' AND :chave || '999999' AND identificador_socio = '1'")
+        parametros = {'chave': chave}
+    else:
+        vizinhos = "SELECT cnpj_basico AS chave FROM socios WHERE cnpj_cpf_socio = :cpf AND nome_socio_razao_social = :nome"
+        parametros = {'cpf': chave[:11], 'nome': chave[11:]}
+    soma = conBD.execute(f'SELECT sum(c.grau) FROM ({vizinhos}) v JOIN {TABELA_CENTRALIDADE} c ON c.chave = v.chave',
+                         parametros).fetchone()[0] or 0
+    resultado = {'vizinhos': centralidade['grau'], 'ate_2_saltos_max': 1 + centralidade['grau'] + soma,
+                 'grupo': None, 'tamanho_grupo': None}
+    if grupos.existe(conBD):
+        resultado['grupo'] = grupos.grupo_de(conBD, id_pessoa)
+        resultado['tamanho_grupo'] = grupos.tamanho_grupo(conBD, resultado['grupo'])[0]
+    return resultado
+
+
+def main():
+    if len(sys.argv) != 2:
+        print('Uso: python centralidade.py <arquivo .db>')
+        sys.exit(-1)
+    conBD = sqlite3.connect(sys.argv[1])
+    try:
+        calcula_centralidade(conBD)
+    finally:
+        conBD.close()
+
+
+if __name__ == '__main__':
+    main()
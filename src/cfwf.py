@@ -1,8 +1,35 @@
+import io
+import os
+import mmap
+import codecs
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
 import pandas as pd
 
+# Byte values used when splitting raw content into lines.
+_NEWLINE = ord('\n')
+_CARRIAGE_RETURN = ord('\r')
+_SPACE = ord(' ')
+
+# Raw content is scanned for line breaks in blocks of this many bytes, so
+# the temporary boolean mask never grows to the size of the whole file.
+_SCAN_BLOCK_BYTES = 1 << 26
+
+# Maximum number of cells gathered at once when lines have different widths.
+_GATHER_BLOCK_CELLS = 1 << 22
+
+_COMPRESSION_BY_EXTENSION = {'.gz': 'gzip', '.bz2': 'bz2',
+                             '.zip': 'zip', '.xz': 'xz'}
+
+# Bytes sampled from the beginning of the file to estimate the average line
+# length, used to convert chunksize (lines) into byte ranges in parallel mode.
+_SAMPLE_BYTES = 1 << 20
+
 def read_cfwf(filepath_or_buffer, type_width, colspecs, names=None,
               dtype=None, chunksize=None, nrows=None, compression='infer',
-              encoding=None):
+              encoding=None, engine='pandas', n_jobs=None, ordered=True):
     '''Read complex fixed-width formatted lines, which are fixed-width formatted
     files with different line types, each one possibly having different
     colspecs, names and dtypes. Returns a dict of line type -> pandas.DataFrame.
@@ -29,11 +56,40 @@ def read_cfwf(filepath_or_buffer, type_width, colspecs, names=None,
         If specified, break the file into chunks and returns a generator.
     nrows -- int, default None
         Limit the number of lines to be read.
+    engine -- {'pandas', 'numpy'}, default 'pandas'
+        'pandas' reads the lines with pandas.read_fwf and splits the fields
+        with the .str accessor. 'numpy' reads the raw bytes (memory-mapped for
+        uncompressed files), selects line types on the type prefix and cuts
+        the fields from a fixed-width byte matrix before decoding, which is
+        several times faster on large files. As positions are counted in
+        bytes, it requires a single-byte encoding (latin1 if not specified).
+    n_jobs -- int, default None
+        If greater than 1 (or -1 for all CPUs), chunks are parsed in that many
+        worker processes. Requires chunksize and the path of an uncompressed
+        file, which is split at line breaks into byte ranges of approximately
+        chunksize lines. At most 2 * n_jobs chunks are in flight at any time,
+        so memory stays bounded. nrows is not supported in this mode.
+    ordered -- bool, default True
+        Only used with n_jobs. If False, chunks are yielded as soon as they are
+        parsed instead of in the order they appear in the file.
     '''
 
+    if n_jobs is not None and n_jobs != 1:
+        return _read_cfwf_parallel(filepath_or_buffer, type_width, colspecs,
+                                   names, dtype, chunksize, nrows, compression,
+                                   encoding, engine, n_jobs, ordered)
+
+    if engine == 'numpy':
+        return _read_cfwf_numpy(filepath_or_buffer, type_width, colspecs,
+                                names, dtype, chunksize, nrows, compression,
+                                encoding)
+    elif engine != 'pandas':
+        raise ValueError("engine must be 'pandas' or 'numpy', "
+                         "got {!r}".format(engine))
+
     # Calculate line width as the maximum 
     # position number from the colspecs.
-    line_width = max([max(colspec)[1] for colspec in colspecs.values()])
+    line_width = _line_width(colspecs)
 
     # Read raw file as a two column dataframe, one column for the line type
     # and the other column for the line content (to be split later).
@@ -62,6 +118,10 @@ def read_cfwf(filepath_or_buffer, type_width, colspecs, names=None,
                                    dtype)
 
 
+def _line_width(colspecs):
+    return max([max(colspec)[1] for colspec in colspecs.values()])
+
+
 def _cfwf_chunck(df, type_width, colspecs, names=None, dtype=None):
 
     df.set_index('line_type', inplace=True)
@@ -82,19 +142,8 @@ def _cfwf_chunck(df, type_width, colspecs, names=None, dtype=None):
                             .str.strip())
 
             # Original content column not necessary anymore.
-            data_dict[ltype] = data.drop('_content', axis=1)
-
-            # Change column names according to parameter "names".
-            if names is not None:
-                data_dict[ltype].columns = names[ltype]
-
-            # If dtypes specified and only if specified 
-            # for this specific line type.
-            if (dtype is not None) & (ltype in dtype):
-                # Change column dtypes according to parameter "dtype"
-                for col_name, col_type in dtype[ltype].items():
-                    data_dict[ltype][col_name] = (data_dict[ltype][col_name]
-                                                    .astype(col_type))
+            data_dict[ltype] = _set_names_dtypes(data.drop('_content', axis=1),
+                                                 ltype, names, dtype)
 
         except KeyError:
             pass
@@ -105,3 +154,382 @@ def _cfwf_chunck_reader(reader, type_width, colspecs, names=None, dtype=None):
 
     for chunk in reader:
         yield _cfwf_chunck(chunk, type_width, colspecs, names, dtype)
+
+
+def _set_names_dtypes(data, ltype, names=None, dtype=None):
+
+    # Change column names according to parameter "names".
+    if names is not None:
+        data.columns = names[ltype]
+
+    # If dtypes specified and only if specified
+    # for this specific line type.
+    if (dtype is not None) and (ltype in dtype):
+        # Change column dtypes according to parameter "dtype"
+        for col_name, col_type in dtype[ltype].items():
+            data[col_name] = data[col_name].astype(col_type)
+
+    return data
+
+
+# --- NumPy engine ---
+
+def _read_cfwf_numpy(filepath_or_buffer, type_width, colspecs, names=None,
+                     dtype=None, chunksize=None, nrows=None,
+                     compression='infer', encoding=None):
+
+    encoding = encoding or 'latin1'
+    _check_single_byte(encoding)
+
+    raw = _read_raw_bytes(filepath_or_buffer, compression, encoding)
+    line_width = _line_width(colspecs)
+
+    if chunksize is None:
+        starts, ends = next(_iter_line_bounds(raw, None, nrows))
+        return _cfwf_bytes_chunck(raw, starts, ends, line_width, type_width,
+                                  colspecs, names, dtype, encoding)
+    else:
+        return _cfwf_bytes_chunck_reader(raw, chunksize, nrows, line_width,
+                                         type_width, colspecs, names, dtype,
+                                         encoding)
+
+
+def _check_single_byte(encoding):
+    codec = codecs.lookup(encoding)
+    if codec.name.startswith('utf') or len('a'.encode(codec.name)) != 1:
+        raise ValueError("engine='numpy' requires a single-byte encoding "
+                         "(such as latin1 or cp1252), got {!r}".format(encoding))
+
+
+def _read_raw_bytes(filepath_or_buffer, compression='infer', encoding='latin1'):
+    '''Return the whole content as an uint8 array. Uncompressed files are
+    memory-mapped, so no copy is made and pages are loaded on demand.'''
+
+    if hasattr(filepath_or_buffer, 'read'):
+        content = filepath_or_buffer.read()
+        if isinstance(content, str):
+            content = content.encode(encoding)
+        return np.frombuffer(content, dtype=np.uint8)
+
+    path = os.fspath(filepath_or_buffer)
+
+    if compression == 'infer':
+        extension = os.path.splitext(path)[1].lower()
+        compression = _COMPRESSION_BY_EXTENSION.get(extension)
+
+    if compression is None:
+        if os.path.getsize(path) == 0:
+            return np.empty(0, dtype=np.uint8)
+        with open(path, 'rb') as f:
+            # The array keeps a reference to the map, which remains
+            # valid after the file descriptor is closed.
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return np.frombuffer(buffer, dtype=np.uint8)
+
+    if compression == 'gzip':
+        import gzip
+        with gzip.open(path, 'rb') as f:
+            content = f.read()
+    elif compression == 'bz2':
+        import bz2
+        with bz2.open(path, 'rb') as f:
+            content = f.read()
+    elif compression == 'xz':
+        import lzma
+        with lzma.open(path, 'rb') as f:
+            content = f.read()
+    elif compression == 'zip':
+        import zipfile
+        with zipfile.ZipFile(path) as zf:
+            members = zf.namelist()
+            if len(members) != 1:
+                raise ValueError('Zip file must contain exactly one member, '
+                                 'found {}: {}'.format(len(members), path))
+            content = zf.read(members[0])
+    else:
+        raise ValueError('Unsupported compression: {!r}'.format(compression))
+
+    return np.frombuffer(content, dtype=np.uint8)
+
+
+def _iter_line_bounds(raw, chunksize=None, nrows=None):
+    '''Yield pairs of arrays (starts, ends) with the byte offsets of the
+    non blank lines, chunksize lines at a time (all lines if None). The line
+    break, including a trailing carriage return, is not part of the line.'''
+
+    size = len(raw)
+    limit = nrows if nrows is not None else np.inf
+    next_start = 0
+    read = 0
+    pending_starts, pending_ends = [], []
+    pending = 0
+
+    for block_start in range(0, max(size, 1), _SCAN_BLOCK_BYTES):
+        block_end = min(block_start + _SCAN_BLOCK_BYTES, size)
+        breaks = (np.flatnonzero(raw[block_start:block_end] == _NEWLINE)
+                  + block_start)
+
+        # Last line without a line break.
+        if block_end == size and size > next_start and raw[-1] != _NEWLINE:
+            breaks = np.append(breaks, size)
+
+        if len(breaks) == 0:
+            continue
+
+        starts = np.empty(len(breaks), dtype=np.int64)
+        starts[0] = next_start
+        starts[1:] = breaks[:-1] + 1
+        next_start = int(breaks[-1]) + 1
+
+        ends = breaks.astype(np.int64)
+        has_cr = ends > starts
+        has_cr[has_cr] = raw[ends[has_cr] - 1] == _CARRIAGE_RETURN
+        ends[has_cr] -= 1
+
+        # Blank lines are skipped, as pandas.read_fwf does.
+        not_blank = ends > starts
+        starts, ends = starts[not_blank], ends[not_blank]
+
+        if read + len(starts) > limit:
+            keep = int(limit - read)
+            starts, ends = starts[:keep], ends[:keep]
+        read += len(starts)
+
+        pending_starts.append(starts)
+        pending_ends.append(ends)
+        pending += len(starts)
+
+        while chunksize is not None and pending >= chunksize:
+            starts = np.concatenate(pending_starts)
+            ends = np.concatenate(pending_ends)
+            yield starts[:chunksize], ends[:chunksize]
+            pending_starts, pending_ends = [starts[chunksize:]], [ends[chunksize:]]
+            pending -= chunksize
+
+        if read >= limit:
+            break
+
+    if pending > 0 or chunksize is None:
+        yield (np.concatenate(pending_starts) if pending_starts
+               else np.empty(0, dtype=np.int64),
+               np.concatenate(pending_ends) if pending_ends
+               else np.empty(0, dtype=np.int64))
+
+
+def _byte_matrix(raw, starts, ends, width):
+    '''Return a (lines x width) uint8 matrix with the first width bytes of each
+    line, padded with spaces. If all lines are evenly spaced and at least
+    width bytes long (the usual case for fixed-width files), the matrix is a
+    strided view over raw and nothing is copied.'''
+
+    n_lines = len(starts)
+    lengths = ends - starts
+
+    if n_lines == 0:
+        return np.empty((0, width), dtype=np.uint8)
+
+    stride = int(starts[1] - starts[0]) if n_lines > 1 else width
+    if (lengths.min() >= width and stride >= width
+            and (n_lines == 1 or (np.diff(starts) == stride).all())):
+        return np.lib.stride_tricks.as_strided(raw[starts[0]:],
+                                               shape=(n_lines, width),
+                                               strides=(stride, 1),
+                                               writeable=False)
+
+    matrix = np.full((n_lines, width), _SPACE, dtype=np.uint8)
+    offsets = np.arange(width)
+    step = max(1, _GATHER_BLOCK_CELLS // width)
+    for first in range(0, n_lines, step):
+        block = slice(first, first + step)
+        valid = offsets < lengths[block, None]
+        positions = starts[block, None] + offsets
+        matrix[block][valid] = raw[positions[valid]]
+
+    return matrix
+
+
+def _decoding_table(encoding):
+    '''Code point of each of the 256 byte values in a single-byte encoding.'''
+
+    chars = bytes(range(256)).decode(encoding, errors='replace')
+    return np.array([ord(char) for char in chars], dtype=np.uint32)
+
+
+def _decode_field(field_bytes, table):
+    '''Convert a (lines x width) uint8 matrix into an array of stripped str.
+
+    Decoding is a table lookup from bytes to UCS-4 code points, which
+    are then viewed as a fixed size numpy unicode array.'''
+
+    n_lines, width = field_bytes.shape
+    if width == 0:
+        return np.full(n_lines, '', dtype=object)
+
+    code_points = table[field_bytes]
+    return np.char.strip(code_points.view('U{}'.format(width)).ravel())
+
+
+def _cfwf_bytes_chunck(raw, starts, ends, line_width, type_width, colspecs,
+                       names=None, dtype=None, encoding='latin1'):
+
+    matrix = _byte_matrix(raw, starts, ends, line_width)
+    table = _decoding_table(encoding)
+
+    # Line type of each line as fixed size bytes, compared
+    # against the encoded line types without decoding.
+    line_types = (np.ascontiguousarray(matrix[:, :type_width])
+                  .view('S{}'.format(type_width)).ravel())
+
+    data_dict = {}
+
+    # For each line type specified in colspecs.
+    for ltype, specs in colspecs.items():
+        selected = line_types == str(ltype).encode(encoding)
+        n_selected = int(selected.sum())
+        if n_selected == 0:
+            continue
+
+        # Cut each field only for the lines of this type.
+        data = pd.DataFrame({i: _decode_field(matrix[selected, column[0]:column[1]],
+                                              table)
+                             for i, column in enumerate(specs)},
+                            index=pd.Index([ltype] * n_selected,
+                                           name='line_type'))
+
+        data_dict[ltype] = _set_names_dtypes(data, ltype, names, dtype)
+
+    return data_dict
+
+
+def _cfwf_bytes_chunck_reader(raw, chunksize, nrows, line_width, type_width,
+                              colspecs, names=None, dtype=None,
+                              encoding='latin1'):
+
+    for starts, ends in _iter_line_bounds(raw, chunksize, nrows):
+        yield _cfwf_bytes_chunck(raw, starts, ends, line_width, type_width,
+                                 colspecs, names, dtype, encoding)
+
+
+# --- Parallel mode ---
+
+def _read_cfwf_parallel(filepath_or_buffer, type_width, colspecs, names=None,
+                        dtype=None, chunksize=None, nrows=None,
+                        compression='infer', encoding=None, engine='pandas',
+                        n_jobs=-1, ordered=True):
+
+    if engine not in ('pandas', 'numpy'):
+        raise ValueError("engine must be 'pandas' or 'numpy', "
+                         "got {!r}".format(engine))
+    if chunksize is None:
+        raise ValueError('chunksize is required when n_jobs is specified')
+    if nrows is not None:
+        raise ValueError('nrows is not supported when n_jobs is specified')
+    if hasattr(filepath_or_buffer, 'read'):
+        raise ValueError('n_jobs requires a file path, not a buffer')
+
+    path = os.fspath(filepath_or_buffer)
+    extension = os.path.splitext(path)[1].lower()
+    if compression is not None and (compression != 'infer'
+                                    or extension in _COMPRESSION_BY_EXTENSION):
+        raise ValueError('n_jobs requires an uncompressed file')
+
+    if engine == 'numpy':
+        encoding = encoding or 'latin1'
+        _check_single_byte(encoding)
+
+    if n_jobs < 0:
+        n_jobs = os.cpu_count() or 1
+
+    chunk_bytes = chunksize * _average_line_bytes(path)
+    ranges = _newline_aligned_ranges(path, chunk_bytes)
+    parse_args = (path, engine, type_width, colspecs, names, dtype, encoding)
+
+    return _parallel_chunck_reader(ranges, parse_args, n_jobs, ordered)
+
+
+def _average_line_bytes(path):
+
+    with open(path, 'rb') as f:
+        sample = f.read(_SAMPLE_BYTES)
+
+    return max(1, len(sample) // max(1, sample.count(b'\n')))
+
+
+def _newline_aligned_ranges(path, chunk_bytes):
+    '''Yield (start, end) byte offsets of consecutive ranges of about
+    chunk_bytes, each one ending just after a line break (or at EOF).'''
+
+    size = os.path.getsize(path)
+    if size == 0:
+        return
+
+    with open(path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    try:
+        start = 0
+        while start < size:
+            end = start + chunk_bytes
+            if end >= size:
+                end = size
+            else:
+                line_break = buffer.find(b'\n', end - 1)
+                end = size if line_break == -1 else line_break + 1
+            yield start, end
+            start = end
+    finally:
+        buffer.close()
+
+
+def _parse_byte_range(start, end, path, engine, type_width, colspecs,
+                      names=None, dtype=None, encoding=None):
+    '''Worker function: parse the lines between two byte offsets.'''
+
+    if engine == 'numpy':
+        raw = _read_raw_bytes(path, None)[start:end]
+        starts, ends = next(_iter_line_bounds(raw))
+        return _cfwf_bytes_chunck(raw, starts, ends, _line_width(colspecs),
+                                  type_width, colspecs, names, dtype, encoding)
+
+    with open(path, 'rb') as f:
+        f.seek(start)
+        content = f.read(end - start)
+
+    return read_cfwf(io.BytesIO(content), type_width, colspecs, names, dtype,
+                     compression=None, encoding=encoding)
+
+
+def _parallel_chunck_reader(ranges, parse_args, n_jobs, ordered=True):
+
+    max_in_flight = 2 * n_jobs
+    in_flight = deque()
+
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        try:
+            for start, end in ranges:
+                # Wait for a result before submitting more work when the
+                # limit of chunks in flight is reached (backpressure).
+                while len(in_flight) >= max_in_flight:
+                    yield _next_result(in_flight, ordered)
+
+                in_flight.append(executor.submit(_parse_byte_range,
+                                                 start, end, *parse_args))
+
+            while in_flight:
+                yield _next_result(in_flight, ordered)
+
+        finally:
+            # Generator closed before the end: drop pending work.
+            for future in in_flight:
+                future.cancel()
+
+
+def _next_result(in_flight, ordered):
+
+    if ordered:
+        return in_flight.popleft().result()
+
+    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+    future = done.pop()
+    in_flight.remove(future)
+    return future.result()
@@ -6,9 +6,20 @@ import datetime
 import sqlite3
 import pandas as pd
 
+from zip_stream import abre_membro, DecompressionStats
+from metricas import Metricas, le_chunks
+import grupos
+import centralidade
+import beneficiarios
+import compartilhados
+
 # --- CONFIGURACOES GERAIS ---
 
 NOME_ARQUIVO_SQLITE = 'CNPJ_full.db'
+# Com --versionado: cada carga grava CNPJ_full_<data_hora>.db e, ao final, o nome
+# dele no arquivo de ponteiro, lido pela API para trocar de banco sem parar.
+NOME_PONTEIRO = 'CNPJ_full.atual'
+VERSOES_MANTIDAS = 2 # a atual e a anterior (que a API pode ainda estar usando)
 CHUNKSIZE = 250000
 ENCODING = 'latin1' # Encoding comumente usado em dados governamentais brasileiros
 
@@ -28,6 +39,9 @@ ESTABELECIMENTOS_COLS = ['cnpj_basico', 'cnpj_ordem', 'cnpj_dv', 'identificador_
 SOCIOS_COLS = ['cnpj_basico', 'identificador_socio', 'nome_socio_razao_social', 'cnpj_cpf_socio', 'qualificacao_socio', 'data_entrada_sociedade', 'pais', 'representante_legal', 'nome_representante', 'qualificacao_representante_legal', 'faixa_etaria']
 SIMPLES_COLS = ['cnpj_basico', 'opcao_pelo_simples', 'data_opcao_simples', 'data_exclusao_simples', 'opcao_pelo_mei', 'data_opcao_mei', 'data_exclusao_mei']
 
+# Tempo, linhas e bytes de cada etapa da carga (ver metricas.py)
+METRICAS = Metricas(rotulos={'script': 'cnpj.py'})
+
 # Dtypes para colunas específicas
 EMPRESAS_DTYPES = {'capital_social': 'float64'}
 # Todos os outros serão lidos como string para evitar erros de tipo em dados sujos.
@@ -68,27 +82,31 @@ def handle_cnaes(chunk, db_connection, if_exists_mode):
     Extrai, normaliza e salva os CNAEs secundários de um chunk de estabelecimentos.
     Retorna o número de registros de CNAE salvos.
     """
-    cnaes_sec = chunk[['cnpj_basico', 'cnpj_ordem', 'cnpj_dv', 'cnae_fiscal_secundaria']].copy()
-    cnaes_sec.dropna(subset=['cnae_fiscal_secundaria'], inplace=True)
+    with METRICAS.etapa('cnaes', CNAES_SECUNDARIOS) as span:
+        span.linhas = len(chunk)
+        cnaes_sec = chunk[['cnpj_basico', 'cnpj_ordem', 'cnpj_dv', 'cnae_fiscal_secundaria']].copy()
+        cnaes_sec.dropna(subset=['cnae_fiscal_secundaria'], inplace=True)
 
-    if cnaes_sec.empty:
-        return 0
+        if cnaes_sec.empty:
+            return 0
 
-    # Monta o CNPJ completo
-    cnaes_sec['cnpj'] = cnaes_sec['cnpj_basico'].astype(str) + cnaes_sec['cnpj_ordem'].astype(str) + cnaes_sec['cnpj_dv'].astype(str)
-    
-    # Separa os CNAEs que vêm em formato de string separada por vírgula
-    cnaes_sec = cnaes_sec.assign(cnae=cnaes_sec['cnae_fiscal_secundaria'].str.split(',')).explode('cnae')
-    
-    # Limpa e seleciona as colunas finais
-    cnaes_df = cnaes_sec[['cnpj', 'cnae']].copy()
-    cnaes_df['cnae'] = cnaes_df['cnae'].str.strip()
-    cnaes_df.dropna(subset=['cnae'], inplace=True)
-    cnaes_df = cnaes_df[cnaes_df['cnae'] != '']
+        # Monta o CNPJ completo
+        cnaes_sec['cnpj'] = cnaes_sec['cnpj_basico'].astype(str) + cnaes_sec['cnpj_ordem'].astype(str) + cnaes_sec['cnpj_dv'].astype(str)
+
+        # Separa os CNAEs que vêm em formato de string separada por vírgula
+        cnaes_sec = cnaes_sec.assign(cnae=cnaes_sec['cnae_fiscal_secundaria'].str.split(',')).explode('cnae')
+
+        # Limpa e seleciona as colunas finais
+        cnaes_df = cnaes_sec[['cnpj', 'cnae']].copy()
+        cnaes_df['cnae'] = cnaes_df['cnae'].str.strip()
+        cnaes_df.dropna(subset=['cnae'], inplace=True)
+        cnaes_df = cnaes_df[cnaes_df['cnae'] != '']
 
     if not cnaes_df.empty:
         num_records = len(cnaes_df)
-        cnaes_df.to_sql(CNAES_SECUNDARIOS, db_connection, if_exists=if_exists_mode, index=False)
+        with METRICAS.etapa('escrita', CNAES_SECUNDARIOS) as span:
+            cnaes_df.to_sql(CNAES_SECUNDARIOS, db_connection, if_exists=if_exists_mode, index=False)
+            span.linhas = num_records
         return num_records
     
     return 0
@@ -114,43 +132,52 @@ def process_zip_files(files, config, db_connection, output_type):
     for filepath in files:
         print(f'  Lendo arquivo: {os.path.basename(filepath)}')
         records_in_file = 0
+        stats = DecompressionStats()
         try:
-            reader = pd.read_csv(
-                filepath,
-                sep=';',
-                header=None,
-                names=columns,
-                dtype=str,
-                encoding=ENCODING,
-                chunksize=CHUNKSIZE,
-                compression='zip'
-            )
-
-            for i, chunk in enumerate(reader):
-                chunk_rows = len(chunk)
-                records_in_file += chunk_rows
-                total_records_table += chunk_rows
+            # Lê os bytes do membro do ZIP em streaming (ver zip_stream.py);
+            # a decodificação latin1 fica a cargo do parser do pandas.
+            with abre_membro(filepath, stats) as stream:
+                reader = pd.read_csv(
+                    stream,
+                    sep=';',
+                    header=None,
+                    names=columns,
+                    dtype=str,
+                    encoding=ENCODING,
+                    chunksize=CHUNKSIZE
+                )
+
+                for i, chunk in enumerate(le_chunks(reader, METRICAS, table_name, stats)):
+                    chunk_rows = len(chunk)
+                    records_in_file += chunk_rows
+                    total_records_table += chunk_rows
                 
-                print(f'    Registros lidos do arquivo: {records_in_file:,} | Total na tabela: {total_records_table:,}', end='\r')
-
-                # Aplica o handler especial se houver um
-                if handler_func_name:
-                    records_written_handler = globals()[handler_func_name](chunk, db_connection, cnaes_if_exists_mode)
-                    total_records_handler += records_written_handler
-                    cnaes_if_exists_mode = 'append'
-
-                # Converte os tipos de dados
-                for col, dtype in dtypes.items():
-                    if col in chunk.columns:
-                        chunk[col] = pd.to_numeric(chunk[col].str.replace(',', '.'), errors='coerce').astype(dtype)
-
-                # Salva no banco de dados
-                if output_type == 'sqlite':
-                    chunk.to_sql(table_name, db_connection, if_exists=if_exists_mode, index=False)
+                    print(f'    Registros lidos do arquivo: {records_in_file:,} | Total na tabela: {total_records_table:,}', end='\r')
+
+                    # Aplica o handler especial se houver um
+                    if handler_func_name:
+                        records_written_handler = globals()[handler_func_name](chunk, db_connection, cnaes_if_exists_mode)
+                        total_records_handler += records_written_handler
+                        cnaes_if_exists_mode = 'append'
+
+                    # Converte os tipos de dados
+                    if dtypes:
+                        with METRICAS.etapa('conversao_tipos', table_name) as span:
+                            span.linhas = chunk_rows
+                            for col, dtype in dtypes.items():
+                                if col in chunk.columns:
+                                    chunk[col] = pd.to_numeric(chunk[col].str.replace(',', '.'), errors='coerce').astype(dtype)
+
+                    # Salva no banco de dados
+                    if output_type == 'sqlite':
+                        with METRICAS.etapa('escrita', table_name) as span:
+                            chunk.to_sql(table_name, db_connection, if_exists=if_exists_mode, index=False)
+                            span.linhas = chunk_rows
                 
-                if_exists_mode = 'append'
+                    if_exists_mode = 'append'
             
             print(f'    Arquivo {os.path.basename(filepath)} concluído. {records_in_file:,} registros processados.{" " * 20}')
+            print(f'    Descompressão: {stats.resumo()}')
 
         except Exception as e:
             print(f'\nERRO ao processar o arquivo {filepath}: {e}')
@@ -161,7 +188,7 @@ def process_zip_files(files, config, db_connection, output_type):
         print(f'  -> Total de registros de CNAE secundário gravados: {total_records_handler:,}')
     print('')
 
-def cnpj_index(output_path):
+def cnpj_index(output_path, nome_arquivo=NOME_ARQUIVO_SQLITE):
     """Cria índices no banco de dados para otimizar as consultas."""
     # (Esta função foi corrigida na interação anterior para ser mais robusta)
     
@@ -169,13 +196,17 @@ def cnpj_index(output_path):
     INDICES = [
         ('empresas_cnpj_basico', EMPRESAS, 'cnpj_basico'),
         ('estabelecimentos_cnpj', ESTABELECIMENTOS, 'cnpj_basico, cnpj_ordem, cnpj_dv'),
-        ('socios_cnpj_basico', SOCIOS, 'cnpj_basico'),
-        ('socios_cpf_cnpj', SOCIOS, 'cnpj_cpf_socio'),
+        # Cobre a busca da matriz (com o filtro de situação cadastral) na montagem da rede
+        ('estabelecimentos_matriz', ESTABELECIMENTOS,
+         'cnpj_basico, identificador_matriz_filial, situacao_cadastral, cnpj_ordem, cnpj_dv'),
+        # Com a qualificação, os sócios fora do filtro da rede são descartados no próprio índice
+        ('socios_cnpj_basico', SOCIOS, 'cnpj_basico, qualificacao_socio'),
+        ('socios_cpf_cnpj', SOCIOS, 'cnpj_cpf_socio, qualificacao_socio'),
         ('cnaes_cnpj', CNAES_SECUNDARIOS, 'cnpj')
     ]
     PREFIXO_INDICE = 'ix_'
 
-    conBD = sqlite3.connect(os.path.join(output_path, NOME_ARQUIVO_SQLITE))
+    conBD = sqlite3.connect(os.path.join(output_path, nome_arquivo))
     print(u'Criando índices...\nEssa operacao pode levar vários minutos.')
     cursorBD = conBD.cursor()
 
@@ -190,7 +221,8 @@ def cnpj_index(output_path):
         if nome_tabela in tables:
             try:
                 sql_stmt = f'CREATE INDEX IF NOT EXISTS {nome_indice} ON {nome_tabela} ({coluna});'
-                cursorBD.execute(sql_stmt)
+                with METRICAS.etapa('indice', nome_tabela):
+                    cursorBD.execute(sql_stmt)
                 print(f'  Índice {nome_indice} criado na tabela {nome_tabela}.')
             except Exception as e:
                 print(f'  ERRO ao criar índice {nome_indice} na tabela {nome_tabela}: {e}')
@@ -200,9 +232,40 @@ def cnpj_index(output_path):
     print(u'Criação de índices concluída.')
     conBD.close()
 
+def nome_versionado():
+    """Nome do arquivo de uma carga com --versionado: CNPJ_full_<AAAAMMDD_HHMMSS>.db."""
+    base, extensao = os.path.splitext(NOME_ARQUIVO_SQLITE)
+    return f'{base}_{datetime.datetime.now():%Y%m%d_%H%M%S}{extensao}'
+
+def atualiza_ponteiro(output_path, nome_arquivo):
+    """
+    Grava o nome do banco novo no arquivo de ponteiro de uma vez (arquivo temporário
+    renomeado por cima do anterior): quem o lê nunca vê um nome pela metade.
+    """
+    ponteiro = os.path.join(output_path, NOME_PONTEIRO)
+    temporario = ponteiro + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        f.write(nome_arquivo + '\n')
+    os.replace(temporario, ponteiro)
+    print(f'Ponteiro {ponteiro} aponta para {nome_arquivo}')
+
+def remove_versoes_antigas(output_path, manter=VERSOES_MANTIDAS):
+    """Remove as cargas versionadas mais antigas, mantendo as `manter` mais recentes."""
+    base, extensao = os.path.splitext(NOME_ARQUIVO_SQLITE)
+    versoes = sorted(glob.glob(os.path.join(output_path, f'{base}_*{extensao}')))
+    for arquivo in versoes[:-manter]:
+        try:
+            os.remove(arquivo)
+            print(f'Carga antiga removida: {arquivo}')
+        except OSError as e:
+            # No Windows, um arquivo ainda aberto (pela API, por exemplo) não pode ser removido
+            print(f'  Aviso: não foi possível remover {arquivo}: {e}')
+
 def help():
     print('''
-Uso: python cnpj.py [<path_input> <output:sqlite> <path_output>] [--noindex]
+Uso: python cnpj.py [<path_input> <output:sqlite> <path_output>] [--noindex] [--nogrupos]
+                    [--nocentralidade] [--nobeneficiarios] [--nocompartilhados]
+                    [--versionado] [--relatorio=<arquivo.json>] [--prometheus=<arquivo.prom>]
 
 O script processa arquivos .zip (Empresas*.zip, Socios*.zip, etc.) 
 encontrados no diretório de entrada, assumindo que eles contêm arquivos CSV
@@ -218,6 +281,25 @@ Argumentos:
   <output:sqlite>: Formato de saída. Atualmente, apenas 'sqlite' é suportado.
   <path_output>  : Diretório onde o banco de dados SQLite será salvo.
   [--noindex]    : Opcional. Não gera índices no banco de dados ao final.
+  [--nogrupos]   : Opcional. Não calcula os grupos econômicos (componentes
+                   conexos da rede de sócios, ver grupos.py) ao final.
+  [--nocentralidade] : Opcional. Não calcula grau, PageRank e k-core da rede
+                   de sócios (ver centralidade.py) ao final.
+  [--nobeneficiarios] : Opcional. Não calcula os beneficiários finais das
+                   cadeias de sócios PJ (ver beneficiarios.py) ao final.
+  [--nocompartilhados] : Opcional. Não indexa os endereços, telefones e e-mails
+                   compartilhados entre empresas (ver compartilhados.py) ao final.
+  [--versionado] : Opcional. Não apaga o banco atual: grava a carga em
+                   CNPJ_full_<data_hora>.db e, só ao final (com índices e
+                   cálculos prontos), o nome dele em CNPJ_full.atual. A API
+                   configurada com DATABASE_POINTER_FILE passa a usá-lo sem
+                   parar. Mantém as 2 cargas mais recentes.
+  [--relatorio=<arquivo.json>]  : Opcional. Grava o tempo, as linhas e os bytes
+                   de cada etapa (descompressão, leitura do CSV, conversão de
+                   tipos, CNAEs, escrita, índices, grupos, centralidade,
+                   beneficiários e compartilhados) por tabela em JSON.
+  [--prometheus=<arquivo.prom>] : Opcional. Grava as mesmas métricas no formato
+                   texto do Prometheus (textfile collector do node_exporter).
 
 Exemplo de uso com argumentos:
   python cnpj.py "dados_rfb" sqlite "output"
@@ -228,24 +310,33 @@ Exemplo de uso com valores padrão:
 
 def main():
     # --- Leitura dos Argumentos ---
-    if len(sys.argv) == 1:
+    argumentos = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    opcoes = dict(arg[2:].split('=', 1) for arg in sys.argv[1:] if arg.startswith('--') and '=' in arg)
+
+    if not argumentos:
         # Nenhum argumento fornecido, usar defaults
         input_path = os.path.join('tools', 'downloads_cnpj')
         tipo_output = 'sqlite'
         output_path = 'output'
-        gera_index = True
+        gera_index = '--noindex' not in sys.argv
+        gera_grupos = '--nogrupos' not in sys.argv
+        gera_centralidade = '--nocentralidade' not in sys.argv
+        gera_beneficiarios = '--nobeneficiarios' not in sys.argv
+        gera_compartilhados = '--nocompartilhados' not in sys.argv
         print("Nenhum argumento fornecido. Usando valores padrão:")
         print(f"  - Diretório de entrada: {input_path}")
         print(f"  - Tipo de saída: {tipo_output}")
         print(f"  - Diretório de saída: {output_path}\n")
-    elif len(sys.argv) < 4:
+    elif len(argumentos) < 3:
         help()
         sys.exit(-1)
     else:
-        input_path = sys.argv[1]
-        tipo_output = sys.argv[2]
-        output_path = sys.argv[3]
+        input_path, tipo_output, output_path = argumentos[:3]
         gera_index = '--noindex' not in sys.argv
+        gera_grupos = '--nogrupos' not in sys.argv
+        gera_centralidade = '--nocentralidade' not in sys.argv
+        gera_beneficiarios = '--nobeneficiarios' not in sys.argv
+        gera_compartilhados = '--nocompartilhados' not in sys.argv
 
     if tipo_output != 'sqlite':
         print("ERRO: Apenas o tipo de output 'sqlite' é suportado nesta versão.")
@@ -263,8 +354,11 @@ def main():
     if not os.path.exists(output_path):
         os.makedirs(output_path)
 
-    db_path = os.path.join(output_path, NOME_ARQUIVO_SQLITE)
+    versionado = '--versionado' in sys.argv
+    nome_arquivo = nome_versionado() if versionado else NOME_ARQUIVO_SQLITE
+    db_path = os.path.join(output_path, nome_arquivo)
     # Remove o banco de dados antigo para garantir uma carga limpa
+    # (com --versionado, o arquivo é novo e o banco em uso não é tocado)
     if os.path.exists(db_path):
         os.remove(db_path)
         print(f'Banco de dados antigo removido: {db_path}')
@@ -291,7 +385,37 @@ def main():
     print('Processamento de dados concluído.')
 
     if gera_index and tipo_output == 'sqlite':
-        cnpj_index(output_path)
+        cnpj_index(output_path, nome_arquivo)
+
+    if (gera_grupos or gera_centralidade or gera_beneficiarios or gera_compartilhados) and tipo_output == 'sqlite':
+        conBD = sqlite3.connect(db_path)
+        try:
+            if gera_grupos:
+                with METRICAS.etapa('grupos', SOCIOS) as span:
+                    span.linhas = grupos.calcula_grupos(conBD)
+            if gera_centralidade:
+                with METRICAS.etapa('centralidade', SOCIOS) as span:
+                    span.linhas = centralidade.calcula_centralidade(conBD)
+            if gera_beneficiarios:
+                with METRICAS.etapa('beneficiarios', SOCIOS) as span:
+                    span.linhas = beneficiarios.calcula_beneficiarios(conBD)
+            if gera_compartilhados:
+                with METRICAS.etapa('compartilhados', ESTABELECIMENTOS) as span:
+                    span.linhas = compartilhados.calcula_compartilhados(conBD)
+        finally:
+            conBD.close()
+
+    if versionado:
+        atualiza_ponteiro(output_path, nome_arquivo)
+        remove_versoes_antigas(output_path)
+
+    METRICAS.imprime()
+    if 'relatorio' in opcoes:
+        METRICAS.grava_json(opcoes['relatorio'])
+        print(f'Relatório de métricas gravado em {opcoes["relatorio"]}')
+    if 'prometheus' in opcoes:
+        METRICAS.grava_prometheus(opcoes['prometheus'])
+        print(f'Métricas no formato do Prometheus gravadas em {opcoes["prometheus"]}')
         
     print(f'Processamento concluído em {datetime.datetime.now()}')
 
@@ -0,0 +1,193 @@
+# -*- encoding: utf-8 -*-
+"""
+Atributos compartilhados: empresas com o mesmo endereço, telefone ou e-mail nos
+estabelecimentos, calculados uma vez após a carga. Com eles, a RedeCNPJ pode
+ligar empresas que não têm sócios em comum (arestas mesmo_endereco,
+mesmo_telefone e mesmo_email) com consultas indexadas.
+
+- Os campos são normalizados (maiúsculas, sem acentos nem pontuação; só os
+  dígitos do CEP, do número e dos telefones; e-mail em minúsculas) e viram
+  chaves inteiras por um hash de 64 bits:
+  endereco = CEP + logradouro + número (sem o tipo do logradouro nem o
+  complemento; endereços sem número são ignorados), telefone = DDD + número
+  (telefone_1 e telefone_2), email.
+- Só são gravadas as chaves de 2 a MAX_EMPRESAS_POR_CHAVE empresas (cnpj_basico):
+  endereços, telefones e e-mails de escritórios de contabilidade e outros
+  genéricos ligariam centenas de empresas sem relação entre si.
+
+Tabela gravada: compartilhados (tipo, chave, cnpj_basico).
+
+Uso (após a carga do cnpj.py, que já chama calcula_compartilhados ao final):
+    python compartilhados.py output/CNPJ_full.db
+"""
+import sys
+import time
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+TABELA_COMPARTILHADOS = 'compartilhados'
+
+TIPOS = ('endereco', 'telefone', 'email')
+
+# Chaves de mais empresas que isso são consideradas genéricas e não são gravadas.
+MAX_EMPRESAS_POR_CHAVE = 20
+
+# Linhas de estabelecimentos lidas por vez.
+CHUNKSIZE = 1000000
+
+# Colunas lidas de estabelecimentos para cada tipo (só as linhas com o campo preenchido).
+_CNPJ_VALIDO = "length(cnpj_basico) = 8 AND cnpj_basico NOT GLOB '*[^0-9]*'"
+_SQL_TIPOS = {
+    'endereco': f"SELECT cnpj_basico, cep, logradouro, numero FROM estabelecimentos "
+                f"WHERE logradouro <> '' AND numero <> '' AND {_CNPJ_VALIDO}",
+    'telefone': f"SELECT cnpj_basico, ddd_1, telefone_1, ddd_2, telefone_2 FROM estabelecimentos "
+                f"WHERE (telefone_1 <> '' OR telefone_2 <> '') AND {_CNPJ_VALIDO}",
+    'email': f"SELECT cnpj_basico, email FROM estabelecimentos WHERE email <> '' AND {_CNPJ_VALIDO}",
+}
+
+_SEM_ACENTO = str.maketrans('ÁÀÂÃÄÉÈÊËÍÌÎÏÓÒÔÕÖÚÙÛÜÇÑ', 'AAAAAEEEEIIIIOOOOOUUUUCN')
+
+
+def _texto(serie):
+    """Maiúsculas, sem acentos, só letras e dígitos separados por um espaço."""
+    return serie.str.upper().str.translate(_SEM_ACENTO).str.replace(r'[^A-Z0-9]+', ' ', regex=True).str.strip()
+
+
+def _digitos(serie):
+    """Só os dígitos, sem zeros à esquerda (a expressão regular só roda nos valores com outros caracteres)."""
+    sujos = ~serie.str.isdigit()
+    if sujos.any():
+        serie = serie.mask(sujos, serie[sujos].str.replace(r'\D', '', regex=True))
+    return serie.str.lstrip('0')
+
+
+def _por_valor(funcao, serie):
+    """Aplica a normalização só aos valores distintos da coluna (CEPs, logradouros e DDDs se repetem muito)."""
+    codigos, valores = pd.factorize(serie.fillna(''))
+    return pd.Series(funcao(pd.Series(valores, dtype=object)).to_numpy()[codigos], index=serie.index)
+
+
+def _repetido(numero):
+    """Números (só dígitos, sem zeros à esquerda) de um só dígito repetido: múltiplos de 11...1 do mesmo tamanho."""
+    tamanho = numero.str.len().to_numpy()
+    repetido = np.zeros(len(numero), dtype=bool)
+    candidatos = (tamanho > 0) & (tamanho <= 18)
+    valor = numero[candidatos].astype(np.int64).to_numpy()
+    repunit = (10 ** tamanho[candidatos].astype(np.int64) - 1) // 9
+    repetido[candidatos] = valor % repunit == 0
+    return repetido
+
+
+def _chaves(tipo, df):
+    """(cnpj_basico, campos da chave já normalizados) das linhas do chunk com o campo válido."""
+    if tipo == 'endereco':
+        campos = pd.DataFrame({'cep': _por_valor(lambda s: _digitos(s).str.zfill(8), df['cep']),
+                               'logradouro': _por_valor(_texto, df['logradouro']),
+                               'numero': _por_valor(_digitos, df['numero'])})
+        validas = (campos['cep'].str.len() == 8) & (campos['logradouro'] != '') & (campos['numero'] != '')
+        return df['cnpj_basico'][validas], campos[validas]
+    if tipo == 'telefone':
+        cnpjs, chaves = [], []
+        for ddd, telefone in (('ddd_1', 'telefone_1'), ('ddd_2', 'telefone_2')):
+            # Os números quase não se repetem: normalizá-los por valor não compensa
+            campos = pd.DataFrame({'ddd': _por_valor(_digitos, df[ddd]), 'numero': _digitos(df[telefone].fillna(''))})
+            # Números curtos ou de um só dígito repetido (00000000, 99999999) não identificam ninguém
+            validas = (campos['numero'].str.len() >= 8) & ~_repetido(campos['numero'])
+            cnpjs.append(df['cnpj_basico'][validas])
+            chaves.append(campos[validas])
+        return pd.concat(cnpjs), pd.concat(chaves)
+    email = df['email'].fillna('').str.strip().str.lower()
+    validas = email.str.fullmatch(r'[^@\s]+@[^@\s]+\.[^@\s]+')
+    return df['cnpj_basico'][validas], email[validas]
+
+
+def _pares(conBD, tipo, chunksize):
+    """(chave, cnpj_basico) distintos do tipo, como inteiros, ordenados pela chave."""
+    chaves, cnpjs = [], []
+    for df in pd.read_sql_query(_SQL_TIPOS[tipo], conBD, chunksize=chunksize):
+        cnpj, chave = _chaves(tipo, df)
+        chaves.append(pd.util.hash_pandas_object(chave, index=False).to_numpy().view(np.int64))
+        cnpjs.append(cnpj.to_numpy().astype(np.int64))
+    if not chaves:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    chave, cnpj = np.concatenate(chaves), np.concatenate(cnpjs)
+    del chaves, cnpjs
+    ordem = np.lexsort((cnpj, chave))
+    chave, cnpj = chave[ordem], cnpj[ordem]
+    distintos = np.ones(len(chave), dtype=bool)
+    distintos[1:] = (chave[1:] != chave[:-1]) | (cnpj[1:] != cnpj[:-1])
+    return chave[distintos], cnpj[distintos]
+
+
+def calcula_compartilhados(conBD, max_empresas=MAX_EMPRESAS_POR_CHAVE, chunksize=CHUNKSIZE):
+    """
+    Normaliza endereços, telefones e e-mails dos estabelecimentos e grava a tabela
+    compartilhados (substituindo a anterior) com as chaves de 2 a max_empresas
+    empresas, com os índices das consultas. Devolve o número de linhas gravadas.
+    """
+    inicio = time.perf_counter()
+    print('Indexando endereços, telefones e e-mails compartilhados...')
+    conBD.execute(f'DROP TABLE IF EXISTS {TABELA_COMPARTILHADOS}')
+    conBD.execute(f'CREATE TABLE {TABELA_COMPARTILHADOS} (tipo TEXT, chave INTEGER, cnpj_basico TEXT)')
+    total = 0
+    for tipo in TIPOS:
+        chave, cnpj = _pares(conBD, tipo, chunksize)
+        unicas, indice, contagem = np.unique(chave, return_inverse=True, return_counts=True)
+        por_linha = contagem[indice]
+        gravar = (por_linha >= 2) & (por_linha <= max_empresas)
+        conBD.executemany(f'INSERT INTO {TABELA_COMPARTILHADOS} VALUES (?, ?, ?)',
+                          ((tipo, k, f'{c:08d}') for k, c in zip(chave[gravar].tolist(), cnpj[gravar].tolist())))
+        total += int(gravar.sum())
+        print(f'  {tipo}: {int((contagem >= 2).sum() - (contagem > max_empresas).sum()):,} chaves compartilhadas, '
+              f'{int((contagem > max_empresas).sum()):,} genéricas ignoradas (mais de {max_empresas} empresas)')
+    conBD.execute(f'CREATE INDEX ix_compartilhados_cnpj ON {TABELA_COMPARTILHADOS} (cnpj_basico, tipo, chave)')
+    conBD.execute(f'CREATE INDEX ix_compartilhados_chave ON {TABELA_COMPARTILHADOS} (tipo, chave, cnpj_basico)')
+    conBD.commit()
+    print(f'Atributos compartilhados gravados ({total:,} linhas) em {time.perf_counter() - inicio:.1f}s.')
+    return total
+
+
+# --- Consultas ---
+
+def existe(conBD):
+    """Se os atributos compartilhados já foram calculados neste banco."""
+    return conBD.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                         (TABELA_COMPARTILHADOS,)).fetchone() is not None
+
+
+def sql_vizinhos(tipos, situacoes=None):
+    """
+    Consulta (com os parâmetros: cnpj_basico, os tipos e as situações) das empresas que
+    compartilham algum dos tipos com a empresa, com o CNPJ da matriz: tipo, cnpj_basico,
+    cnpj_ordem, cnpj_dv. Com situacoes, só as matrizes nessas situações cadastrais.
+    """
+    filtro_situacao = f" AND e.situacao_cadastral IN ({', '.join('?' * len(situacoes))})" if situacoes else ''
+    return (f"SELECT a.tipo, e.cnpj_basico, e.cnpj_ordem, e.cnpj_dv FROM {TABELA_COMPARTILHADOS} a "
+            f"JOIN {TABELA_COMPARTILHADOS} b ON b.tipo = a.tipo AND b.chave = a.chave AND b.cnpj_basico <> a.cnpj_basico "
+            f"JOIN estabelecimentos e ON e.cnpj_basico = b.cnpj_basico AND e.identificador_matriz_filial = '1' "
+            f"WHERE a.cnpj_basico = ? AND a.tipo IN ({', '.join('?' * len(tipos))}){filtro_situacao} "
+            f"ORDER BY e.cnpj_basico, a.tipo")
+
+
+def vizinhos(conBD, cnpj, tipos=TIPOS, situacoes=None):
+    """Empresas (CNPJ da matriz) que compartilham endereço, telefone ou e-mail com a empresa: DataFrame (tipo, cnpj)."""
+    df = pd.read_sql_query(sql_vizinhos(tipos, situacoes), conBD, params=[cnpj[:8], *tipos, *(situacoes or ())])
+    df['cnpj'] = df['cnpj_basico'] + df['cnpj_ordem'] + df['cnpj_dv']
+    return df[['tipo', 'cnpj']]
+
+
+def main():
+    if len(sys.argv) != 2:
+        print('Uso: python compartilhados.py <arquivo .db>')
+        sys.exit(-1)
+    conBD = sqlite3.connect(sys.argv[1])
+    try:
+        calcula_compartilhados(conBD)
+    finally:
+        conBD.close()
+
+
+if __name__ == '__main__':
+    main()
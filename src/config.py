@@ -1,6 +1,27 @@
 ﻿PATH_BD = 'data/CNPJ_full.db'
 NIVEL_MAX_DEFAULT = 3
 
+# Limites da expansão da rede (None = sem limite). Ao atingir um deles a consulta
+# para e os arquivos de saída são gerados com a rede parcial.
+MAX_NOS = None
+MAX_ARESTAS = None
+MAX_CONSULTAS_SQL = None
+TEMPO_MAX_CONSULTA = None  # segundos
+# Empresas/pessoas com mais vínculos que isso entram na rede, mas não são expandidas
+GRAU_MAX_HUB = None
+# Liga também empresas com o mesmo endereço, telefone ou e-mail (requer compartilhados.py).
+# Ex: ['endereco', 'telefone', 'email']; [] = só vínculos societários
+VINCULOS_COMPARTILHADOS = []
+
+# URL da API (ex: 'http://127.0.0.1:8000/api/v1') para o --viz incremental: o grafo.html
+# traz só os nós iniciais e busca os vizinhos na API a cada clique. None = rede inteira no HTML.
+URL_API_VIZ = None
+# Vínculos carregados por clique no --viz incremental
+TAMANHO_PAGINA_VIZ = 50
+# Calcula o layout da rede no --viz (layout.py) em vez de simular as forças no
+# navegador, que não estabiliza em redes grandes
+LAYOUT_VIZ = True
+
 PATH_NAVEGADOR = ''
 #PATH_NAVEGADOR = 'C:/Program Files (x86)/Google/Chrome/Application/chrome.exe'
 
@@ -84,4 +105,9 @@ QUALIFICACOES = {
     '73':'Presidente Residente ou Domiciliado no Exterior', 
     '74':'Sócio-Administrador Residente ou Domiciliado no Exterior', 
     '75':'Fundador Residente ou Domiciliado no Exterior'
-}
\ No newline at end of file
+}
+
+# Situações cadastrais das empresas seguidas na montagem da rede (a origem da consulta entra sempre):
+# '01' Nula, '02' Ativa, '03' Suspensa, '04' Inapta, '08' Baixada
+#SITUACOES_CADASTRAIS = {'02': 'Ativa'}
+SITUACOES_CADASTRAIS = 'TODAS'
@@ -1,25 +1,49 @@
 import os
 import sys
-import json
 import subprocess
 import argparse
-
-import pandas as pd
 import sqlite3
-import networkx as nx
 
 import config
-from rede_cnpj import RedeCNPJ
+
+# pandas, numpy e os módulos que dependem deles (rede_cnpj, grupos, centralidade,
+# beneficiarios) só são importados nas funções que os usam: --help e os erros de
+# argumento respondem sem pagar essa importação (ver benchmarks/bench_importacao.py).
 
 def consulta(tipo_consulta, objeto_consulta, qualificacoes, path_BD, nivel_max, path_output, 
              csv=False, colunas_csv=None, csv_sep=',', graphml=False, gexf=False, viz=False, 
-             path_conexoes=None):
+             path_conexoes=None, limites=None, url_api_viz=None, compartilhados=None, situacoes='TODAS'):
+
+    import pandas as pd
+    from rede_cnpj import RedeCNPJ
 
     try:
         conBD = sqlite3.connect(path_BD)
 
         try:
-            rede = RedeCNPJ(conBD, nivel_max=nivel_max, qualificacoes=qualificacoes)
+            if tipo_consulta in ('grupo', 'mesmo_grupo'):
+                # Consultas na tabela de grupos econômicos, sem montar a rede
+                consulta_grupos(conBD, tipo_consulta, objeto_consulta, path_output, csv_sep)
+                return
+            if tipo_consulta == 'beneficiarios':
+                consulta_beneficiarios(conBD, objeto_consulta, path_output, csv_sep)
+                return
+            if tipo_consulta == 'estimativa':
+                consulta_estimativa(conBD, objeto_consulta, nivel_max)
+                return
+
+            colunas_nos = None
+            if csv and not (graphml or gexf or viz):
+                # Só o pessoas.csv usa os dados dos estabelecimentos: a rede lê apenas as colunas dele
+                existentes = pd.read_sql_query('SELECT * FROM estabelecimentos LIMIT 0', conBD).columns
+                colunas_nos = [c for c in colunas_csv if c in existentes]
+
+            if url_api_viz and not (csv or graphml or gexf or path_conexoes):
+                # O HTML servido pela API só grava os nós iniciais: o restante vem da API, sob demanda
+                nivel_max = 0
+
+            rede = RedeCNPJ(conBD, nivel_max=nivel_max, qualificacoes=qualificacoes, colunas_nos=colunas_nos,
+                            compartilhados=compartilhados, situacoes=situacoes, **(limites or {}))
 
             if tipo_consulta == 'file':
                 df_file = pd.read_csv(objeto_consulta, sep=csv_sep, header=None, dtype=str)
@@ -41,6 +65,12 @@ def consulta(tipo_consulta, objeto_consulta, qualificacoes, path_BD, nivel_max,
             else:
                 consulta_item(rede, tipo_consulta, objeto_consulta)
 
+            if rede.truncado:
+                print('Rede truncada (limite atingido: {}). Por nivel:'.format(rede.motivo_truncamento))
+                for nivel, est in rede.estatisticas_niveis().items():
+                    print('  nivel {}: {} nos, {} hubs nao expandidos, {} arestas, {} consultas'.format(
+                        nivel, est['nos'], est['hubs'], est['arestas'], est['consultas']))
+
             if not os.path.exists(path_output):
                 os.mkdir(path_output)
 
@@ -65,12 +95,9 @@ def consulta(tipo_consulta, objeto_consulta, qualificacoes, path_BD, nivel_max,
 
             if viz:
                 try:
-                    with open('viz/template.html', 'r', encoding='utf-8') as template:
-                        str_html = template.read().replace('<!--GRAFO-->', json.dumps(rede.json()))
-                        
                     path_html = os.path.join(path_output, 'grafo.html')
-                    with open(path_html, 'w', encoding='utf-8') as html:
-                        html.write(str_html)
+                    rede.gera_html('viz/template.html', path_html, url_api=url_api_viz,
+                                   tamanho_pagina=config.TAMANHO_PAGINA_VIZ, calcula_layout=config.LAYOUT_VIZ)
 
                     if config.PATH_NAVEGADOR:
                         subprocess.Popen([config.PATH_NAVEGADOR, os.path.abspath(path_html)])
@@ -84,19 +111,15 @@ def consulta(tipo_consulta, objeto_consulta, qualificacoes, path_BD, nivel_max,
                 qtd_colunas = len(df_conexoes.columns)
 
                 if qtd_colunas >= 2:
-                    G_undirected = rede.G.to_undirected()
                     lista_conexoes = []
 
                     for _, linha in df_conexoes.iterrows():
                         pessoa_A = linha[0].strip()
                         pessoa_B = linha[1].strip()
 
-                        conexao = ''
-                        try:
-                            lst_pessoas_conexao = nx.shortest_path(G_undirected, pessoa_A, pessoa_B)
-                            conexao = ' | '.join(lst_pessoas_conexao)
-                        except:
-                            conexao = 'SEM CONEXAO'
+                        # Caminho ignorando a direção dos vínculos, sem copiar a rede para um grafo não dirigido
+                        lst_pessoas_conexao = rede.G.caminho_mais_curto(pessoa_A, pessoa_B)
+                        conexao = ' | '.join(lst_pessoas_conexao) if lst_pessoas_conexao else 'SEM CONEXAO'
 
                         lista_conexoes.append((pessoa_A, pessoa_B, conexao))
 
@@ -121,6 +144,118 @@ No caso de pessoa fisica, informar cpf seguido imediatamente do nome (ex: "***12
     except:
         print('Nao foi possivel encontrar ou conectar ao BD {}'.format(path_BD))
 
+def consulta_grupos(conBD, tipo_consulta, objeto_consulta, path_output, csv_sep=','):
+    """
+    grupo: membros do grupo econômico de um CNPJ (14 digitos), de uma pessoa (cpf+nome)
+    ou de um numero de grupo, em grupo.csv. mesmo_grupo: para cada par de IDs do
+    arquivo, se estao no mesmo grupo, em mesmo_grupo.csv.
+    """
+    import pandas as pd
+    import grupos
+
+    if not grupos.existe(conBD):
+        print('Grupos economicos nao calculados nesta base. Execute: python grupos.py <arquivo .db>')
+        return
+
+    if not os.path.exists(path_output):
+        os.mkdir(path_output)
+
+    if tipo_consulta == 'grupo':
+        item = objeto_consulta.strip()
+        cnpj = item.replace('.','').replace('/','').replace('-','')
+        if cnpj.isdigit() and len(cnpj) == 14:
+            grupo = grupos.grupo_de(conBD, cnpj)
+        elif item.isdigit():
+            grupo = int(item)
+        else:
+            grupo = grupos.grupo_de(conBD, item)
+
+        if grupo is None:
+            print('"{}" nao tem vinculos societarios (grupo de um so membro).'.format(item))
+            return
+        nos, empresas = grupos.tamanho_grupo(conBD, grupo)
+        print('Grupo {}: {} membros ({} empresas, {} pessoas).'.format(grupo, nos, empresas, nos - empresas))
+        grupos.membros_grupo(conBD, grupo).to_csv(os.path.join(path_output, 'grupo.csv'), sep=csv_sep, index=False)
+
+    else:
+        df_pares = pd.read_csv(objeto_consulta, sep=csv_sep, header=None, dtype=str)
+        if len(df_pares.columns) < 2:
+            print('Arquivo de pares precisa ter pelo menos duas colunas, contendo a identificacao das pessoas (CNPJ ou cpf+nome).')
+            return
+
+        lista_pares = []
+        for _, linha in df_pares.iterrows():
+            pessoa_A = linha[0].strip()
+            pessoa_B = linha[1].strip()
+            grupo_A, grupo_B = grupos.grupo_de(conBD, pessoa_A), grupos.grupo_de(conBD, pessoa_B)
+            mesmo = grupos.mesmo_grupo(conBD, pessoa_A, pessoa_B)
+            lista_pares.append((pessoa_A, pessoa_B, '' if grupo_A is None else grupo_A, '' if grupo_B is None else grupo_B,
+                                'MESMO GRUPO' if mesmo else 'GRUPOS DIFERENTES'))
+
+        pd.DataFrame(lista_pares).to_csv(os.path.join(path_output, 'mesmo_grupo.csv'),
+                                         sep=csv_sep, header=None, index=None)
+
+    print('Consulta finalizada. Verifique o(s) arquivo(s) de saida na pasta "{}".'.format(path_output))
+
+def consulta_beneficiarios(conBD, objeto_consulta, path_output, csv_sep=','):
+    """
+    Para um CNPJ (14 digitos), os beneficiarios finais da empresa (pessoas no topo das
+    cadeias de socios PJ), em beneficiarios.csv; para uma pessoa (cpf+nome), as empresas
+    de que ela e beneficiaria final, em controladas.csv. Consultas na tabela
+    beneficiarios, sem montar a rede.
+    """
+    import beneficiarios
+
+    if not beneficiarios.existe(conBD):
+        print('Beneficiarios finais nao calculados nesta base. Execute: python beneficiarios.py <arquivo .db>')
+        return
+
+    if not os.path.exists(path_output):
+        os.mkdir(path_output)
+
+    item = objeto_consulta.strip()
+    cnpj = item.replace('.','').replace('/','').replace('-','')
+    if cnpj.isdigit() and len(cnpj) == 14:
+        df = beneficiarios.beneficiarios_de(conBD, cnpj)
+        print('{} beneficiarios finais de {} (cadeia mais longa: {} niveis{}).'.format(
+            len(df), cnpj, df['profundidade'].max() if len(df) else 0,
+            '; empresa em ciclo de participacoes' if df['ciclo'].any() else ''))
+        df.to_csv(os.path.join(path_output, 'beneficiarios.csv'), sep=csv_sep, index=False)
+    else:
+        if item[:11].isdigit():
+            item = mascara_cpf(item[:11]) + item[11:]
+        df = beneficiarios.controladas(conBD, item)
+        print('"{}" e beneficiario final de {} empresas.'.format(item, len(df)))
+        df.to_csv(os.path.join(path_output, 'controladas.csv'), sep=csv_sep, index=False)
+
+    print('Consulta finalizada. Verifique o(s) arquivo(s) de saida na pasta "{}".'.format(path_output))
+
+def consulta_estimativa(conBD, objeto_consulta, nivel_max):
+    """
+    Mostra o tamanho da rede de um CNPJ (14 digitos) ou de uma pessoa (cpf+nome)
+    antes de monta-la, pela centralidade pre-calculada (ver centralidade.estimativa).
+    """
+    import centralidade
+
+    if not centralidade.existe(conBD):
+        print('Centralidade nao calculada nesta base. Execute: python centralidade.py <arquivo .db>')
+        return
+
+    item = objeto_consulta.strip()
+    cnpj = item.replace('.','').replace('/','').replace('-','')
+    if cnpj.isdigit() and len(cnpj) == 14:
+        item = cnpj
+    elif item[:11].isdigit():
+        item = mascara_cpf(item[:11]) + item[11:]
+
+    estimativa = centralidade.estimativa(conBD, item)
+    print('"{}": {} vizinhos; ate {} nos a 2 saltos (rede de nivel 1).'.format(
+        item, estimativa['vizinhos'], estimativa['ate_2_saltos_max']))
+    if estimativa['tamanho_grupo'] is not None:
+        print('Grupo economico com {} membros: teto para a rede em qualquer nivel.'.format(estimativa['tamanho_grupo']))
+    if nivel_max > 1:
+        print('Com --nivel {}, a rede pode chegar ao tamanho do grupo economico.'.format(nivel_max))
+
 def consulta_item(rede, tipo_item, item):
     if tipo_item == 'cnpj':
         rede.insere_pessoa(1, item.replace('.','').replace('/','').replace('-','').zfill(14))
@@ -138,7 +273,7 @@ def consulta_item(rede, tipo_item, item):
 
         rede.insere_pessoa(2,(cpf,nome))
 
-        if len(rede.dataframe_vinculos()) == 0:
+        if rede.G.number_of_edges() == 0:
             print('Nenhum socio encontrado com cpf "{}" e nome "{}"'.format(cpf, nome))
             rede.G.remove_node(cpf+nome)
     else:
@@ -151,6 +286,14 @@ def mascara_cpf(cpf_original):
 
     return cpf
 
+def _codigos_cli(valor, padrao):
+    """Lista de códigos separados por vírgula (ou 'TODAS') da linha de comando; sem a opção, o padrão do config.py."""
+    if valor is None:
+        return padrao
+    if valor.strip().upper() == 'TODAS':
+        return 'TODAS'
+    return [c.strip() for c in valor.split(',') if c.strip()]
+
 def main():
     parser = argparse.ArgumentParser(
         description='Consulta a base de dados de CNPJ da Receita Federal e gera redes de relacionamentos.',
@@ -161,13 +304,22 @@ def main():
         '--tipo-consulta',
         dest='tipo_consulta',
         default='cnpj',
-        choices=['cnpj', 'nome_socio', 'cpf', 'cpf_nome', 'file'],
+        choices=['cnpj', 'nome_socio', 'cpf', 'cpf_nome', 'file', 'grupo', 'mesmo_grupo', 'beneficiarios', 'estimativa'],
         help='''Especifica o tipo de item a ser procurado:
 - cnpj: Busca empresa pelo numero do CNPJ.
 - nome_socio: Busca socios pelo nome completo.
 - cpf: Busca socios pelo numero do CPF (pode trazer varios socios).
 - cpf_nome: Busca socios pelo CPF seguido do nome (sem espaco).
 - file: Busca itens a partir de um arquivo de entrada.
+- grupo: Membros do grupo economico (componente conexo da rede de socios) de um CNPJ,
+  de um cpf+nome ou de um numero de grupo, em grupo.csv (requer grupos.py).
+- mesmo_grupo: Para cada par de IDs do arquivo de entrada, se estao no mesmo grupo
+  economico, em mesmo_grupo.csv (requer grupos.py).
+- beneficiarios: Beneficiarios finais (topo das cadeias de socios PJ) de um CNPJ, em
+  beneficiarios.csv, ou empresas controladas por um cpf+nome, em controladas.csv
+  (requer beneficiarios.py).
+- estimativa: Mostra o tamanho da rede de um CNPJ ou cpf+nome antes de monta-la:
+  vizinhos, teto para a rede de nivel 1 e tamanho do grupo (requer centralidade.py).
 (Padrão: cnpj)'''
     )
     parser.add_argument(
@@ -198,22 +350,47 @@ def main():
         help='Caminho para o arquivo com pares de IDs para buscar conexoes entre eles.'
     )
 
+    parser.add_argument('--max-nos', dest='max_nos', type=int, default=config.MAX_NOS,
+                        help='Numero maximo de nos na rede; ao atingi-lo a consulta para. (Padrao: config.MAX_NOS)')
+    parser.add_argument('--max-arestas', dest='max_arestas', type=int, default=config.MAX_ARESTAS,
+                        help='Numero maximo de arestas na rede. (Padrao: config.MAX_ARESTAS)')
+    parser.add_argument('--max-consultas', dest='max_consultas', type=int, default=config.MAX_CONSULTAS_SQL,
+                        help='Numero maximo de consultas SQL na montagem da rede. (Padrao: config.MAX_CONSULTAS_SQL)')
+    parser.add_argument('--tempo-max', dest='tempo_max', type=float, default=config.TEMPO_MAX_CONSULTA,
+                        help='Tempo maximo, em segundos, da montagem da rede. (Padrao: config.TEMPO_MAX_CONSULTA)')
+    parser.add_argument('--grau-hub', dest='grau_hub', type=int, default=config.GRAU_MAX_HUB,
+                        help='Nao expande empresas/pessoas com mais vinculos que isso (hubs). (Padrao: config.GRAU_MAX_HUB)')
+    parser.add_argument('--qualificacoes',
+                        help='Codigos de qualificacao dos socios seguidos na rede, separados por virgula (ex: 05,22,49), '
+                             'ou TODAS. (Padrao: chaves de config.QUALIFICACOES)')
+    parser.add_argument('--situacoes',
+                        help='Codigos de situacao cadastral das empresas seguidas na rede, separados por virgula '
+                             '(ex: 02 = so ativas), ou TODAS. (Padrao: config.SITUACOES_CADASTRAIS)')
+    parser.add_argument('--compartilhados', default=','.join(config.VINCULOS_COMPARTILHADOS),
+                        help='Liga tambem empresas com o mesmo endereco, telefone ou e-mail, separados por virgula '
+                             '(ex: endereco,telefone,email; requer compartilhados.py). (Padrao: config.VINCULOS_COMPARTILHADOS)')
+
     parser.add_argument('--csv', action='store_true', help='Gerar resultado em arquivos CSV (pessoas.csv, vinculos.csv).')
     parser.add_argument('--graphml', action='store_true', help='Gerar resultado em formato GraphML.')
     parser.add_argument('--gexf', action='store_true', help='Gerar resultado em formato GEXF (para Gephi).')
     parser.add_argument('--viz', action='store_true', help='Gerar uma visualizacao HTML interativa (grafo.html).')
+    parser.add_argument('--viz-api', dest='viz_api', default=config.URL_API_VIZ,
+                        help='URL da API (ex: http://127.0.0.1:8000/api/v1): o grafo.html traz so os nos iniciais e '
+                             'busca os vizinhos na API a cada clique. Implica --viz. (Padrao: config.URL_API_VIZ)')
 
     args = parser.parse_args()
 
     generate_csv = args.csv
-    if not any([args.csv, args.graphml, args.gexf, args.viz]):
+    if args.viz_api:
+        args.viz = True
+    if not any([args.csv, args.graphml, args.gexf, args.viz]) and args.tipo_consulta not in ('grupo', 'mesmo_grupo', 'beneficiarios', 'estimativa'):
         print("Nenhum formato de saida especificado. Usando --csv como padrao.")
         generate_csv = True
 
     consulta(
         tipo_consulta=args.tipo_consulta,
         objeto_consulta=args.item,
-        qualificacoes=config.QUALIFICACOES,
+        qualificacoes=_codigos_cli(args.qualificacoes, config.QUALIFICACOES),
         path_BD=args.base,
         nivel_max=args.nivel,
         path_output=args.output_path,
@@ -223,7 +400,12 @@ def main():
         graphml=args.graphml,
         gexf=args.gexf,
         viz=args.viz,
-        path_conexoes=args.conexoes
+        path_conexoes=args.conexoes,
+        limites={'max_nos': args.max_nos, 'max_arestas': args.max_arestas, 'max_consultas': args.max_consultas,
+                 'tempo_max': args.tempo_max, 'grau_hub': args.grau_hub},
+        url_api_viz=args.viz_api,
+        compartilhados=[t.strip() for t in args.compartilhados.split(',') if t.strip()],
+        situacoes=_codigos_cli(args.situacoes, config.SITUACOES_CADASTRAIS)
     )
 
 if __name__ == '__main__':
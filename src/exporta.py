@@ -0,0 +1,198 @@
+# -*- encoding: utf-8 -*-
+"""
+Exportação da rede (Grafo) em GraphML, GEXF e JSON node-link, escrevendo nós e
+arestas direto no arquivo à medida que são percorridos, sem montar uma cópia
+do grafo (nx.DiGraph) nem o documento inteiro em memória.
+
+Os valores são convertidos na escrita: None é omitido, dict/list viram texto e
+tipos do numpy viram os tipos nativos correspondentes. No JSON, usa o orjson se
+estiver instalado (bem mais rápido que o json da biblioteca padrão).
+"""
+import json
+import numbers
+from xml.sax.saxutils import escape, quoteattr
+
+import numpy as np
+
+# O orjson é opcional: sem ele, o JSON é gerado pelo módulo json.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Elementos por escrita no arquivo: agrupa as linhas para reduzir as chamadas de write.
+TAMANHO_BLOCO = 1000
+
+
+def _nativo(valor):
+    """Converte escalares do numpy para os tipos nativos."""
+    return valor.item() if isinstance(valor, np.generic) else valor
+
+
+def _tipo_xml(tipos, nomes):
+    """Tipo de um atributo no GraphML/GEXF a partir dos tipos dos valores presentes."""
+    if tipos and all(issubclass(t, (bool, np.bool_)) for t in tipos):
+        return nomes['bool']
+    if tipos and all(issubclass(t, (numbers.Integral, np.integer)) and not issubclass(t, bool) for t in tipos):
+        return nomes['int']
+    if tipos and all(issubclass(t, (numbers.Real, np.number)) and not issubclass(t, bool) for t in tipos):
+        return nomes['float']
+    return nomes['str']
+
+
+def _valor_xml(valor, tipo):
+    """Valor como texto, sem escapar (nos atributos, o quoteattr escapa)."""
+    valor = _nativo(valor)
+    if tipo == 'boolean':
+        return 'true' if valor else 'false'
+    if isinstance(valor, float) and valor != valor:
+        return 'NaN'
+    return str(valor)
+
+
+def _texto_xml(valor, tipo):
+    """Valor como texto de um elemento XML."""
+    return escape(_valor_xml(valor, tipo))
+
+
+def _declara_atributos(G):
+    """(nome, tipo) dos atributos de nós e de arestas, na ordem em que aparecem no grafo."""
+    nomes = {'bool': 'boolean', 'int': 'long', 'float': 'double', 'str': 'string'}
+    nos = [(nome, _tipo_xml(tipos, nomes)) for nome, tipos in G.tipos_atributos_nos().items()]
+    arestas = [(nome, _tipo_xml(tipos, nomes)) for nome, tipos in G.tipos_atributos_arestas().items()]
+    return nos, arestas
+
+
+def _escreve_em_blocos(arquivo, linhas):
+    bloco = []
+    for linha in linhas:
+        bloco.append(linha)
+        if len(bloco) >= TAMANHO_BLOCO:
+            arquivo.write(''.join(bloco))
+            bloco = []
+    if bloco:
+        arquivo.write(''.join(bloco))
+
+
+def escreve_graphml(G, caminho):
+    """Grava o grafo em GraphML (o mesmo esquema do nx.write_graphml)."""
+    atributos_nos, atributos_arestas = _declara_atributos(G)
+    chaves_nos = {nome: (f'd{i}', tipo) for i, (nome, tipo) in enumerate(atributos_nos)}
+    chaves_arestas = {nome: (f'd{i + len(chaves_nos)}', tipo) for i, (nome, tipo) in enumerate(atributos_arestas)}
+
+    def dados(atributos, chaves):
+        return ''.join(f'<data key="{chaves[nome][0]}">{_texto_xml(valor, chaves[nome][1])}</data>'
+                       for nome, valor in atributos.items() if valor is not None)
+
+    def linhas():
+        for id_no, atributos in G.nodes(data=True):
+            yield f'<node id={quoteattr(str(id_no))}>{dados(atributos, chaves_nos)}</node>\n'
+        for origem, destino, atributos in G.edges(data=True):
+            yield (f'<edge source={quoteattr(str(origem))} target={quoteattr(str(destino))}>'
+                   f'{dados(atributos, chaves_arestas)}</edge>\n')
+
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        arquivo.write('<?xml version="1.0" encoding="utf-8"?>\n'
+                      '<graphml xmlns="http://graphml.graphdrawing.org/xmlns" '
+                      'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+                      'xsi:schemaLocation="http://graphml.graphdrawing.org/xmlns '
+                      'http://graphml.graphdrawing.org/xmlns/1.0/graphml.xsd">\n')
+        for dominio, chaves in (('node', chaves_nos), ('edge', chaves_arestas)):
+            for nome, (chave, tipo) in chaves.items():
+                arquivo.write(f'<key id="{chave}" for="{dominio}" attr.name={quoteattr(nome)} attr.type="{tipo}" />\n')
+        arquivo.write('<graph edgedefault="directed">\n')
+        _escreve_em_blocos(arquivo, linhas())
+        arquivo.write('</graph>\n</graphml>\n')
+
+
+def escreve_gexf(G, caminho):
+    """Grava o grafo em GEXF 1.2 (para o Gephi). O atributo 'nome' vira o rótulo do nó."""
+    atributos_nos, atributos_arestas = _declara_atributos(G)
+    ids_nos = {nome: (str(i), tipo) for i, (nome, tipo) in enumerate(atributos_nos)}
+    ids_arestas = {nome: (str(i), tipo) for i, (nome, tipo) in enumerate(atributos_arestas)}
+
+    def valores(atributos, ids):
+        conteudo = ''.join(f'<attvalue for="{ids[nome][0]}" value={quoteattr(_valor_xml(valor, ids[nome][1]))} />'
+                           for nome, valor in atributos.items() if valor is not None)
+        return f'<attvalues>{conteudo}</attvalues>' if conteudo else ''
+
+    def linhas():
+        for id_no, atributos in G.nodes(data=True):
+            rotulo = atributos.get('nome') or id_no
+            yield (f'<node id={quoteattr(str(id_no))} label={quoteattr(str(rotulo))}>'
+                   f'{valores(atributos, ids_nos)}</node>\n')
+        yield '</nodes>\n<edges>\n'
+        for n, (origem, destino, atributos) in enumerate(G.edges(data=True)):
+            yield (f'<edge id="{n}" source={quoteattr(str(origem))} target={quoteattr(str(destino))}>'
+                   f'{valores(atributos, ids_arestas)}</edge>\n')
+
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        arquivo.write('<?xml version="1.0" encoding="utf-8"?>\n'
+                      '<gexf xmlns="http://www.gexf.net/1.2draft" version="1.2">\n'
+                      '<graph defaultedgetype="directed" mode="static">\n')
+        for classe, ids in (('node', ids_nos), ('edge', ids_arestas)):
+            arquivo.write(f'<attributes class="{classe}" mode="static">\n')
+            for nome, (id_atributo, tipo) in ids.items():
+                arquivo.write(f'<attribute id="{id_atributo}" title={quoteattr(nome)} type="{tipo}" />\n')
+            arquivo.write('</attributes>\n')
+        arquivo.write('<nodes>\n')
+        _escreve_em_blocos(arquivo, linhas())
+        arquivo.write('</edges>\n</graph>\n</gexf>\n')
+
+
+def _json_padrao(valor):
+    """Valores que o codificador JSON não serializa sozinho: escalares do numpy e o resto como texto."""
+    if isinstance(valor, np.generic):
+        return valor.item()
+    return str(valor)
+
+
+if orjson is not None:
+    def _codifica(objeto):
+        return orjson.dumps(objeto, default=_json_padrao, option=orjson.OPT_SERIALIZE_NUMPY)
+else:
+    def _codifica(objeto):
+        return json.dumps(objeto, default=_json_padrao, ensure_ascii=False).encode('utf-8')
+
+
+def escreve_json(G, arquivo, html=False):
+    """
+    Escreve o grafo no formato node-link (com as arestas em 'links', como em
+    RedeCNPJ.json()) em um arquivo aberto em modo binário. Com html=True, escapa
+    '</' para o JSON poder ficar dentro de um <script> (viz/template.html).
+    """
+    def escreve(dados):
+        arquivo.write(dados.replace(b'</', b'<\\/') if html else dados)
+
+    def elementos(itens):
+        bloco = []
+        for n, item in enumerate(itens):
+            bloco.append((b',' if n else b'') + _codifica(item))
+            if len(bloco) >= TAMANHO_BLOCO:
+                escreve(b''.join(bloco))
+                bloco = []
+        if bloco:
+            escreve(b''.join(bloco))
+
+    escreve(b'{"directed":true,"multigraph":false,"graph":' + _codifica(G.graph) + b',"nodes":[')
+    elementos({**dados, 'id': id_no} for id_no, dados in G.nodes(data=True))
+    escreve(b'],"links":[')
+    elementos({**dados, 'source': origem, 'target': destino} for origem, destino, dados in G.edges(data=True))
+    escreve(b']}')
+
+
+def escreve_html(G, caminho_template, caminho, marcador='<!--GRAFO-->', api=None, marcador_api='<!--API-->'):
+    """
+    Grava a visualização: o template com o JSON do grafo escrito no lugar do marcador.
+    Com api (ex: {'api': url, 'page_size': 50}), a configuração do modo incremental
+    vai no lugar de marcador_api: a visualização busca os vizinhos na API a cada clique.
+    """
+    with open(caminho_template, 'r', encoding='utf-8') as template:
+        conteudo = template.read()
+    if api is not None:
+        conteudo = conteudo.replace(marcador_api, _codifica(api).decode('utf-8').replace('</', '<\\/'))
+    antes, depois = conteudo.split(marcador, 1)
+    with open(caminho, 'wb') as arquivo:
+        arquivo.write(antes.encode('utf-8'))
+        escreve_json(G, arquivo, html=True)
+        arquivo.write(depois.encode('utf-8'))
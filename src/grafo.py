@@ -0,0 +1,367 @@
+# -*- encoding: utf-8 -*-
+"""
+Grafo dirigido compacto usado na montagem das redes de relacionamentos.
+
+O networkx guarda cada nó e cada aresta em dicionários aninhados (sucessores,
+predecessores e um dict de atributos por elemento), o que custa centenas de bytes
+por elemento além dos próprios valores dos atributos (as linhas de estabelecimentos e socios).
+Aqui:
+
+- os ids dos nós são internados e mapeados para índices inteiros;
+- os atributos ficam em colunas (uma lista por atributo, indexada pelo índice do
+  nó ou da aresta), acessadas por registros com __slots__ (G.nodes[id]);
+- as arestas ficam em arrays de origem/destino, e a adjacência (saída e entrada)
+  é montada sob demanda em arrays no formato CSR.
+
+A interface imita a parte do nx.DiGraph usada pelo projeto (add_node, add_edge,
+has_edge, nodes, edges, number_of_nodes...). Para exportar em GraphML/GEXF,
+para_networkx() monta um nx.DiGraph equivalente.
+"""
+import sys
+from array import array
+from collections import deque
+from collections.abc import MutableMapping
+
+import numpy as np
+import pandas as pd
+
+# Marca a posição de uma coluna cujo elemento não tem o atributo.
+_AUSENTE = object()
+
+
+def _define(colunas, nome, indice, valor):
+    coluna = colunas.get(nome)
+    if coluna is None:
+        coluna = colunas[nome] = []
+    if len(coluna) <= indice:
+        coluna.extend([_AUSENTE] * (indice + 1 - len(coluna)))
+    coluna[indice] = valor
+
+
+def _atributos(colunas, indice):
+    return {nome: coluna[indice] for nome, coluna in colunas.items()
+            if indice < len(coluna) and coluna[indice] is not _AUSENTE}
+
+
+class Registro(MutableMapping):
+    """Atributos de um nó ou aresta, com a interface de um dict, lidos e gravados nas colunas do grafo."""
+    __slots__ = ('_colunas', '_indice')
+
+    def __init__(self, colunas, indice):
+        self._colunas = colunas
+        self._indice = indice
+
+    def __getitem__(self, nome):
+        coluna = self._colunas.get(nome)
+        if coluna is None or self._indice >= len(coluna) or coluna[self._indice] is _AUSENTE:
+            raise KeyError(nome)
+        return coluna[self._indice]
+
+    def __setitem__(self, nome, valor):
+        _define(self._colunas, nome, self._indice, valor)
+
+    def __delitem__(self, nome):
+        self[nome]
+        self._colunas[nome][self._indice] = _AUSENTE
+
+    def __iter__(self):
+        return iter(_atributos(self._colunas, self._indice))
+
+    def __len__(self):
+        return len(_atributos(self._colunas, self._indice))
+
+    def __repr__(self):
+        return repr(_atributos(self._colunas, self._indice))
+
+
+class _VisaoNos:
+    """G.nodes: itera os ids (ou pares (id, atributos) com data=True); G.nodes[id] é o Registro do nó."""
+    __slots__ = ('_grafo', '_data')
+
+    def __init__(self, grafo, data=False):
+        self._grafo = grafo
+        self._data = data
+
+    def __call__(self, data=False):
+        return _VisaoNos(self._grafo, data)
+
+    def __getitem__(self, id_no):
+        return Registro(self._grafo._atributos_nos, self._grafo._indice[id_no])
+
+    def __contains__(self, id_no):
+        return id_no in self._grafo._indice
+
+    def __len__(self):
+        return len(self._grafo._indice)
+
+    def __iter__(self):
+        g = self._grafo
+        for id_no, i in g._indice.items():
+            yield (id_no, _atributos(g._atributos_nos, i)) if self._data else id_no
+
+
+class _VisaoArestas:
+    """G.edges: itera os pares (origem, destino), ou triplas com os atributos com data=True."""
+    __slots__ = ('_grafo', '_data')
+
+    def __init__(self, grafo, data=False):
+        self._grafo = grafo
+        self._data = data
+
+    def __call__(self, data=False):
+        return _VisaoArestas(self._grafo, data)
+
+    def __getitem__(self, par):
+        origem, destino = par
+        return Registro(self._grafo._atributos_arestas, self._grafo._aresta(origem, destino))
+
+    def __len__(self):
+        return self._grafo._n_arestas
+
+    def __iter__(self):
+        g = self._grafo
+        for e in range(len(g._origem)):
+            if g._aresta_removida[e]:
+                continue
+            origem, destino = g._ids[g._origem[e]], g._ids[g._destino[e]]
+            yield (origem, destino, _atributos(g._atributos_arestas, e)) if self._data else (origem, destino)
+
+
+class Grafo:
+    """Grafo dirigido simples (no máximo uma aresta por par origem/destino) com atributos em colunas."""
+
+    def __init__(self):
+        # id do nó -> índice; índice -> id
+        self._indice = {}
+        self._ids = []
+        self._atributos_nos = {}
+        # Arestas: origem e destino (índices dos nós) e (origem << 32 | destino) -> índice da aresta
+        self._origem = array('i')
+        self._destino = array('i')
+        self._aresta_removida = bytearray()
+        self._chaves = {}
+        self._atributos_arestas = {}
+        self._n_arestas = 0
+        # Adjacência CSR (saída e entrada), refeita após alterações nas arestas
+        self._csr = None
+        # Atributos do grafo (como o G.graph do networkx), ex: dados do layout
+        self.graph = {}
+
+    @staticmethod
+    def _define_todos(colunas, indice, atributos):
+        """_define para vários atributos, sem o custo de uma chamada por atributo."""
+        for nome, valor in atributos.items():
+            coluna = colunas.get(nome)
+            if coluna is None:
+                coluna = colunas[nome] = []
+            falta = indice + 1 - len(coluna)
+            if falta > 0:
+                coluna.extend([_AUSENTE] * falta)
+            coluna[indice] = valor
+
+    # --- Nós ---
+    def _indice_no(self, id_no):
+        i = self._indice.get(id_no)
+        if i is None:
+            if isinstance(id_no, str):
+                id_no = sys.intern(id_no)
+            i = self._indice[id_no] = len(self._ids)
+            self._ids.append(id_no)
+            self._csr = None
+        return i
+
+    def add_node(self, id_no, **atributos):
+        i = self._indice_no(id_no)
+        if atributos:
+            self._define_todos(self._atributos_nos, i, atributos)
+
+    def remove_node(self, id_no):
+        i = self._indice.pop(id_no)
+        for coluna in self._atributos_nos.values():
+            if i < len(coluna):
+                coluna[i] = _AUSENTE
+        for e in range(len(self._origem)):
+            if not self._aresta_removida[e] and (self._origem[e] == i or self._destino[e] == i):
+                self._remove_aresta(e)
+        self._csr = None
+
+    def __contains__(self, id_no):
+        return id_no in self._indice
+
+    def __len__(self):
+        return len(self._indice)
+
+    def __iter__(self):
+        return iter(self._indice)
+
+    def number_of_nodes(self):
+        return len(self._indice)
+
+    @property
+    def nodes(self):
+        return _VisaoNos(self)
+
+    # --- Arestas ---
+    def _aresta(self, origem, destino):
+        return self._chaves[self._indice[origem] << 32 | self._indice[destino]]
+
+    def add_edge(self, origem, destino, **atributos):
+        """Inclui a aresta (e os nós que ainda não existem). Se ela já existe, atualiza os atributos."""
+        i, j = self._indice_no(origem), self._indice_no(destino)
+        e = self._chaves.get(i << 32 | j)
+        if e is None:
+            e = self._chaves[i << 32 | j] = len(self._origem)
+            self._origem.append(i)
+            self._destino.append(j)
+            self._aresta_removida.append(0)
+            self._n_arestas += 1
+            self._csr = None
+        if atributos:
+            self._define_todos(self._atributos_arestas, e, atributos)
+
+    def _remove_aresta(self, e):
+        del self._chaves[self._origem[e] << 32 | self._destino[e]]
+        self._aresta_removida[e] = 1
+        for coluna in self._atributos_arestas.values():
+            if e < len(coluna):
+                coluna[e] = _AUSENTE
+        self._n_arestas -= 1
+
+    def has_edge(self, origem, destino):
+        i, j = self._indice.get(origem), self._indice.get(destino)
+        return i is not None and j is not None and (i << 32 | j) in self._chaves
+
+    def number_of_edges(self):
+        return self._n_arestas
+
+    @property
+    def edges(self):
+        return _VisaoArestas(self)
+
+    # --- Adjacência ---
+    def _adjacencia(self):
+        """(offsets, vizinhos) de saída e de entrada, no formato CSR, sem as arestas removidas."""
+        if self._csr is None:
+            n = len(self._ids)
+            ativas = np.frombuffer(self._aresta_removida, dtype=np.uint8) == 0
+            origem = np.frombuffer(self._origem, dtype=np.int32)[ativas]
+            destino = np.frombuffer(self._destino, dtype=np.int32)[ativas]
+            csr = []
+            for de, para in ((origem, destino), (destino, origem)):
+                ordem = np.argsort(de, kind='stable')
+                offsets = np.zeros(n + 1, dtype=np.int64)
+                np.cumsum(np.bincount(de, minlength=n), out=offsets[1:])
+                csr.append((offsets, para[ordem]))
+            self._csr = csr
+        return self._csr
+
+    def arrays(self):
+        """
+        (ids, origem, destino): a lista dos ids dos nós e as arestas como arrays numpy
+        de posições nessa lista, para algoritmos vetorizados (ex: layout.py).
+        """
+        indices = np.fromiter(self._indice.values(), dtype=np.int64, count=len(self._indice))
+        posicao = np.full(len(self._ids), -1, dtype=np.int64)
+        posicao[indices] = np.arange(len(indices))
+        ativas = np.frombuffer(self._aresta_removida, dtype=np.uint8) == 0
+        origem = posicao[np.frombuffer(self._origem, dtype=np.int32)[ativas]]
+        destino = posicao[np.frombuffer(self._destino, dtype=np.int32)[ativas]]
+        return list(self._indice), origem, destino
+
+    def _vizinhos_indice(self, i, saida=True, entrada=True):
+        (off_s, viz_s), (off_e, viz_e) = self._adjacencia()
+        partes = []
+        if saida:
+            partes.append(viz_s[off_s[i]:off_s[i + 1]])
+        if entrada:
+            partes.append(viz_e[off_e[i]:off_e[i + 1]])
+        return np.concatenate(partes) if len(partes) > 1 else partes[0]
+
+    def successors(self, id_no):
+        return [self._ids[j] for j in self._vizinhos_indice(self._indice[id_no], entrada=False)]
+
+    def predecessors(self, id_no):
+        return [self._ids[j] for j in self._vizinhos_indice(self._indice[id_no], saida=False)]
+
+    def vizinhos(self, id_no):
+        """Vizinhos em qualquer direção, sem repetição."""
+        return [self._ids[j] for j in np.unique(self._vizinhos_indice(self._indice[id_no]))]
+
+    def grau(self, id_no):
+        """Número de arestas (de saída e de entrada) do nó."""
+        return len(self._vizinhos_indice(self._indice[id_no]))
+
+    def caminho_mais_curto(self, origem, destino):
+        """
+        Menor caminho entre dois nós ignorando a direção das arestas (busca em
+        largura), como lista de ids, ou None se não houver caminho.
+        """
+        if origem not in self._indice or destino not in self._indice:
+            return None
+        inicio, fim = self._indice[origem], self._indice[destino]
+        anterior = {inicio: -1}
+        fila = deque([inicio])
+        while fila and fim not in anterior:
+            i = fila.popleft()
+            for j in self._vizinhos_indice(i).tolist():
+                if j not in anterior:
+                    anterior[j] = i
+                    fila.append(j)
+        if fim not in anterior:
+            return None
+        caminho = [fim]
+        while anterior[caminho[-1]] != -1:
+            caminho.append(anterior[caminho[-1]])
+        return [self._ids[i] for i in reversed(caminho)]
+
+    # --- Exportação ---
+    @staticmethod
+    def _tipos(colunas):
+        return {nome: {type(v) for v in coluna if v is not _AUSENTE and v is not None}
+                for nome, coluna in colunas.items()}
+
+    def tipos_atributos_nos(self):
+        """Nome de cada atributo dos nós -> tipos (classes) dos valores presentes, sem None."""
+        return self._tipos(self._atributos_nos)
+
+    def tipos_atributos_arestas(self):
+        """Nome de cada atributo das arestas -> tipos (classes) dos valores presentes, sem None."""
+        return self._tipos(self._atributos_arestas)
+
+    def _colunas_ativas(self, colunas, indices):
+        """Colunas de atributos restritas aos índices informados, com None onde o atributo não existe."""
+        resultado = {}
+        for nome, coluna in colunas.items():
+            valores = [coluna[i] if i < len(coluna) else _AUSENTE for i in indices]
+            resultado[nome] = [None if v is _AUSENTE else v for v in valores]
+        return resultado
+
+    def dataframe_nos(self):
+        """DataFrame com uma linha por nó (índice = id), montado direto das colunas."""
+        indices = list(self._indice.values())
+        return pd.DataFrame(self._colunas_ativas(self._atributos_nos, indices),
+                            index=pd.Index(list(self._indice), dtype=object))
+
+    def dataframe_arestas(self):
+        """DataFrame com uma linha por aresta, indexado por (source, target)."""
+        arestas = [e for e in range(len(self._origem)) if not self._aresta_removida[e]]
+        indice = pd.MultiIndex.from_tuples(
+            [(self._ids[self._origem[e]], self._ids[self._destino[e]]) for e in arestas],
+            names=['source', 'target'])
+        return pd.DataFrame(self._colunas_ativas(self._atributos_arestas, arestas), index=indice)
+
+    def node_link(self):
+        """Grafo no formato node-link (o mesmo do json_graph.node_link_data, com as arestas em 'links')."""
+        return {'directed': True, 'multigraph': False, 'graph': dict(self.graph),
+                'nodes': [dict(dados, id=id_no) for id_no, dados in self.nodes(data=True)],
+                'links': [dict(dados, source=origem, target=destino)
+                          for origem, destino, dados in self.edges(data=True)]}
+
+    def para_networkx(self):
+        """nx.DiGraph equivalente, para as exportações que dependem do networkx."""
+        import networkx as nx
+
+        G = nx.DiGraph(**self.graph)
+        G.add_nodes_from(self.nodes(data=True))
+        G.add_edges_from(self.edges(data=True))
+        return G
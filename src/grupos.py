@@ -0,0 +1,260 @@
+# -*- encoding: utf-8 -*-
+"""
+Grupos econômicos: componentes conexos da rede inteira de sócios (empresas ligadas
+aos seus sócios, pessoas físicas ou jurídicas), calculados uma vez após a carga.
+
+Com os grupos gravados no banco, saber se duas empresas/pessoas estão ligadas (por
+qualquer caminho de vínculos societários), o tamanho do grupo de uma delas ou a
+lista dos membros de um grupo são consultas indexadas, sem montar a rede.
+
+- Empresas são identificadas pelo cnpj_basico (sócios PJ também, pelos 8 primeiros
+  dígitos do CNPJ); pessoas físicas e estrangeiros, pelo CPF mascarado seguido do
+  nome, como nos ids dos nós da RedeCNPJ.
+- As chaves viram inteiros (o cnpj_basico diretamente; o CPF+nome por um hash de
+  64 bits) e os componentes saem de um union-find vetorizado com numpy.
+- Tabelas gravadas: grupos (chave, tipo_pessoa, grupo) e grupos_tamanho (grupo, nos,
+  empresas). Os grupos são numerados do maior para o menor, a partir de 1.
+  Empresas sem sócios (e que não são sócias de outras) não entram nas tabelas:
+  cada uma é um grupo de um só membro.
+
+Uso (após a carga do cnpj.py, que já chama calcula_grupos ao final):
+    python grupos.py output/CNPJ_full.db
+"""
+import sys
+import time
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+TABELA_GRUPOS = 'grupos'
+TABELA_TAMANHOS = 'grupos_tamanho'
+
+# Linhas de socios lidas por vez.
+CHUNKSIZE = 1000000
+
+# Linhas gravadas por executemany.
+TAMANHO_LOTE_GRAVACAO = 100000
+
+# Arestas empresa-sócio com as chaves já separadas no SQLite: a empresa (cnpj_basico) e
+# o sócio PJ como inteiros; para as pessoas, o CPF mascarado seguido do nome.
+_SOCIO_PJ = ("identificador_socio = '1' AND length(cnpj_cpf_socio) = 14 "
+             "AND cnpj_cpf_socio NOT GLOB '*[^0-9]*'")
+_SQL_SOCIOS = f"""
+    SELECT CAST(cnpj_basico AS INTEGER) AS empresa,
+           CASE WHEN {_SOCIO_PJ} THEN CAST(substr(cnpj_cpf_socio, 1, 8) AS INTEGER) ELSE -1 END AS socio_pj,
+           CASE WHEN {_SOCIO_PJ} THEN '' ELSE ifnull(cnpj_cpf_socio, '') || ifnull(nome_socio_razao_social, '') END
+               AS chave_pessoa
+    FROM socios
+    WHERE cnpj_basico <> '' AND cnpj_basico NOT GLOB '*[^0-9]*'
+"""
+
+
+def componentes(n, a, b):
+    """
+    Union-find vetorizado: rótulo do componente conexo de cada um dos n nós, dadas as
+    arestas (a[i], b[i]). Em cada rodada, cada raiz é ligada à menor raiz vizinha, os
+    rótulos são comprimidos por saltos de ponteiro e as arestas internas a um
+    componente já unido são descartadas. O rótulo é o menor nó do componente.
+    """
+    rotulo = np.arange(n, dtype=np.int64)
+    a = np.asarray(a, dtype=np.int64)
+    b = np.asarray(b, dtype=np.int64)
+    while len(a):
+        ra, rb = rotulo[a], rotulo[b]
+        externas = ra != rb
+        a, b, ra, rb = a[externas], b[externas], ra[externas], rb[externas]
+        if not len(a):
+            break
+        menor = np.minimum(ra, rb)
+        np.minimum.at(rotulo, np.maximum(ra, rb), menor)
+        while True:
+            saltos = rotulo[rotulo]
+            if np.array_equal(saltos, rotulo):
+                break
+            rotulo = saltos
+    return rotulo
+
+
+def _chaves_socios(df):
+    """
+    Empresa de cada linha de socios e o sócio: o cnpj_basico para sócios PJ (-1 nas
+    demais linhas) e o hash do CPF+nome para as pessoas.
+    """
+    empresa = df['empresa'].to_numpy(dtype=np.int64)
+    socio_pj = df['socio_pj'].to_numpy(dtype=np.int64, copy=True)
+    # Sócio sem CPF e sem nome: não liga a empresa a ninguém (a aresta vira um laço)
+    sem_chave = (socio_pj < 0) & (df['chave_pessoa'] == '').to_numpy()
+    socio_pj[sem_chave] = empresa[sem_chave]
+    hash_pessoa = pd.util.hash_pandas_object(df['chave_pessoa'], index=False).to_numpy()
+    return empresa, socio_pj, hash_pessoa
+
+
+def _grava(conBD, sql, linhas):
+    lote = []
+    for linha in linhas:
+        lote.append(linha)
+        if len(lote) >= TAMANHO_LOTE_GRAVACAO:
+            conBD.executemany(sql, lote)
+            lote = []
+    if lote:
+        conBD.executemany(sql, lote)
+
+
+def le_arestas(conBD, chunksize=CHUNKSIZE):
+    """
+    Lê a tabela socios e devolve (ids_empresas, ids_pessoas, origem, destino): os
+    cnpj_basico (inteiros) e os hashes de CPF+nome, ordenados, e uma aresta por linha
+    de socios, da empresa (origem) para o sócio (destino), em ids compactos: empresas
+    em 0..E-1 e pessoas em E..E+P-1, nas posições de ids_empresas e ids_pessoas.
+    """
+    empresas, socios_pj, hashes = [], [], []
+    for df in pd.read_sql_query(_SQL_SOCIOS, conBD, chunksize=chunksize):
+        empresa, socio_pj, hash_pessoa = _chaves_socios(df)
+        empresas.append(empresa)
+        socios_pj.append(socio_pj)
+        hashes.append(hash_pessoa)
+    empresa = np.concatenate(empresas) if empresas else np.zeros(0, dtype=np.int64)
+    socio_pj = np.concatenate(socios_pj) if socios_pj else np.zeros(0, dtype=np.int64)
+    hash_pessoa = np.concatenate(hashes) if hashes else np.zeros(0, dtype=np.uint64)
+    del empresas, socios_pj, hashes
+    eh_pj = socio_pj >= 0
+
+    ids_empresas = np.unique(np.concatenate([empresa, socio_pj[eh_pj]]))
+    ids_pessoas = np.unique(hash_pessoa[~eh_pj])
+    origem = np.searchsorted(ids_empresas, empresa)
+    destino = np.empty(len(empresa), dtype=np.int64)
+    destino[eh_pj] = np.searchsorted(ids_empresas, socio_pj[eh_pj])
+    destino[~eh_pj] = len(ids_empresas) + np.searchsorted(ids_pessoas, hash_pessoa[~eh_pj])
+    return ids_empresas, ids_pessoas, origem, destino
+
+
+def grava_por_chave(conBD, tabela, ids_empresas, ids_pessoas, colunas, chunksize=CHUNKSIZE):
+    """
+    Grava em tabela uma linha (chave, tipo_pessoa, *valores) por empresa e por pessoa,
+    com os valores tirados de colunas (arrays indexados pelos ids compactos de
+    le_arestas). As chaves em texto das pessoas vêm de uma nova leitura de socios.
+    """
+    sql = f'INSERT INTO {tabela} VALUES ({", ".join(["?"] * (len(colunas) + 2))})'
+    n_empresas = len(ids_empresas)
+    _grava(conBD, sql, ((f'{cnpj_basico:08d}', 1, *valores) for cnpj_basico, *valores in
+                        zip(ids_empresas.tolist(), *(coluna[:n_empresas].tolist() for coluna in colunas))))
+
+    colunas_pessoas = [coluna[n_empresas:] for coluna in colunas]
+    gravadas = np.zeros(len(ids_pessoas), dtype=bool)
+    for df in pd.read_sql_query(_SQL_SOCIOS, conBD, chunksize=chunksize):
+        _, socio_pj, hash_pessoa = _chaves_socios(df)
+        linhas = np.flatnonzero(socio_pj < 0)
+        indice = np.searchsorted(ids_pessoas, hash_pessoa[linhas])
+        indice, primeiras = np.unique(indice, return_index=True)
+        novas = ~gravadas[indice]
+        indice, linhas = indice[novas], linhas[primeiras[novas]]
+        gravadas[indice] = True
+        _grava(conBD, sql, zip(df['chave_pessoa'].iloc[linhas].tolist(), [2] * len(linhas),
+                               *(coluna[indice].tolist() for coluna in colunas_pessoas)))
+
+
+def calcula_grupos(conBD, chunksize=CHUNKSIZE):
+    """
+    Calcula os grupos econômicos a partir da tabela socios e grava as tabelas grupos e
+    grupos_tamanho (substituindo as anteriores), com os índices das consultas.
+    Devolve o número de empresas e pessoas gravadas.
+    """
+    inicio = time.perf_counter()
+    print('Calculando grupos econômicos (componentes conexos da rede de sócios)...')
+
+    ids_empresas, ids_pessoas, origem, destino = le_arestas(conBD, chunksize)
+    n_empresas = len(ids_empresas)
+    n = n_empresas + len(ids_pessoas)
+    rotulo = componentes(n, origem, destino)
+    del origem, destino
+
+    # Grupos numerados do maior para o menor, a partir de 1
+    raizes, rotulo = np.unique(rotulo, return_inverse=True)
+    rotulo = rotulo.reshape(-1)
+    nos = np.bincount(rotulo)
+    empresas_grupo = np.bincount(rotulo[:n_empresas], minlength=len(raizes))
+    ordem = np.argsort(-nos, kind='stable')
+    numero = np.empty(len(raizes), dtype=np.int64)
+    numero[ordem] = np.arange(1, len(raizes) + 1)
+    print(f'  {n:,} empresas e pessoas, {len(raizes):,} grupos (maior: {int(nos.max()) if n else 0:,} membros) '
+          f'em {time.perf_counter() - inicio:.1f}s')
+
+    conBD.execute(f'DROP TABLE IF EXISTS {TABELA_GRUPOS}')
+    conBD.execute(f'DROP TABLE IF EXISTS {TABELA_TAMANHOS}')
+    conBD.execute(f'CREATE TABLE {TABELA_GRUPOS} (chave TEXT, tipo_pessoa INTEGER, grupo INTEGER)')
+    conBD.execute(f'CREATE TABLE {TABELA_TAMANHOS} (grupo INTEGER PRIMARY KEY, nos INTEGER, empresas INTEGER)')
+    grava_por_chave(conBD, TABELA_GRUPOS, ids_empresas, ids_pessoas, [numero[rotulo]], chunksize)
+    _grava(conBD, f'INSERT INTO {TABELA_TAMANHOS} VALUES (?, ?, ?)',
+           zip(numero.tolist(), nos.tolist(), empresas_grupo.tolist()))
+    conBD.execute(f'CREATE INDEX ix_grupos_chave ON {TABELA_GRUPOS} (chave)')
+    conBD.execute(f'CREATE INDEX ix_grupos_grupo ON {TABELA_GRUPOS} (grupo, tipo_pessoa, chave)')
+    conBD.commit()
+
+    print(f'Grupos econômicos gravados em {time.perf_counter() - inicio:.1f}s.')
+    return n
+
+
+# --- Consultas ---
+
+def chave(id_pessoa):
+    """
+    Chave de uma empresa ou pessoa na tabela grupos: o cnpj_basico para CNPJs (14 ou
+    8 dígitos) e, para pessoas, o próprio id (CPF mascarado seguido do nome).
+    """
+    if id_pessoa.isdigit() and len(id_pessoa) in (8, 14):
+        return id_pessoa[:8]
+    return id_pessoa
+
+
+def grupo_de(conBD, id_pessoa):
+    """Número do grupo da empresa/pessoa, ou None se ela não tem vínculos (grupo de um só membro)."""
+    linha = conBD.execute(f'SELECT grupo FROM {TABELA_GRUPOS} WHERE chave = ?', (chave(id_pessoa),)).fetchone()
+    return linha[0] if linha else None
+
+
+def tamanho_grupo(conBD, grupo):
+    """(nos, empresas) do grupo: membros no total e quantos são empresas. Grupo None = (1, 1)."""
+    if grupo is None:
+        return 1, 1
+    linha = conBD.execute(f'SELECT nos, empresas FROM {TABELA_TAMANHOS} WHERE grupo = ?', (grupo,)).fetchone()
+    return (linha[0], linha[1]) if linha else (0, 0)
+
+
+def mesmo_grupo(conBD, id_a, id_b):
+    """Se as duas empresas/pessoas estão ligadas por algum caminho de vínculos societários."""
+    if chave(id_a) == chave(id_b):
+        return True
+    grupo_a = grupo_de(conBD, id_a)
+    return grupo_a is not None and grupo_a == grupo_de(conBD, id_b)
+
+
+def membros_grupo(conBD, grupo, limite=None, deslocamento=0):
+    """Membros do grupo (chave, tipo_pessoa), empresas primeiro, em ordem de chave; paginável."""
+    sql = f'SELECT chave, tipo_pessoa FROM {TABELA_GRUPOS} WHERE grupo = ? ORDER BY tipo_pessoa, chave'
+    parametros = [grupo]
+    if limite is not None:
+        sql += ' LIMIT ? OFFSET ?'
+        parametros += [limite, deslocamento]
+    return pd.read_sql_query(sql, conBD, params=parametros)
+
+
+def existe(conBD):
+    """Se os grupos já foram calculados neste banco."""
+    return conBD.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                         (TABELA_TAMANHOS,)).fetchone() is not None
+
+
+def main():
+    if len(sys.argv) != 2:
+        print('Uso: python grupos.py <arquivo .db>')
+        sys.exit(-1)
+    conBD = sqlite3.connect(sys.argv[1])
+    try:
+        calcula_grupos(conBD)
+    finally:
+        conBD.close()
+
+
+if __name__ == '__main__':
+    main()
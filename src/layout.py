@@ -0,0 +1,388 @@
+# -*- encoding: utf-8 -*-
+"""
+Layout de forças (Fruchterman-Reingold) calculado no Python, vetorizado com numpy,
+para a visualização não precisar simular as forças no navegador.
+
+- Multinível: o grafo é engrossado (folhas unidas ao vizinho e emparelhamento de
+  nós adjacentes) até poucos nós; o layout do grafo mais grosso é projetado nos
+  níveis mais finos e refinado com poucas iterações em cada um.
+- Repulsão aproximada como no Barnes-Hut, em uma quadtree de grades regulares:
+  em cada nível da grade, a força sobre as células vem das células bem separadas
+  (filhas das vizinhas da célula-mãe que não são vizinhas da própria célula),
+  pelo centro de massa; na grade mais fina, a repulsão entre nós de células
+  vizinhas é exata. O custo por iteração fica perto de O(n log n).
+
+As posições ficam em unidades da distância ideal entre nós vizinhos (K = 1).
+"""
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Pixels por unidade do layout nas coordenadas gravadas nos nós (x, y).
+ESCALA = 60.0
+
+# Iterações no grafo mais grosso e em cada nível refinado.
+ITERACOES_INICIAIS = 300
+ITERACOES_REFINO = 30
+
+# O engrossamento para com menos nós que isso ou quando reduz menos de 20% dos nós.
+# Componentes com até esse número de nós têm o layout exato, calculados em lote.
+MIN_NOS_ENGROSSAMENTO = 50
+
+# Nós por célula da grade mais fina (em média).
+NOS_POR_CELULA = 2
+
+# Nível de detalhe: a partir desse número de nós, os nós próximos (na mesma célula de
+# lado CELULA_SUPER_NOS, nas unidades do layout) são agrupados em super-nós.
+MIN_NOS_SUPER_NOS = 2000
+CELULA_SUPER_NOS = 8.0
+
+
+def _bem_separadas():
+    """
+    Máscaras 7x7 (deslocamentos de -3 a 3) das células bem separadas, pela paridade
+    (px, py) da célula: as filhas das vizinhas da célula-mãe (deslocamentos de -2-p
+    a 3-p) que não são vizinhas da própria célula.
+    """
+    mascaras = np.zeros((2, 2, 7, 7), dtype=bool)
+    for px in (0, 1):
+        for py in (0, 1):
+            for ox in range(-2 - px, 4 - px):
+                for oy in range(-2 - py, 4 - py):
+                    if abs(ox) > 1 or abs(oy) > 1:
+                        mascaras[px, py, ox + 3, oy + 3] = True
+    return mascaras
+
+
+_BEM_SEPARADAS = _bem_separadas()
+
+
+def _arestas_nao_dirigidas(origem, destino, n):
+    """Pares (a, b) únicos com a < b, sem laços, e o peso (quantidade de arestas) de cada um."""
+    a, b = np.minimum(origem, destino), np.maximum(origem, destino)
+    validas = a != b
+    chaves, peso = np.unique(a[validas] * n + b[validas], return_counts=True)
+    return chaves // n, chaves % n, peso.astype(np.float64)
+
+
+def _engrossa(n, a, b, peso, massa, rng):
+    """
+    Um nível de engrossamento: cada folha (grau 1) é unida ao vizinho e os demais
+    nós são emparelhados com um vizinho livre, em ordem aleatória. Devolve o
+    grupo (nó do grafo grosso) de cada nó e o grafo grosso (n, a, b, peso, massa).
+    """
+    grau = np.bincount(a, minlength=n) + np.bincount(b, minlength=n)
+    representante = np.arange(n)
+    usado = np.zeros(n, dtype=bool)
+
+    folha_a, folha_b = grau[a] == 1, grau[b] == 1
+    # Folha ligada a um nó que não é folha: entra no grupo do vizinho
+    so_b = folha_b & ~folha_a
+    representante[b[so_b]] = a[so_b]
+    so_a = folha_a & ~folha_b
+    representante[a[so_a]] = b[so_a]
+    # Aresta isolada (duas folhas): as duas no mesmo grupo
+    ambas = folha_a & folha_b
+    representante[b[ambas]] = a[ambas]
+    usado[a[so_b | ambas]] = True
+    usado[b[so_a]] = True
+    usado[representante != np.arange(n)] = True
+
+    # Emparelhamento guloso das arestas restantes
+    livres = np.flatnonzero(~usado[a] & ~usado[b])
+    livres_usado = usado.tolist()
+    rep = representante.tolist()
+    lista_a, lista_b = a.tolist(), b.tolist()
+    for e in rng.permutation(livres).tolist():
+        i, j = lista_a[e], lista_b[e]
+        if not livres_usado[i] and not livres_usado[j]:
+            rep[j] = i
+            livres_usado[i] = livres_usado[j] = True
+    representante = np.array(rep, dtype=np.int64)
+
+    raizes = representante == np.arange(n)
+    novo_indice = np.cumsum(raizes) - 1
+    grupo = novo_indice[representante]
+    n_grosso = int(raizes.sum())
+
+    ga, gb = grupo[a], grupo[b]
+    validas = ga != gb
+    ga, gb = np.minimum(ga[validas], gb[validas]), np.maximum(ga[validas], gb[validas])
+    chaves, inverso = np.unique(ga * n_grosso + gb, return_inverse=True)
+    peso_grosso = np.bincount(inverso, weights=peso[validas], minlength=len(chaves))
+    massa_grossa = np.bincount(grupo, weights=massa, minlength=n_grosso)
+    return grupo, (n_grosso, chaves // n_grosso, chaves % n_grosso, peso_grosso, massa_grossa)
+
+
+def _repulsao(pos, massa):
+    """Forças de repulsão (K² m_j / d na direção de j para i) aproximadas pela quadtree de grades."""
+    n = len(pos)
+    forca = np.zeros_like(pos)
+    if n < 2:
+        return forca
+
+    minimo = pos.min(axis=0)
+    lado = max(float((pos.max(axis=0) - minimo).max()), 1e-9) * 1.0001
+    niveis = max(2, math.ceil(math.log(max(n / NOS_POR_CELULA, 1), 4)))
+
+    for nivel in range(2, niveis + 1):
+        s = 2 ** nivel
+        celula_xy = np.minimum(((pos - minimo) / lado * s).astype(np.int64), s - 1)
+        celula = celula_xy[:, 0] * s + celula_xy[:, 1]
+        m = np.bincount(celula, weights=massa, minlength=s * s)
+        ocupada = m > 0
+        cx = np.bincount(celula, weights=massa * pos[:, 0], minlength=s * s)
+        cy = np.bincount(celula, weights=massa * pos[:, 1], minlength=s * s)
+        cx[ocupada] /= m[ocupada]
+        cy[ocupada] /= m[ocupada]
+
+        # Janelas 7x7 em volta de cada célula ocupada (grade com borda de 3 células vazias)
+        ocupadas = np.flatnonzero(ocupada)
+        gx, gy = ocupadas // s, ocupadas % s
+        janelas = []
+        for valores in (m, cx, cy):
+            grade = np.zeros((s + 6, s + 6))
+            grade[3:-3, 3:-3] = valores.reshape(s, s)
+            janelas.append(sliding_window_view(grade, (7, 7))[gx, gy])
+        mt, xt, yt = janelas
+        dx = cx[ocupadas, None, None] - xt
+        dy = cy[ocupadas, None, None] - yt
+        fator = np.where(_BEM_SEPARADAS[gx % 2, gy % 2] & (mt > 0), mt / np.maximum(dx * dx + dy * dy, 1e-9), 0.0)
+        fx = np.zeros(s * s)
+        fy = np.zeros(s * s)
+        fx[ocupadas] = (fator * dx).sum(axis=(1, 2))
+        fy[ocupadas] = (fator * dy).sum(axis=(1, 2))
+        forca[:, 0] += fx[celula]
+        forca[:, 1] += fy[celula]
+
+    # Grade mais fina: repulsão exata entre nós da mesma célula e das células vizinhas
+    ordem = np.argsort(celula, kind='stable')
+    contagem = np.bincount(celula, minlength=s * s)
+    inicio = np.concatenate(([0], np.cumsum(contagem)[:-1]))
+    todos = np.arange(n)
+    for ox in (-1, 0, 1):
+        for oy in (-1, 0, 1):
+            tx, ty = celula_xy[:, 0] + ox, celula_xy[:, 1] + oy
+            validos = (tx >= 0) & (tx < s) & (ty >= 0) & (ty < s)
+            alvo = (tx * s + ty)[validos]
+            qtd = contagem[alvo]
+            total = int(qtd.sum())
+            if not total:
+                continue
+            i = np.repeat(todos[validos], qtd)
+            deslocamento = np.arange(total) - np.repeat(np.cumsum(qtd) - qtd, qtd)
+            j = ordem[np.repeat(inicio[alvo], qtd) + deslocamento]
+            outros = i != j
+            i, j = i[outros], j[outros]
+            dx, dy = pos[i, 0] - pos[j, 0], pos[i, 1] - pos[j, 1]
+            d2 = dx * dx + dy * dy
+            # Nós na mesma posição: empurra em uma direção qualquer
+            juntos = d2 < 1e-12
+            dx[juntos] = 1e-3 * np.cos(i[juntos])
+            dy[juntos] = 1e-3 * np.sin(i[juntos])
+            fator = massa[j] / np.maximum(d2, 1e-6)
+            forca[:, 0] += np.bincount(i, weights=fator * dx, minlength=n)
+            forca[:, 1] += np.bincount(i, weights=fator * dy, minlength=n)
+    return forca
+
+
+def _itera(pos, a, b, peso, repulsao, iteracoes, temperatura):
+    """
+    Iterações do Fruchterman-Reingold: cada nó anda na direção da força (repulsao(pos)
+    mais a atração d² / K nas arestas), limitado pela temperatura, que cai a cada iteração.
+    """
+    n = len(pos)
+    for t in np.linspace(temperatura, temperatura * 0.02, iteracoes):
+        forca = repulsao(pos)
+        d = pos[b] - pos[a]
+        atracao = d * (np.hypot(d[:, 0], d[:, 1]) * peso)[:, None]
+        for eixo in (0, 1):
+            forca[:, eixo] += np.bincount(a, weights=atracao[:, eixo], minlength=n)
+            forca[:, eixo] -= np.bincount(b, weights=atracao[:, eixo], minlength=n)
+        modulo = np.maximum(np.hypot(forca[:, 0], forca[:, 1]), 1e-9)
+        pos += forca * (np.minimum(modulo, t) / modulo)[:, None]
+    return pos
+
+
+def _componentes(n, a, b):
+    """
+    Componente conexo de cada nó (0, 1, ...): cada raiz é ligada à menor raiz vizinha
+    e os rótulos são comprimidos por saltos de ponteiro, até estabilizar.
+    """
+    rotulo = np.arange(n)
+    while True:
+        anterior = rotulo.copy()
+        ra, rb = rotulo[a], rotulo[b]
+        menor = np.minimum(ra, rb)
+        np.minimum.at(rotulo, ra, menor)
+        np.minimum.at(rotulo, rb, menor)
+        while True:
+            saltos = rotulo[rotulo]
+            if np.array_equal(saltos, rotulo):
+                break
+            rotulo = saltos
+        if np.array_equal(rotulo, anterior):
+            return np.unique(rotulo, return_inverse=True)[1].reshape(-1)
+
+
+def _multinivel(n, a, b, peso, iteracoes, rng):
+    """Layout de um componente conexo grande: engrossamento, layout do grafo grosso e refino nível a nível."""
+    massa = np.ones(n)
+    niveis = [(n, a, b, peso, massa)]
+    grupos = []
+    while niveis[-1][0] > MIN_NOS_ENGROSSAMENTO:
+        grupo, grosso = _engrossa(*niveis[-1], rng)
+        if grosso[0] > 0.8 * niveis[-1][0]:
+            break
+        grupos.append(grupo)
+        niveis.append(grosso)
+
+    n_grosso, a, b, peso, massa = niveis[-1]
+    lado = math.sqrt(massa.sum())
+    pos = rng.uniform(-lado / 2, lado / 2, size=(n_grosso, 2))
+    pos = _itera(pos, a, b, peso, lambda p: _repulsao(p, massa), ITERACOES_INICIAIS, lado / 4)
+
+    # Projeta em cada nível mais fino e refina
+    for grupo, (n_nivel, a, b, peso, massa) in zip(reversed(grupos), reversed(niveis[:-1])):
+        pos = pos[grupo] + rng.normal(scale=0.5, size=(n_nivel, 2))
+        pos = _itera(pos, a, b, peso, lambda p, massa=massa: _repulsao(p, massa), iteracoes, 2.0)
+    return pos
+
+
+def _lote_pequenos(tamanhos, a, b, peso, rng):
+    """
+    Layout exato de muitos componentes pequenos de uma vez. Os nós (contíguos, na
+    ordem dos componentes em tamanhos) ficam em uma matriz componentes x maior
+    tamanho, e a repulsão é calculada só entre nós da mesma linha.
+    """
+    n = int(tamanhos.sum())
+    largura = int(tamanhos.max())
+    linha = np.repeat(np.arange(len(tamanhos)), tamanhos)
+    coluna = np.arange(n) - np.repeat(np.cumsum(tamanhos) - tamanhos, tamanhos)
+    existe = np.zeros((len(tamanhos), largura), dtype=bool)
+    existe[linha, coluna] = True
+    par_valido = existe[:, :, None] & existe[:, None, :] & ~np.eye(largura, dtype=bool)
+
+    def repulsao(pos):
+        matriz = np.zeros((len(tamanhos), largura, 2))
+        matriz[linha, coluna] = pos
+        dx = matriz[:, :, None, 0] - matriz[:, None, :, 0]
+        dy = matriz[:, :, None, 1] - matriz[:, None, :, 1]
+        fator = np.where(par_valido, 1.0 / np.maximum(dx * dx + dy * dy, 1e-6), 0.0)
+        return np.stack([(fator * dx).sum(axis=2)[linha, coluna], (fator * dy).sum(axis=2)[linha, coluna]], axis=1)
+
+    raio = np.sqrt(tamanhos)[linha, None]
+    pos = rng.uniform(-1, 1, size=(n, 2)) * raio
+    return _itera(pos, a, b, peso, repulsao, ITERACOES_INICIAIS, math.sqrt(largura) / 2)
+
+
+def _empacota(blocos, margem=2.0):
+    """
+    Desloca os layouts dos componentes (lista de arrays de posições) para lado a lado,
+    em prateleiras, do mais alto para o mais baixo, em uma área aproximadamente quadrada.
+    """
+    minimos = [p.min(axis=0) for p in blocos]
+    medidas = [p.max(axis=0) - minimo + margem for p, minimo in zip(blocos, minimos)]
+    largura_max = max(math.sqrt(sum(w * h for w, h in medidas)) * 1.2, max(w for w, _ in medidas))
+    x = y = altura_linha = 0.0
+    for k in sorted(range(len(blocos)), key=lambda k: -medidas[k][1]):
+        w, h = medidas[k]
+        if x > 0 and x + w > largura_max:
+            x, y, altura_linha = 0.0, y + altura_linha, 0.0
+        blocos[k] += np.array([x, y]) - minimos[k]
+        x += w
+        altura_linha = max(altura_linha, h)
+    return blocos
+
+
+def calcula(n, origem, destino, iteracoes=ITERACOES_REFINO, seed=0):
+    """
+    Posições (array n x 2) dos n nós de um grafo com as arestas origem -> destino
+    (arrays de índices; a direção é ignorada). Cada componente conexo tem o seu
+    layout (os componentes pequenos em lote); os componentes são depois dispostos
+    lado a lado, e os nós isolados, em uma grade.
+    """
+    rng = np.random.default_rng(seed)
+    if n == 0:
+        return np.zeros((0, 2))
+    a, b, peso = _arestas_nao_dirigidas(np.asarray(origem, dtype=np.int64), np.asarray(destino, dtype=np.int64), n)
+    componente = _componentes(n, a, b)
+    tamanho = np.bincount(componente)
+
+    # Nós reordenados por componente: os de cada componente ficam contíguos
+    ordem = np.argsort(componente, kind='stable')
+    posicao = np.empty(n, dtype=np.int64)
+    posicao[ordem] = np.arange(n)
+    inicio = np.concatenate(([0], np.cumsum(tamanho)[:-1]))
+    componente_aresta = componente[a]
+    blocos = []
+
+    for c in np.flatnonzero(tamanho > MIN_NOS_ENGROSSAMENTO):
+        arestas = componente_aresta == c
+        pos = _multinivel(int(tamanho[c]), posicao[a[arestas]] - inicio[c], posicao[b[arestas]] - inicio[c],
+                          peso[arestas], iteracoes, rng)
+        blocos.append((ordem[inicio[c]:inicio[c] + tamanho[c]], [pos]))
+
+    # Componentes pequenos em lotes de tamanho parecido (até o dobro), para a matriz do lote ter pouca sobra
+    pequenos = np.flatnonzero((tamanho > 1) & (tamanho <= MIN_NOS_ENGROSSAMENTO))
+    faixas = np.ceil(np.log2(tamanho[pequenos])).astype(np.int64)
+    for faixa in np.unique(faixas):
+        lote = pequenos[faixas == faixa]
+        nos = np.concatenate([ordem[inicio[c]:inicio[c] + tamanho[c]] for c in lote])
+        local = np.empty(n, dtype=np.int64)
+        local[nos] = np.arange(len(nos))
+        arestas = np.isin(componente_aresta, lote)
+        pos = _lote_pequenos(tamanho[lote], local[a[arestas]], local[b[arestas]], peso[arestas], rng)
+        limites = np.cumsum(tamanho[lote])[:-1]
+        blocos.append((nos, np.split(pos, limites)))
+
+    # Nós isolados: uma grade
+    isolados = ordem[np.isin(componente[ordem], np.flatnonzero(tamanho == 1))]
+    if len(isolados):
+        colunas = math.ceil(math.sqrt(len(isolados)))
+        grade = np.stack([np.arange(len(isolados)) % colunas, np.arange(len(isolados)) // colunas], axis=1) * 1.5
+        blocos.append((isolados, [grade.astype(np.float64)]))
+
+    layouts = _empacota([p for _, partes in blocos for p in partes])
+    resultado = np.zeros((n, 2))
+    resultado[np.concatenate([nos for nos, _ in blocos])] = np.concatenate(layouts)
+    return resultado
+
+
+def super_nos(ids, pos, graus, celula=CELULA_SUPER_NOS):
+    """
+    Agrupa os nós pelas células de uma grade de lado `celula` (nas unidades do layout)
+    para o nível de detalhe da visualização: cada grupo vira um super-nó com o centro,
+    a quantidade de nós e o id do nó de maior grau, usado como rótulo.
+    """
+    if not len(ids):
+        return []
+    chave = np.floor(pos / celula).astype(np.int64)
+    _, grupo = np.unique(chave, axis=0, return_inverse=True)
+    grupo = grupo.reshape(-1)
+    contagem = np.bincount(grupo)
+    centro = np.stack([np.bincount(grupo, weights=pos[:, k]) / contagem for k in (0, 1)], axis=1)
+    # Nó de maior grau de cada grupo: ordena por (grupo, grau) e pega o último de cada grupo
+    ordem = np.lexsort((graus, grupo))
+    ultimos = ordem[np.cumsum(contagem) - 1]
+    return [{'x': round(float(x) * ESCALA, 1), 'y': round(float(y) * ESCALA, 1), 'n': int(qtd), 'principal': ids[i]}
+            for (x, y), qtd, i in zip(centro, contagem, ultimos)]
+
+
+def aplica(G, iteracoes=ITERACOES_REFINO, seed=0, celula_super_nos=CELULA_SUPER_NOS):
+    """
+    Calcula o layout do Grafo e grava as coordenadas (em pixels) nos atributos x e y
+    dos nós; G.graph['layout'] passa a True. Em grafos com MIN_NOS_SUPER_NOS nós ou
+    mais, G.graph['super_nos'] recebe os super-nós (ver super_nos) usados pela
+    visualização quando a rede é vista de longe.
+    """
+    ids, origem, destino = G.arrays()
+    pos = calcula(len(ids), origem, destino, iteracoes=iteracoes, seed=seed)
+    for id_no, (x, y) in zip(ids, (pos * ESCALA).round(1).tolist()):
+        G.nodes[id_no].update({'x': x, 'y': y})
+    G.graph['layout'] = True
+    if celula_super_nos and len(ids) >= MIN_NOS_SUPER_NOS:
+        graus = np.bincount(origem, minlength=len(ids)) + np.bincount(destino, minlength=len(ids))
+        G.graph['super_nos'] = super_nos(ids, pos, graus, celula_super_nos)
+    return pos
@@ -0,0 +1,192 @@
+# -*- encoding: utf-8 -*-
+"""
+Métricas por etapa da carga (cnpj.py e cnpj_sql.py).
+
+Cada etapa (descompressão, leitura do CSV, conversão de tipos, CNAEs
+secundários, escrita no banco, criação de índices...) acumula, por tabela,
+o tempo gasto, o número de chamadas, as linhas e os bytes processados. As
+filas (ex: arquivos aguardando um escritor na carga paralela) registram a
+profundidade atual, máxima e média.
+
+Ao final, as métricas podem ser gravadas em um relatório JSON e, opcionalmente,
+em um arquivo texto no formato do Prometheus (para o textfile collector do
+node_exporter).
+
+Uso:
+    metricas = Metricas(rotulos={'script': 'cnpj.py'})
+    with metricas.etapa('escrita', 'empresas') as span:
+        chunk.to_sql(...)
+        span.linhas = len(chunk)
+    metricas.grava_json('relatorio.json')
+    metricas.grava_prometheus('cnpj.prom')
+"""
+import os
+import json
+import time
+import datetime
+import threading
+import contextlib
+
+
+class Span:
+    """Linhas e bytes processados dentro de um `with metricas.etapa(...)`."""
+
+    def __init__(self):
+        self.linhas = 0
+        self.bytes = 0
+
+
+class Metricas:
+    """Acumulador de tempos e volumes por etapa e tabela. Pode ser usado por várias threads."""
+
+    def __init__(self, prefixo='cnpj_carga', rotulos=None):
+        self.prefixo = prefixo
+        self.rotulos = rotulos or {}
+        self.inicio = time.time()
+        self._lock = threading.Lock()
+        # (etapa, tabela) -> [segundos, chamadas, linhas, bytes]
+        self._etapas = {}
+        # fila -> [atual, máxima, soma das amostras, amostras]
+        self._filas = {}
+
+    def registra(self, etapa, tabela='', segundos=0.0, linhas=0, n_bytes=0):
+        """Acumula uma medição feita fora de um span (ex: DecompressionStats)."""
+        with self._lock:
+            acumulado = self._etapas.setdefault((etapa, tabela), [0.0, 0, 0, 0])
+            acumulado[0] += segundos
+            acumulado[1] += 1
+            acumulado[2] += linhas
+            acumulado[3] += n_bytes
+
+    @contextlib.contextmanager
+    def etapa(self, etapa, tabela=''):
+        """Mede o tempo do bloco; linhas e bytes são informados no Span retornado."""
+        span = Span()
+        inicio = time.perf_counter()
+        try:
+            yield span
+        finally:
+            self.registra(etapa, tabela, time.perf_counter() - inicio, span.linhas, span.bytes)
+
+    def ajusta_fila(self, fila, delta):
+        """Soma delta à profundidade de uma fila e registra a amostra."""
+        with self._lock:
+            estado = self._filas.setdefault(fila, [0, 0, 0, 0])
+            estado[0] += delta
+            estado[1] = max(estado[1], estado[0])
+            estado[2] += estado[0]
+            estado[3] += 1
+
+    def relatorio(self):
+        """Relatório da execução: totais por etapa/tabela, taxas e filas."""
+        with self._lock:
+            etapas = [
+                {'etapa': etapa, 'tabela': tabela, 'segundos': round(segundos, 3), 'chamadas': chamadas,
+                 'linhas': linhas, 'bytes': n_bytes,
+                 'linhas_por_s': round(linhas / segundos, 1) if segundos and linhas else None,
+                 'mb_por_s': round(n_bytes / segundos / 1e6, 2) if segundos and n_bytes else None}
+                for (etapa, tabela), (segundos, chamadas, linhas, n_bytes) in sorted(self._etapas.items())
+            ]
+            filas = {fila: {'atual': atual, 'maxima': maxima,
+                            'media': round(soma / amostras, 2) if amostras else 0}
+                     for fila, (atual, maxima, soma, amostras) in sorted(self._filas.items())}
+
+        return {'inicio': datetime.datetime.fromtimestamp(self.inicio).isoformat(timespec='seconds'),
+                'duracao_s': round(time.time() - self.inicio, 3),
+                'rotulos': self.rotulos, 'etapas': etapas, 'filas': filas}
+
+    def imprime(self):
+        """Resumo das etapas, da mais demorada para a mais rápida."""
+        relatorio = self.relatorio()
+        print(f'Tempo por etapa (total da execução: {relatorio["duracao_s"]:,.1f}s):')
+        for e in sorted(relatorio['etapas'], key=lambda e: e['segundos'], reverse=True):
+            taxa = f'{e["linhas_por_s"]:>12,.0f} linhas/s' if e['linhas_por_s'] else ' ' * 21
+            mb = f'{e["mb_por_s"]:>8,.1f} MB/s' if e['mb_por_s'] else ''
+            print(f'  {e["etapa"]:<20} {e["tabela"]:<20} {e["segundos"]:>10,.2f}s {taxa} {mb}')
+        for fila, estado in relatorio['filas'].items():
+            print(f'  fila {fila}: máxima {estado["maxima"]}, média {estado["media"]}')
+
+    def grava_json(self, caminho):
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump(self.relatorio(), f, indent=2, ensure_ascii=False)
+
+    def _rotulos(self, **extras):
+        rotulos = dict(self.rotulos, **extras)
+        texto = ','.join(f'{k}="{_escapa_rotulo(v)}"' for k, v in rotulos.items())
+        return '{' + texto + '}' if texto else ''
+
+    def grava_prometheus(self, caminho):
+        """
+        Grava as métricas no formato texto do Prometheus. O arquivo é escrito em
+        um temporário e renomeado, para que o coletor nunca leia um arquivo pela metade.
+        """
+        relatorio = self.relatorio()
+        p = self.prefixo
+        linhas = [
+            f'# HELP {p}_etapa_segundos_total Tempo gasto em cada etapa da carga.',
+            f'# TYPE {p}_etapa_segundos_total counter',
+        ]
+        linhas += [f'{p}_etapa_segundos_total{self._rotulos(etapa=e["etapa"], tabela=e["tabela"])} {e["segundos"]}'
+                   for e in relatorio['etapas']]
+        linhas += [f'# HELP {p}_etapa_chamadas_total Número de execuções de cada etapa.',
+                   f'# TYPE {p}_etapa_chamadas_total counter']
+        linhas += [f'{p}_etapa_chamadas_total{self._rotulos(etapa=e["etapa"], tabela=e["tabela"])} {e["chamadas"]}'
+                   for e in relatorio['etapas']]
+        linhas += [f'# HELP {p}_linhas_total Linhas processadas em cada etapa.',
+                   f'# TYPE {p}_linhas_total counter']
+        linhas += [f'{p}_linhas_total{self._rotulos(etapa=e["etapa"], tabela=e["tabela"])} {e["linhas"]}'
+                   for e in relatorio['etapas'] if e['linhas']]
+        linhas += [f'# HELP {p}_bytes_total Bytes processados em cada etapa.',
+                   f'# TYPE {p}_bytes_total counter']
+        linhas += [f'{p}_bytes_total{self._rotulos(etapa=e["etapa"], tabela=e["tabela"])} {e["bytes"]}'
+                   for e in relatorio['etapas'] if e['bytes']]
+        linhas += [f'# HELP {p}_fila_profundidade_maxima Maior profundidade observada de cada fila.',
+                   f'# TYPE {p}_fila_profundidade_maxima gauge']
+        linhas += [f'{p}_fila_profundidade_maxima{self._rotulos(fila=fila)} {estado["maxima"]}'
+                   for fila, estado in relatorio['filas'].items()]
+        linhas += [f'# HELP {p}_duracao_segundos Duração total da execução.',
+                   f'# TYPE {p}_duracao_segundos gauge',
+                   f'{p}_duracao_segundos{self._rotulos()} {relatorio["duracao_s"]}',
+                   f'# HELP {p}_inicio_timestamp_segundos Início da execução (epoch).',
+                   f'# TYPE {p}_inicio_timestamp_segundos gauge',
+                   f'{p}_inicio_timestamp_segundos{self._rotulos()} {self.inicio:.0f}']
+
+        temporario = caminho + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(linhas) + '\n')
+        os.replace(temporario, caminho)
+
+
+def _escapa_rotulo(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def le_chunks(reader, metricas, tabela, stats=None):
+    """
+    Itera os chunks de um pd.read_csv(chunksize=...) registrando, para cada um,
+    o tempo de leitura do CSV e, se houver um DecompressionStats (novo, criado
+    para o arquivo), a parte desse tempo gasta na descompressão.
+    """
+    # O pd.read_csv já lê o primeiro bloco ao ser criado: os contadores do
+    # DecompressionStats partem de zero, e não do valor no primeiro chunk.
+    segundos_antes = descomprimidos_antes = 0
+    iterador = iter(reader)
+    while True:
+        inicio = time.perf_counter()
+        chunk = next(iterador, None)
+        segundos = time.perf_counter() - inicio
+
+        n_bytes = 0
+        if stats is not None:
+            segundos_descompressao = stats.seconds - segundos_antes
+            n_bytes = stats.uncompressed_bytes - descomprimidos_antes
+            if n_bytes:
+                metricas.registra('descompressao', tabela, segundos_descompressao, n_bytes=n_bytes)
+            segundos = max(0.0, segundos - segundos_descompressao)
+            segundos_antes, descomprimidos_antes = stats.seconds, stats.uncompressed_bytes
+
+        if chunk is None:
+            break
+
+        metricas.registra('leitura_csv', tabela, segundos, len(chunk), n_bytes)
+        yield chunk
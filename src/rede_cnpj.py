@@ -1,30 +1,298 @@
+import time
+
 import pandas as pd
-import networkx as nx
-from networkx.readwrite import json_graph
+
+import centralidade
+import compartilhados
+import exporta
+import layout
+from grafo import Grafo
+
+# Colunas de socios lidas na expansão da rede; as demais são lidas na hidratação.
+COLUNAS_CHAVE_SOCIOS = ['cnpj_basico', 'identificador_socio', 'cnpj_cpf_socio', 'nome_socio_razao_social']
+
+# Parâmetros por consulta na hidratação (limite de parâmetros do SQLite: 999).
+TAMANHO_LOTE_HIDRATACAO = 900
+
+
+def _codigos(valores, descricao):
+    """Códigos de qualificação ou de situação cadastral com 2 dígitos, ordenados; None = sem filtro ('TODAS')."""
+    if valores is None or valores == 'TODAS':
+        return None
+    codigos = tuple(sorted({str(v).strip().zfill(2) for v in valores}))
+    invalidos = [c for c in codigos if not (c.isdigit() and len(c) == 2)]
+    if invalidos:
+        raise ValueError(f'Códigos de {descricao} inválidos: {", ".join(invalidos)}')
+    return codigos or None
+
+
+def _filtro(coluna, codigos):
+    """Condição ' AND coluna IN (...)' com os códigos já validados, ou '' sem filtro."""
+    if not codigos:
+        return ''
+    return f" AND {coluna} IN ({', '.join(repr(c) for c in codigos)})"
+
 
 class RedeCNPJ:
     """
     Classe para construção e manipulação de uma rede de CNPJs (empresas e sócios)
     a partir de um banco de dados gerado pelo script cnpj.py.
+
+    Além da profundidade (nivel_max), a expansão pode ser limitada pelo número de
+    nós, de arestas e de consultas SQL e por um tempo máximo em segundos (None =
+    sem limite). Ao atingir um limite, a expansão para, a rede fica com o que já foi
+    montado e `truncado` passa a True (o limite atingido fica em `motivo_truncamento`).
+    Com grau_hub, empresas e pessoas com mais vínculos que isso (ex: companhias
+    abertas com milhares de acionistas) entram na rede, mas não são expandidas.
+    Se a tabela centralidade existir (centralidade.py), os vínculos de cada nó são
+    conhecidos antes das consultas: hubs e nós sem sócios ou sem participações não
+    são consultados.
+    Com compartilhados (tipos de compartilhados.TIPOS, com a tabela calculada),
+    empresas com o mesmo endereço, telefone ou e-mail também são ligadas (arestas
+    mesmo_endereco, mesmo_telefone e mesmo_email) e expandidas.
+    qualificacoes (códigos de qualificacao_socio, ex: as chaves de config.QUALIFICACOES)
+    e situacoes (códigos de situacao_cadastral, ex: ['02'] = só ativas) restringem os
+    vínculos seguidos ('TODAS' ou None = sem filtro). Os filtros entram nas próprias
+    consultas da expansão: sócios com outra qualificação e empresas em outra situação
+    não são lidos nem expandidos. A origem da consulta entra sempre.
+
+    A rede é montada em duas fases: a expansão lê apenas as colunas-chave, e os
+    demais atributos dos nós PJ (estabelecimentos) e das arestas (socios) são lidos
+    em lote, na primeira saída gerada (ou em hidrata()). colunas_nos e
+    colunas_arestas restringem as colunas lidas (None = todas; [] = nenhuma, só a
+    topologia).
     """
-    def __init__(self, conBD, nivel_max=1, qualificacoes='TODAS'):
+    def __init__(self, conBD, nivel_max=1, qualificacoes='TODAS', max_nos=None, max_arestas=None,
+                 max_consultas=None, tempo_max=None, grau_hub=None, colunas_nos=None, colunas_arestas=None,
+                 compartilhados=None, situacoes=None):
         self.__conBD = conBD
         self.__nivel_max = nivel_max
-        self.__qualificacoes = qualificacoes
-        self.G = nx.DiGraph()
+        self.__qualificacoes = _codigos(qualificacoes, 'qualificação')
+        self.__situacoes = _codigos(situacoes, 'situação cadastral')
+        self.__max_nos = max_nos
+        self.__max_arestas = max_arestas
+        self.__max_consultas = max_consultas
+        self.__tempo_max = tempo_max
+        self.__grau_hub = grau_hub
+        self.__prazo = None
+        self.__consultas = 0
+        # Consultas SQL e arestas incluídas a partir dos nós de cada nível
+        self.__consultas_nivel = {}
+        self.__arestas_nivel = {}
+        self.truncado = False
+        self.motivo_truncamento = None
+        self.__colunas_tabelas = {}
+        self.__colunas_nos = self._projecao('estabelecimentos', colunas_nos)
+        self.__colunas_arestas = self._projecao('socios', colunas_arestas)
+        # Nós PJ e arestas incluídos desde a última hidratação (dict como conjunto ordenado)
+        self.__nos_pendentes = {}
+        self.__arestas_pendentes = {}
+        # Grafo compacto (grafo.py); as exportações são gravadas direto dele (exporta.py)
+        self.G = Grafo()
+        # Com a centralidade calculada (centralidade.py), os vínculos pré-calculados de
+        # cada nó evitam as consultas sem resultado e, com grau_hub, as dos hubs
+        self.__usa_centralidade = centralidade.existe(conBD)
+        self.__vinculos_previos = {}
+        self.__compartilhados = self._tipos_compartilhados(compartilhados)
+        # Condições dos filtros nas consultas de sócios (socios) e de participações (socios s
+        # JOIN estabelecimentos e da matriz); sócios PJ são filtrados pelo próprio estabelecimento
+        self.__filtro_socios = _filtro('qualificacao_socio', self.__qualificacoes)
+        if self.__situacoes:
+            self.__filtro_socios += (
+                " AND (identificador_socio <> '1' OR EXISTS (SELECT 1 FROM estabelecimentos e "
+                "WHERE e.cnpj_basico = substr(socios.cnpj_cpf_socio, 1, 8) "
+                "AND e.cnpj_ordem = substr(socios.cnpj_cpf_socio, 9, 4) "
+                "AND e.cnpj_dv = substr(socios.cnpj_cpf_socio, 13, 2)"
+                f"{_filtro('e.situacao_cadastral', self.__situacoes)}))")
+        self.__filtro_participacoes = (_filtro('e.situacao_cadastral', self.__situacoes),
+                                       _filtro('s.qualificacao_socio', self.__qualificacoes))
 
     def _get_full_cnpj(self, row):
         """Monta o CNPJ completo a partir das partes."""
         return f"{row['cnpj_basico']}{row['cnpj_ordem']}{row['cnpj_dv']}"
 
+    def colunas_tabela(self, tabela):
+        if tabela not in self.__colunas_tabelas:
+            colunas = pd.read_sql_query(f'SELECT * FROM {tabela} LIMIT 0', self.__conBD).columns
+            self.__colunas_tabelas[tabela] = list(colunas)
+        return self.__colunas_tabelas[tabela]
+
+    def _projecao(self, tabela, colunas):
+        """Colunas da tabela a hidratar: todas (None) ou as informadas, que precisam existir na tabela."""
+        existentes = self.colunas_tabela(tabela)
+        if colunas is None:
+            return existentes
+        desconhecidas = [c for c in colunas if c not in existentes]
+        if desconhecidas:
+            raise ValueError(f'Colunas inexistentes na tabela {tabela}: {", ".join(desconhecidas)}')
+        return list(colunas)
+
+    def _tipos_compartilhados(self, tipos):
+        """Tipos de atributo compartilhado a seguir na expansão; exige a tabela de compartilhados.py."""
+        tipos = tuple(tipos or ())
+        desconhecidos = [t for t in tipos if t not in compartilhados.TIPOS]
+        if desconhecidos:
+            raise ValueError(f'Tipos de atributo compartilhado inválidos: {", ".join(desconhecidos)} '
+                             f'(opções: {", ".join(compartilhados.TIPOS)})')
+        if tipos and not compartilhados.existe(self.__conBD):
+            raise ValueError('Atributos compartilhados não calculados nesta base (execute compartilhados.py).')
+        return tipos
+
+    def _le_lotes(self, tabela, colunas, colunas_chave, chaves):
+        """
+        Linhas da tabela cujas colunas_chave estão entre as chaves (tuplas) informadas, em
+        consultas de até TAMANHO_LOTE_HIDRATACAO parâmetros. Com a chave completa, cada nó
+        lê só o seu estabelecimento (e não todas as filiais do cnpj_basico).
+        """
+        chaves = list(chaves)
+        por_consulta = TAMANHO_LOTE_HIDRATACAO // len(colunas_chave)
+        linha_valores = f"({', '.join('?' * len(colunas_chave))})"
+        for inicio in range(0, len(chaves), por_consulta):
+            lote = chaves[inicio:inicio + por_consulta]
+            query = (f"SELECT {', '.join(colunas)} FROM {tabela} WHERE ({', '.join(colunas_chave)}) "
+                     f"IN (VALUES {', '.join([linha_valores] * len(lote))})")
+            df = pd.read_sql_query(query, self.__conBD, params=[v for chave in lote for v in chave])
+            # Colunas só com nulos no lote viriam como NaN: mantém None, como na leitura linha a linha
+            yield from df.astype(object).where(df.notna(), None).to_dict('records')
+
+    def hidrata(self, apenas=None):
+        """
+        Lê, em lote, os atributos dos nós PJ e das arestas incluídos na rede desde a última
+        hidratação. Com apenas (ids de nós), só os desses nós PJ; o restante continua pendente.
+        """
+        if apenas is not None:
+            nos = [n for n in apenas if n in self.__nos_pendentes and n in self.G]
+            for n in nos:
+                del self.__nos_pendentes[n]
+            self._hidrata_nos(nos)
+            return
+        nos, self.__nos_pendentes = [n for n in self.__nos_pendentes if n in self.G], {}
+        self._hidrata_nos(nos)
+
+        arestas, self.__arestas_pendentes = [a for a in self.__arestas_pendentes if self.G.has_edge(*a)], {}
+        colunas_extras = [c for c in self.__colunas_arestas if c not in COLUNAS_CHAVE_SOCIOS]
+        # Só as arestas de sócios vêm da tabela socios (as de atributos compartilhados não têm o que hidratar)
+        arestas = [a for a in arestas if self.G.edges[a].get('tipo') == 'socio']
+        if arestas and colunas_extras:
+            chaves = ['cnpj_basico', 'cnpj_cpf_socio', 'nome_socio_razao_social']
+            atributos_arestas = [self.G.edges[a] for a in arestas]
+            por_chave = {}
+            pares = dict.fromkeys((atributos['cnpj_basico'], atributos['cnpj_cpf_socio']) for atributos in atributos_arestas)
+            for linha in self._le_lotes('socios', chaves + colunas_extras, ['cnpj_basico', 'cnpj_cpf_socio'], pares):
+                por_chave[tuple(linha[c] for c in chaves)] = linha
+            for atributos in atributos_arestas:
+                linha = por_chave.get(tuple(atributos[c] for c in chaves))
+                if linha is not None:
+                    atributos.update({c: linha[c] for c in colunas_extras})
+
+    def _hidrata_nos(self, nos):
+        """Atributos, lidos de estabelecimentos, dos nós PJ informados."""
+        if nos:
+            colunas = list(dict.fromkeys(['cnpj_basico', 'cnpj_ordem', 'cnpj_dv', 'nome_fantasia'] + self.__colunas_nos))
+            por_cnpj = {}
+            for linha in self._le_lotes('estabelecimentos', colunas, ['cnpj_basico', 'cnpj_ordem', 'cnpj_dv'],
+                                        ((cnpj[:8], cnpj[8:12], cnpj[12:]) for cnpj in nos)):
+                por_cnpj[linha['cnpj_basico'] + linha['cnpj_ordem'] + linha['cnpj_dv']] = linha
+            for cnpj in nos:
+                linha = por_cnpj.get(cnpj)
+                if linha is not None:
+                    atributos = self.G.nodes[cnpj]
+                    atributos.update({c: linha[c] for c in self.__colunas_nos})
+                    atributos['nome'] = linha.get('nome_fantasia') or linha.get('razao_social', 'N/A')
+
+    def _inicia_prazo(self):
+        """O tempo máximo conta a partir da primeira inserção na rede."""
+        if self.__tempo_max is not None and self.__prazo is None:
+            self.__prazo = time.monotonic() + self.__tempo_max
+
+    def _dentro_dos_limites(self, novos_nos=0, limites_expansao=True):
+        """
+        Verifica se a rede comporta mais `novos_nos` nós e, se limites_expansao, se
+        os limites de consultas SQL e de tempo não foram atingidos. Ao atingir um
+        limite, marca a rede como truncada.
+        """
+        motivo = None
+        if self.__max_nos is not None and self.G.number_of_nodes() + novos_nos > self.__max_nos:
+            motivo = 'max_nos'
+        elif self.__max_arestas is not None and self.G.number_of_edges() >= self.__max_arestas:
+            motivo = 'max_arestas'
+        elif limites_expansao and self.__max_consultas is not None and self.__consultas >= self.__max_consultas:
+            motivo = 'max_consultas'
+        elif limites_expansao and self.__prazo is not None and time.monotonic() > self.__prazo:
+            motivo = 'tempo_max'
+
+        if motivo is not None and not self.truncado:
+            self.truncado = True
+            self.motivo_truncamento = motivo
+        return motivo is None
+
+    def _le_sql(self, query, nivel, params=None):
+        self.__consultas += 1
+        self.__consultas_nivel[nivel] = self.__consultas_nivel.get(nivel, 0) + 1
+        return pd.read_sql_query(query, self.__conBD, params=params)
+
+    def _adiciona_aresta(self, origem, destino, nivel, **atributos):
+        """
+        Inclui a aresta se couber nos limites. Nós ainda fora da rede (ex: além do
+        nível máximo) contam no limite de nós e, com a rede truncada, não entram mais.
+        """
+        novos_nos = (origem not in self.G) + (destino not in self.G)
+        if self.truncado and novos_nos:
+            return
+        if not self.G.has_edge(origem, destino) and not self._dentro_dos_limites(novos_nos, limites_expansao=False):
+            return
+        self.G.add_edge(origem, destino, **atributos)
+        self.__arestas_pendentes[(origem, destino)] = None
+        self.__arestas_nivel[nivel] = self.__arestas_nivel.get(nivel, 0) + 1
+
+    def _eh_hub(self, id_node, nivel, n_vinculos):
+        """Marca o nó como hub não expandido se tiver mais vínculos que grau_hub. A origem é sempre expandida."""
+        if self.__grau_hub is None or nivel == 0 or n_vinculos <= self.__grau_hub:
+            return False
+        self.G.nodes[id_node]['hub'] = True
+        self.G.nodes[id_node]['vinculos_nao_expandidos'] = self.G.nodes[id_node].get('vinculos_nao_expandidos', 0) + n_vinculos
+        return True
+
+    def _vinculos_previos(self, id_node, nivel, tipo_pessoa=1):
+        """
+        Linhas de socios (sócios e participações) do nó, pela tabela centralidade; None sem
+        a tabela. Pessoas sempre têm participações: só são consultadas para achar hubs.
+        """
+        if not self.__usa_centralidade or (tipo_pessoa == 2 and self.__grau_hub is None):
+            return None
+        if id_node not in self.__vinculos_previos:
+            self.__consultas += 1
+            self.__consultas_nivel[nivel] = self.__consultas_nivel.get(nivel, 0) + 1
+            # Fora da tabela = sem nenhum vínculo
+            self.__vinculos_previos[id_node] = (centralidade.do_no(self.__conBD, id_node)
+                                                or {'socios': 0, 'participacoes': 0})
+        return self.__vinculos_previos[id_node]
+
+    def estatisticas_niveis(self):
+        """Por nível: nós na rede, hubs não expandidos e arestas e consultas SQL feitas a partir dos nós do nível."""
+        estatisticas = {}
+        for _, dados in self.G.nodes(data=True):
+            # Nós criados apenas por arestas ficam além do nível máximo
+            nivel = dados.get('nivel', self.__nivel_max + 1)
+            e = estatisticas.setdefault(nivel, {'nos': 0, 'hubs': 0, 'arestas': 0, 'consultas': 0})
+            e['nos'] += 1
+            e['hubs'] += int(bool(dados.get('hub')))
+        for nivel in set(self.__arestas_nivel) | set(self.__consultas_nivel):
+            e = estatisticas.setdefault(nivel, {'nos': 0, 'hubs': 0, 'arestas': 0, 'consultas': 0})
+            e['arestas'] = self.__arestas_nivel.get(nivel, 0)
+            e['consultas'] = self.__consultas_nivel.get(nivel, 0)
+        return dict(sorted(estatisticas.items()))
+
     def insere_pessoa(self, tipo_pessoa, id_pessoa):
         """Inicia a busca na rede a partir de uma pessoa (física ou jurídica)."""
+        self._inicia_prazo()
         self._explorar_vinculos(tipo_pessoa=tipo_pessoa, id_pessoa=id_pessoa)
 
     def insere_com_cpf_ou_nome(self, cpf='', nome=''):
         """Busca sócios por CPF ou nome e os adiciona à rede."""
         if not cpf and not nome:
             return
+        self._inicia_prazo()
 
         query = "SELECT DISTINCT identificador_socio, cnpj_cpf_socio, nome_socio_razao_social FROM socios WHERE"
         if cpf:
@@ -32,7 +300,7 @@ class RedeCNPJ:
         else:
             query += f" nome_socio_razao_social = '{nome}'"
         
-        df_socios = pd.read_sql_query(query, self.__conBD)
+        df_socios = self._le_sql(query, 0)
         if df_socios.empty:
             print(f'Nenhum sócio encontrado com os dados informados (CPF: {cpf}, Nome: {nome})')
             return
@@ -52,14 +320,15 @@ class RedeCNPJ:
 
         id_node = id_pessoa if tipo_pessoa == 1 else id_pessoa[0] + id_pessoa[1]
 
-        if id_node in self.G and self.G.nodes[id_node]['nivel'] <= nivel:
+        # Nós criados apenas por add_edge (além do nível máximo) ainda não têm 'nivel'
+        if id_node in self.G and self.G.nodes[id_node].get('nivel', self.__nivel_max + 1) <= nivel:
+            return
+
+        if self.truncado or not self._dentro_dos_limites(novos_nos=int(id_node not in self.G)):
             return
 
         # Adiciona ou atualiza o nó no grafo
-        if id_node not in self.G:
-            self.G.add_node(id_node, nivel=nivel, tipo_pessoa=tipo_pessoa)
-        else:
-            self.G.nodes[id_node]['nivel'] = nivel
+        self.G.add_node(id_node, nivel=nivel, tipo_pessoa=tipo_pessoa)
 
         if tipo_pessoa == 1: # Pessoa Jurídica
             self._processar_pj(id_node, nivel, origem)
@@ -68,30 +337,39 @@ class RedeCNPJ:
 
     def _processar_pj(self, cnpj, nivel, origem):
         """Processa os vínculos de uma Pessoa Jurídica."""
-        # Adiciona dados do estabelecimento
+        # Só verifica se o estabelecimento existe (consulta coberta pelo índice);
+        # os dados dele são lidos depois, em lote, na hidratação
         cnpj_basico = cnpj[:8]
         cnpj_ordem = cnpj[8:12]
         cnpj_dv = cnpj[12:]
-        query_estabelecimento = f"SELECT * FROM estabelecimentos WHERE cnpj_basico = '{cnpj_basico}' AND cnpj_ordem = '{cnpj_ordem}' AND cnpj_dv = '{cnpj_dv}'"
-        df_est = pd.read_sql_query(query_estabelecimento, self.__conBD)
+        query_estabelecimento = f"SELECT cnpj_basico FROM estabelecimentos WHERE cnpj_basico = '{cnpj_basico}' AND cnpj_ordem = '{cnpj_ordem}' AND cnpj_dv = '{cnpj_dv}'"
+        df_est = self._le_sql(query_estabelecimento, nivel)
 
         if df_est.empty:
             print(f"Dados do estabelecimento não encontrados para o CNPJ: {cnpj}")
             return
 
-        est_data = df_est.iloc[0].to_dict()
-        self.G.nodes[cnpj].update(est_data)
-        self.G.nodes[cnpj]['nome'] = est_data.get('nome_fantasia') or est_data.get('razao_social', 'N/A')
+        self.__nos_pendentes[cnpj] = None
 
-        # Busca sócios da empresa
-        query_socios = f"SELECT * FROM socios WHERE cnpj_basico = '{cnpj_basico}'"
-        df_socios = pd.read_sql_query(query_socios, self.__conBD)
-        for _, socio in df_socios.iterrows():
-            self._adicionar_vinculo_socio(socio, cnpj, nivel, origem)
+        # Busca sócios da empresa (se tiver e não for um hub já conhecido pela centralidade)
+        previos = self._vinculos_previos(cnpj, nivel)
+        if previos is None or (previos['socios'] and not self._eh_hub(cnpj, nivel, previos['socios'])):
+            query_socios = (f"SELECT {', '.join(COLUNAS_CHAVE_SOCIOS)} FROM socios "
+                            f"WHERE cnpj_basico = '{cnpj_basico}'{self.__filtro_socios}")
+            df_socios = self._le_sql(query_socios, nivel)
+            if not self._eh_hub(cnpj, nivel, len(df_socios)):
+                for _, socio in df_socios.iterrows():
+                    if self.truncado:
+                        return
+                    self._adicionar_vinculo_socio(socio, cnpj, nivel, origem)
 
         # Busca empresas em que esta PJ é sócia
         self._buscar_participacoes_societarias(1, cnpj, nivel, origem)
 
+        # Busca empresas com o mesmo endereço, telefone ou e-mail
+        if self.__compartilhados and not self.truncado:
+            self._buscar_compartilhados(cnpj, nivel)
+
     def _processar_pf(self, id_node, id_pessoa, nivel, origem):
         """Processa os vínculos de uma Pessoa Física."""
         cpf, nome = id_pessoa
@@ -103,23 +381,48 @@ class RedeCNPJ:
         # Determina o identificador do nó de origem (source) na rede
         source_node = id_pessoa if tipo_pessoa == 1 else (id_pessoa[0] + id_pessoa[1])
 
+        previos = self._vinculos_previos(source_node, nivel, tipo_pessoa)
+        if previos is not None and (not previos['participacoes'] or self._eh_hub(source_node, nivel, previos['participacoes'])):
+            return
+
         if tipo_pessoa == 1: # PJ
-            query = f"SELECT * FROM socios WHERE cnpj_cpf_socio = '{id_pessoa}'"
+            condicao = f"s.cnpj_cpf_socio = '{id_pessoa}'"
         else: # PF
             cpf, nome = id_pessoa
-            query = f"SELECT * FROM socios WHERE cnpj_cpf_socio = '{cpf}' AND nome_socio_razao_social = '{nome}'"
+            condicao = f"s.cnpj_cpf_socio = '{cpf}' AND s.nome_socio_razao_social = '{nome}'"
+        # O CNPJ da matriz de cada empresa vem na mesma consulta (uma por nó, não uma por
+        # participação); empresas sem matriz ou fora das situações pedidas não são lidas
+        filtro_matriz, filtro_qualificacao = self.__filtro_participacoes
+        query = (f"SELECT {', '.join('s.' + c for c in COLUNAS_CHAVE_SOCIOS)}, e.cnpj_ordem, e.cnpj_dv FROM socios s "
+                 f"JOIN estabelecimentos e ON e.cnpj_basico = s.cnpj_basico AND e.identificador_matriz_filial = '1'"
+                 f"{filtro_matriz} WHERE {condicao}{filtro_qualificacao}")
 
-        df_participacoes = pd.read_sql_query(query, self.__conBD)
+        df_participacoes = self._le_sql(query, nivel)
+        if self._eh_hub(source_node, nivel, len(df_participacoes)):
+            return
         for _, participacao in df_participacoes.iterrows():
-            cnpj_basico_empresa = participacao['cnpj_basico']
-            # Precisamos encontrar o CNPJ completo da matriz para adicionar à rede
-            query_matriz = f"SELECT * FROM estabelecimentos WHERE cnpj_basico = '{cnpj_basico_empresa}' AND identificador_matriz_filial = 1"
-            df_matriz = pd.read_sql_query(query_matriz, self.__conBD)
-            if not df_matriz.empty:
-                cnpj_matriz = self._get_full_cnpj(df_matriz.iloc[0])
-                if cnpj_matriz != origem:
-                    self._explorar_vinculos(1, cnpj_matriz, nivel + 1, origem=id_pessoa)
-                    self.G.add_edge(source_node, cnpj_matriz, tipo='socio', **participacao.to_dict())
+            if not self._dentro_dos_limites():
+                return
+            cnpj_matriz = self._get_full_cnpj(participacao)
+            if cnpj_matriz != origem:
+                self._explorar_vinculos(1, cnpj_matriz, nivel + 1, origem=id_pessoa)
+                self._adiciona_aresta(source_node, cnpj_matriz, nivel, tipo='socio',
+                                      **participacao[COLUNAS_CHAVE_SOCIOS].to_dict())
+
+    def _buscar_compartilhados(self, cnpj, nivel):
+        """Liga a empresa às que têm o mesmo endereço, telefone ou e-mail (uma aresta por par de empresas)."""
+        df = self._le_sql(compartilhados.sql_vizinhos(self.__compartilhados, self.__situacoes), nivel,
+                          params=[cnpj[:8], *self.__compartilhados, *(self.__situacoes or ())])
+        vizinhos = {}
+        for linha in df.itertuples():
+            vizinhos.setdefault(linha.cnpj_basico + linha.cnpj_ordem + linha.cnpj_dv, []).append(linha.tipo)
+        for cnpj_vizinho, tipos in vizinhos.items():
+            if not self._dentro_dos_limites():
+                return
+            self._explorar_vinculos(1, cnpj_vizinho, nivel + 1, origem=cnpj)
+            if not self.G.has_edge(cnpj_vizinho, cnpj):
+                tipos.sort(key=compartilhados.TIPOS.index)
+                self._adiciona_aresta(cnpj, cnpj_vizinho, nivel, tipo='mesmo_' + tipos[0], compartilha=','.join(tipos))
 
     def _adicionar_vinculo_socio(self, socio, cnpj_empresa, nivel, origem):
         """Adiciona um nó de sócio e o conecta à empresa."""
@@ -136,30 +439,61 @@ class RedeCNPJ:
             if id_socio_node != origem:
                 self._explorar_vinculos(2, (id_socio_num, nome_socio), nivel + 1, origem=cnpj_empresa)
         
-        self.G.add_edge(id_socio_node, cnpj_empresa, tipo='socio', **socio.to_dict())
+        self._adiciona_aresta(id_socio_node, cnpj_empresa, nivel, tipo='socio', **socio.to_dict())
 
     # --- Métodos de Geração de Output ---
     def dataframe_pessoas(self):
-        return pd.DataFrame.from_dict(dict(self.G.nodes(data=True)), orient='index')
+        self.hidrata()
+        return self.G.dataframe_nos()
 
     def dataframe_vinculos(self):
-        if not self.G.edges():
+        if not self.G.number_of_edges():
             return pd.DataFrame()
-        edge_data = self.G.edges(data=True)
-        return pd.DataFrame([i[2] for i in edge_data], 
-                            index=pd.MultiIndex.from_tuples([(i[0], i[1]) for i in edge_data], 
-                            names=['source','target']))
+        self.hidrata()
+        return self.G.dataframe_arestas()
 
     def json(self):
-        return json_graph.node_link_data(self.G)
+        self.hidrata()
+        return self.G.node_link()
 
     def gera_graphml(self, path):
-        nx.write_graphml(self.G, path)
+        self.hidrata()
+        exporta.escreve_graphml(self.G, path)
 
     def gera_gexf(self, path):
-        G_adapt = self.G.copy()
-        for node, data in G_adapt.nodes(data=True):
-            for key, value in data.items():
-                if isinstance(value, (dict, list)):
-                    G_adapt.nodes[node][key] = str(value)
-        nx.write_gexf(G_adapt, path)
+        self.hidrata()
+        exporta.escreve_gexf(self.G, path)
+
+    def gera_json(self, path):
+        """Grava o json() em arquivo, sem montar o dicionário em memória."""
+        self.hidrata()
+        with open(path, 'wb') as arquivo:
+            exporta.escreve_json(self.G, arquivo)
+
+    def gera_html(self, path_template, path, url_api=None, tamanho_pagina=50, calcula_layout=False):
+        """
+        Grava a visualização (viz/template.html) com a rede no lugar do marcador <!--GRAFO-->.
+        Com calcula_layout, as posições dos nós são calculadas aqui (layout.py) e
+        gravadas nos atributos x e y, e o navegador só desenha a rede.
+        Com url_api, grava só os nós iniciais (nivel 0): o restante é buscado na API
+        (endpoint /network/vizinhos, com os mesmos filtros de qualificações e situações),
+        tamanho_pagina vínculos por clique em um nó; só esses nós são hidratados.
+        """
+        if url_api is None:
+            self.hidrata()
+            if calcula_layout:
+                layout.aplica(self.G)
+            exporta.escreve_html(self.G, path_template, path)
+            return
+        ids_iniciais = [id_no for id_no, dados in self.G.nodes(data=True) if dados.get('nivel') == 0]
+        self.hidrata(apenas=ids_iniciais)
+        iniciais = Grafo()
+        for id_no in ids_iniciais:
+            iniciais.add_node(id_no, **self.G.nodes[id_no])
+        api = {'api': url_api.rstrip('/'), 'page_size': tamanho_pagina}
+        # A expansão na API segue os mesmos filtros desta rede
+        if self.__qualificacoes:
+            api['qualificacoes'] = ','.join(self.__qualificacoes)
+        if self.__situacoes:
+            api['situacoes'] = ','.join(self.__situacoes)
+        exporta.escreve_html(iniciais, path_template, path, api=api)
@@ -0,0 +1,271 @@
+# -*- encoding: utf-8 -*-
+"""
+Leitura em streaming dos membros dos arquivos ZIP da Receita Federal.
+
+Substitui o caminho `pd.read_csv(..., compression='zip')`, em que cada membro
+passa pelo zipfile do Python e por um TextIOWrapper com pequenas leituras.
+Aqui o parser do pandas recebe bytes crus (a decodificação latin1 é feita
+pelo próprio parser em C), por meio de um objeto binário com `readinto`:
+
+- membros comprimidos (deflate) são descomprimidos em streaming, com buffers
+  grandes e reutilizados, usando isal ou zlib-ng quando instalados e zlib
+  caso contrário;
+- membros armazenados sem compressão e arquivos já extraídos (ex: pela
+  tools/unzip_files.py) são mapeados em memória, sem cópia intermediária.
+
+Como no zipfile, o CRC-32 e o tamanho de cada membro são conferidos ao final da
+leitura (zipfile.BadZipFile se não batem), e um membro comprimido que termina
+antes do fim do stream deflate gera EOFError.
+
+O throughput de descompressão é acumulado em um DecompressionStats opcional.
+
+Uso:
+    with abre_membro(caminho, stats) as stream:
+        reader = pd.read_csv(stream, sep=';', encoding='latin1', ...)
+    print(stats.resumo())
+"""
+import io
+import os
+import mmap
+import time
+import struct
+import zipfile
+
+# Backend de descompressão: isal e zlib-ng são compatíveis com a API
+# do zlib e bem mais rápidos. São opcionais.
+try:
+    from isal import isal_zlib as zlib_backend
+    BACKEND = 'isal'
+except ImportError:
+    try:
+        from zlib_ng import zlib_ng as zlib_backend
+        BACKEND = 'zlib-ng'
+    except ImportError:
+        import zlib as zlib_backend
+        BACKEND = 'zlib'
+
+# Tamanho do buffer de leitura do arquivo comprimido.
+BUFFER_SIZE = 16 * 1024 * 1024
+
+# Limite de bytes produzidos por chamada ao descompressor, para que a
+# saída pendente não cresça com a taxa de compressão dos dados.
+MAX_OUTPUT_SIZE = 4 * BUFFER_SIZE
+
+# Cabeçalho local de cada membro no arquivo ZIP (PKWARE APPNOTE 4.3.7).
+_LOCAL_HEADER = struct.Struct('<4s2B4HL2L2H')
+_LOCAL_HEADER_SIGNATURE = b'PK\x03\x04'
+
+
+class DecompressionStats:
+    """Acumula bytes lidos/produzidos e o tempo gasto na descompressão."""
+
+    def __init__(self):
+        self.compressed_bytes = 0
+        self.uncompressed_bytes = 0
+        self.seconds = 0.0
+
+    def add(self, compressed_bytes, uncompressed_bytes, seconds):
+        self.compressed_bytes += compressed_bytes
+        self.uncompressed_bytes += uncompressed_bytes
+        self.seconds += seconds
+
+    @property
+    def mb_per_s(self):
+        """Throughput de descompressão em MB/s de dados descomprimidos."""
+        if self.seconds == 0:
+            return 0.0
+        return self.uncompressed_bytes / self.seconds / 1e6
+
+    def resumo(self):
+        return (f'{self.compressed_bytes / 1e6:,.1f} MB -> {self.uncompressed_bytes / 1e6:,.1f} MB '
+                f'em {self.seconds:,.2f}s ({self.mb_per_s:,.1f} MB/s, backend {BACKEND})')
+
+
+class _MemberCheck:
+    """CRC-32 e tamanho dos bytes entregues de um membro, conferidos com o ZipInfo ao final."""
+
+    def __init__(self, info):
+        self._info = info
+        self._crc = 0
+        self._size = 0
+        self._checked = False
+
+    def update(self, data):
+        self._crc = zlib_backend.crc32(data, self._crc)
+        self._size += len(data)
+
+    def check(self):
+        if self._checked:
+            return
+        self._checked = True
+        if self._size != self._info.file_size:
+            raise zipfile.BadZipFile(f'Tamanho incorreto para {self._info.filename}: '
+                                     f'{self._size} bytes, esperados {self._info.file_size}')
+        if self._crc != self._info.CRC:
+            raise zipfile.BadZipFile(f'CRC-32 incorreto para {self._info.filename}')
+
+
+class MappedStream(io.RawIOBase):
+    """
+    Stream binário somente leitura sobre uma região de um arquivo mapeado em memória.
+    Com `info` (membro armazenado de um ZIP), confere o CRC-32 e o tamanho ao final.
+    """
+
+    def __init__(self, path, offset=0, length=None, stats=None, info=None):
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        length = size - offset if length is None else length
+
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._view = memoryview(self._mmap)[offset:offset + length] if size else memoryview(b'')
+        self._pos = 0
+        self._stats = stats
+        self._check = _MemberCheck(info) if info is not None else None
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        start = time.perf_counter()
+        n = min(len(b), len(self._view) - self._pos)
+        data = self._view[self._pos:self._pos + n]
+        b[:n] = data
+        self._pos += n
+        if self._check is not None:
+            if n:
+                self._check.update(data)
+            else:
+                self._check.check()
+        if self._stats is not None:
+            self._stats.add(n, n, time.perf_counter() - start)
+        return n
+
+    def close(self):
+        if not self.closed:
+            self._view.release()
+            if self._mmap is not None:
+                self._mmap.close()
+            self._file.close()
+        super().close()
+
+
+class InflateStream(io.RawIOBase):
+    """
+    Stream binário que descomprime (deflate) um membro de um arquivo ZIP. Com `info`,
+    confere o CRC-32 e o tamanho ao final.
+    """
+
+    def __init__(self, path, offset, compressed_size, stats=None, buffer_size=BUFFER_SIZE, info=None):
+        self._file = open(path, 'rb', buffering=0)
+        self._file.seek(offset)
+        self._remaining = compressed_size
+
+        self._inbuf = bytearray(buffer_size)
+        self._inview = memoryview(self._inbuf)
+        self._tail = b''
+        self._out = memoryview(b'')
+        self._decompressor = zlib_backend.decompressobj(-zlib_backend.MAX_WBITS)
+        self._stats = stats
+        self._check = _MemberCheck(info) if info is not None else None
+        self._name = info.filename if info is not None else path
+
+    def readable(self):
+        return True
+
+    def _fill(self):
+        """Descomprime o próximo bloco, reaproveitando o buffer de entrada."""
+        start = time.perf_counter()
+        consumed = 0
+
+        if self._tail:
+            data = self._tail
+        else:
+            n = self._file.readinto(self._inview[:min(len(self._inbuf), self._remaining)])
+            # Arquivo menor que o tamanho comprimido declarado: não há mais o que ler
+            self._remaining = self._remaining - n if n else 0
+            consumed = n
+            data = self._inview[:n]
+
+        if data:
+            out = self._decompressor.decompress(data, MAX_OUTPUT_SIZE)
+            self._tail = self._decompressor.unconsumed_tail
+        else:
+            out = self._decompressor.flush()
+
+        self._out = memoryview(out)
+        if self._check is not None and out:
+            self._check.update(out)
+        if self._stats is not None:
+            self._stats.add(consumed, len(out), time.perf_counter() - start)
+
+    def readinto(self, b):
+        while not self._out:
+            if self._decompressor.eof:
+                if self._check is not None:
+                    self._check.check()
+                return 0
+            input_exhausted = not self._tail and self._remaining == 0
+            self._fill()
+            if not self._out and input_exhausted and not self._decompressor.eof:
+                # Arquivo truncado (ex: download incompleto): os dados acabaram antes do fim do stream
+                raise EOFError(f'Membro {self._name} truncado: os dados comprimidos terminam '
+                               f'antes do fim do stream deflate')
+
+        n = min(len(b), len(self._out))
+        b[:n] = self._out[:n]
+        self._out = self._out[n:]
+        return n
+
+    def close(self):
+        if not self.closed:
+            self._inview.release()
+            self._file.close()
+        super().close()
+
+
+def _data_offset(path, info):
+    """Posição dos dados de um membro: o cabeçalho local pode ter campos
+    extras diferentes dos informados no diretório central."""
+    with open(path, 'rb') as f:
+        f.seek(info.header_offset)
+        header = _LOCAL_HEADER.unpack(f.read(_LOCAL_HEADER.size))
+
+    if header[0] != _LOCAL_HEADER_SIGNATURE:
+        raise zipfile.BadZipFile(f'Cabeçalho local inválido para {info.filename} em {path}')
+
+    name_length, extra_length = header[-2], header[-1]
+    return info.header_offset + _LOCAL_HEADER.size + name_length + extra_length
+
+
+def abre_membro(path, stats=None, member=None):
+    """
+    Retorna um stream binário com o conteúdo de um arquivo para ser passado
+    ao pd.read_csv. Se `path` for um ZIP, abre o membro indicado em `member`
+    (ou o único membro do arquivo); caso contrário, mapeia o arquivo em memória.
+    """
+    if not zipfile.is_zipfile(path):
+        if path.lower().endswith('.zip'):
+            # Ex: download interrompido, sem o diretório central no fim do arquivo
+            raise zipfile.BadZipFile(f'Arquivo ZIP inválido ou incompleto: {path}')
+        return MappedStream(path, stats=stats)
+
+    with zipfile.ZipFile(path) as zf:
+        if member is None:
+            infos = [i for i in zf.infolist() if not i.is_dir()]
+            if len(infos) != 1:
+                raise ValueError(f'O arquivo {path} deve conter exatamente um membro, encontrados {len(infos)}.')
+            info = infos[0]
+        else:
+            info = zf.getinfo(member)
+
+    if info.flag_bits & 0x1:
+        raise ValueError(f'Membro criptografado não suportado: {info.filename}')
+
+    offset = _data_offset(path, info)
+
+    if info.compress_type == zipfile.ZIP_STORED:
+        return MappedStream(path, offset, info.compress_size, stats=stats, info=info)
+    if info.compress_type == zipfile.ZIP_DEFLATED:
+        return InflateStream(path, offset, info.compress_size, stats=stats, info=info)
+
+    raise ValueError(f'Método de compressão não suportado ({info.compress_type}): {info.filename}')
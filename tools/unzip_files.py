@@ -1,91 +1,162 @@
 import os
+import zlib
 import zipfile
 import glob
 import argparse
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-# --- Argument Parsing ---
-parser = argparse.ArgumentParser(
-    description="Unzip files from the downloads_cnpj directory, with options for handling existing files.",
-    formatter_class=argparse.RawTextHelpFormatter
-)
-parser.add_argument(
-    '--overwrite-all',
-    action='store_true',
-    help='Overwrite all existing files without asking.'
-)
-parser.add_argument(
-    '--skip-all',
-    action='store_true',
-    help='Skip all existing files without asking (default non-interactive behavior).'
-)
-args = parser.parse_args()
-
-if args.overwrite_all and args.skip_all:
-    print("Error: --overwrite-all and --skip-all cannot be used at the same time.", file=sys.stderr)
-    sys.exit(1)
-
-# Get the directory where the script is located
-script_dir = os.path.dirname(os.path.abspath(__file__))
-
-# Define the source and destination directories
-downloads_dir = os.path.join(script_dir, "downloads_cnpj")
-unzip_dir = os.path.join(downloads_dir, "unziped")
-
-# Create the destination directory if it doesn't exist
-os.makedirs(unzip_dir, exist_ok=True)
-
-# Find all zip files in the downloads directory
-zip_files = glob.glob(os.path.join(downloads_dir, "*.zip"))
-
-# Initialize flags from command-line arguments
-overwrite_all = args.overwrite_all
-skip_all = args.skip_all
-is_interactive = not (overwrite_all or skip_all)
-
-# Iterate over each zip file
-for zip_path in zip_files:
+# Size of the buffer used to stream each member to disk and to compute
+# the CRC of files that already exist.
+BUFFER_SIZE = 16 * 1024 * 1024
+
+
+def file_crc32(path):
+    """Computes the CRC-32 of a file, reading it in large blocks."""
+    crc = 0
+    buffer = bytearray(BUFFER_SIZE)
+    view = memoryview(buffer)
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            crc = zlib.crc32(view[:n], crc)
+    return crc
+
+
+def is_identical(path, file_info):
+    """Checks whether an extracted file matches the member, by size and CRC."""
+    return (os.path.getsize(path) == file_info.file_size
+            and file_crc32(path) == file_info.CRC)
+
+
+def safe_destination(unzip_dir, filename):
+    """Returns the destination path of a member, refusing names that escape unzip_dir."""
+    destination = os.path.abspath(os.path.join(unzip_dir, filename))
+    if os.path.commonpath([destination, os.path.abspath(unzip_dir)]) != os.path.abspath(unzip_dir):
+        raise ValueError(f"Unsafe member name: '{filename}'")
+    return destination
+
+
+def extract_member(zip_ref, file_info, destination):
+    """
+    Streams a member to disk with a large buffer. Data is written to a temporary
+    file that only replaces the destination after the CRC has been verified.
+    """
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    partial_path = destination + '.part'
+    crc = 0
+
+    try:
+        with zip_ref.open(file_info) as source, open(partial_path, 'wb') as target:
+            while True:
+                chunk = source.read(BUFFER_SIZE)
+                if not chunk:
+                    break
+                crc = zlib.crc32(chunk, crc)
+                target.write(chunk)
+
+        if crc != file_info.CRC:
+            raise zipfile.BadZipFile(f"CRC mismatch for '{file_info.filename}'")
+
+        os.replace(partial_path, destination)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+
+
+def extract_archive(zip_path, unzip_dir, mode):
+    """
+    Extracts all members of an archive. Runs in a worker process and returns a
+    list of messages, so that the output of different archives is not mixed.
+
+    mode -- 'identical' (skip files with the same size and CRC),
+            'overwrite' (always extract) or 'skip' (skip any existing file).
+    """
+    messages = []
+    zip_name = os.path.basename(zip_path)
     try:
         with zipfile.ZipFile(zip_path, 'r') as zip_ref:
             for file_info in zip_ref.infolist():
-                # Path for the extracted file
-                extracted_file_path = os.path.join(unzip_dir, file_info.filename)
+                if file_info.is_dir():
+                    continue
+
+                extracted_file_path = safe_destination(unzip_dir, file_info.filename)
 
-                # Check if the file already exists
                 if os.path.exists(extracted_file_path):
-                    if skip_all:
-                        print(f"Skipping '{file_info.filename}' (skip all enabled).")
+                    if mode == 'skip':
+                        messages.append(f"Skipping '{file_info.filename}' (skip all enabled).")
                         continue
-                    
-                    if overwrite_all:
-                        # Proceed to extract without message
-                        pass
-
-                    elif is_interactive:
-                        prompt = f"'{file_info.filename}' already exists. Overwrite? (y/n/a/s) (yes/no/all/skip all): "
-                        answer = input(prompt).lower()
-
-                        if answer == 'a':
-                            overwrite_all = True
-                        elif answer == 's':
-                            skip_all = True
-                            print(f"Skipping '{file_info.filename}' and all subsequent existing files.")
-                            continue
-                        elif answer != 'y':
-                            print(f"Skipping '{file_info.filename}'.")
-                            continue
-                    else:
-                        # Default non-interactive behavior is to skip
-                        print(f"Skipping '{file_info.filename}' (default non-interactive behavior).")
+                    if mode == 'identical' and is_identical(extracted_file_path, file_info):
+                        messages.append(f"Skipping '{file_info.filename}' (identical size and CRC).")
                         continue
-                
-                # Extract the file
-                print(f"Extracting '{file_info.filename}'...")
-                zip_ref.extract(file_info, unzip_dir)
 
-    except zipfile.BadZipFile:
-        print(f"Error: '{zip_path}' is not a valid zip file. Skipping.")
+                extract_member(zip_ref, file_info, extracted_file_path)
+                messages.append(f"Extracted '{file_info.filename}' from '{zip_name}' "
+                                f"({file_info.file_size:,} bytes, CRC verified).")
+
+    except zipfile.BadZipFile as e:
+        messages.append(f"Error: '{zip_path}' is not a valid zip file or is corrupted ({e}). Skipping.")
     except Exception as e:
-        print(f"An unexpected error occurred with '{zip_path}': {e}")
+        messages.append(f"An unexpected error occurred with '{zip_path}': {e}")
+
+    return messages
+
+
+def main():
+    # --- Argument Parsing ---
+    parser = argparse.ArgumentParser(
+        description="Unzip files from the downloads_cnpj directory in parallel, verifying the CRC of each member.\n"
+                    "By default, files that already exist are skipped only if their size and CRC match the archive.",
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument(
+        '--overwrite-all',
+        action='store_true',
+        help='Overwrite all existing files, even if identical.'
+    )
+    parser.add_argument(
+        '--skip-all',
+        action='store_true',
+        help='Skip all existing files without checking their contents.'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=os.cpu_count() or 1,
+        help='Number of archives extracted in parallel (default: number of CPUs).'
+    )
+    args = parser.parse_args()
+
+    if args.overwrite_all and args.skip_all:
+        print("Error: --overwrite-all and --skip-all cannot be used at the same time.", file=sys.stderr)
+        sys.exit(1)
+
+    mode = 'overwrite' if args.overwrite_all else 'skip' if args.skip_all else 'identical'
+
+    # Get the directory where the script is located
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+
+    # Define the source and destination directories
+    downloads_dir = os.path.join(script_dir, "downloads_cnpj")
+    unzip_dir = os.path.join(downloads_dir, "unziped")
+
+    # Create the destination directory if it doesn't exist
+    os.makedirs(unzip_dir, exist_ok=True)
+
+    # Find all zip files in the downloads directory. The largest archives are
+    # submitted first, so that they do not end up alone at the end of the run.
+    zip_files = sorted(glob.glob(os.path.join(downloads_dir, "*.zip")), key=os.path.getsize, reverse=True)
+
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        futures = [executor.submit(extract_archive, zip_path, unzip_dir, mode) for zip_path in zip_files]
+        for future in as_completed(futures):
+            for message in future.result():
+                print(message)
+
+    print("\nAll files have been processed.")
+
 
-print("\nAll files have been processed.")
\ No newline at end of file
+if __name__ == '__main__':
+    main()